@@ -1,6 +1,6 @@
 {
     'name': 'Electronic Purchase Request (ePR) Enterprise',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Procurement/Inventory',
     'summary': 'Hệ thống quản lý yêu cầu mua sắm nội bộ với quy trình phê duyệt đa cấp động',
     'description': """
@@ -13,6 +13,7 @@
     'author': 'Trường Phan',
     'depends': [
         'base',
+        'sequence_block',  # ir.sequence._next_by_code_block dùng chung với L&D
         'purchase',       # Để kết nối với purchase.order [8]
         'hr',             # Để lấy thông tin phòng ban và quản lý
         'product',        # Quản lý danh mục sản phẩm
@@ -28,15 +29,25 @@
         'security/epr_record_rules.xml',
         'data/epr_pr_sequence_data.xml',
         'data/epr_rfq_sequence_data.xml',
+        'data/epr_cron_data.xml',
+        'data/epr_digest_templates.xml',
         'views/epr_purchase_request_views.xml',
         'views/epr_rfq_views.xml',
         'views/epr_approval_views.xml',
         'views/epr_po_views.xml',
         'views/epr_menus.xml',
+        'views/epr_lead_time_report_views.xml',
+        'views/epr_vendor_price_views.xml',
+        'views/epr_vendor_match_views.xml',
+        'views/epr_image_offload_views.xml',
+        'views/epr_archive_views.xml',
+        'views/epr_fulfilment_report_views.xml',
+        'views/epr_quote_comparison_views.xml',
         'wizards/epr_reject_wizard_views.xml',
         'wizards/epr_reject_rfq_wizard_views.xml',
         'wizards/epr_create_rfq_views.xml',
         'wizards/epr_create_po_views.xml',
+        'wizards/epr_import_request_views.xml',
     ],
     'assets': {
         # 'web.assets_backend': [
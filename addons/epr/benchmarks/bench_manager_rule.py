@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Record Rule "ePR: Manager sees department requests".
+
+So sánh 2 cách lọc epr.purchase.request cho 1 Manager:
+    1. OR 4 nhánh (owner / approver / trưởng phòng / line manager) như domain cũ.
+    2. Semi-join trên bảng hiển thị tính sẵn epr_purchase_request_visibility_rel.
+
+Script tự tạo dữ liệu giả lập trong schema riêng (mặc định: epr_bench) rồi xóa
+sau khi chạy, không đụng tới dữ liệu Odoo. Chạy trong container Odoo:
+
+    docker compose exec odoo18 python3 /mnt/extra-addons/epr/benchmarks/bench_manager_rule.py
+
+Tham số kết nối lấy từ biến môi trường HOST / USER / PASSWORD / DB
+(giống docker-compose.yml).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import psycopg2
+
+BENCH_SCHEMA = 'epr_bench'
+
+SCHEMA_SQL = """
+    DROP SCHEMA IF EXISTS {schema} CASCADE;
+    CREATE SCHEMA {schema};
+    SET search_path TO {schema};
+
+    CREATE TABLE res_users (id int PRIMARY KEY);
+    CREATE TABLE hr_department (id int PRIMARY KEY, manager_id int);
+    CREATE TABLE hr_employee (
+        id int PRIMARY KEY, user_id int, parent_id int, department_id int
+    );
+    CREATE TABLE epr_purchase_request (
+        id int PRIMARY KEY, employee_id int, department_id int
+    );
+    CREATE TABLE epr_purchase_request_res_users_rel (
+        epr_purchase_request_id int, res_users_id int,
+        PRIMARY KEY (epr_purchase_request_id, res_users_id)
+    );
+    CREATE TABLE epr_purchase_request_visibility_rel (
+        request_id int, user_id int,
+        PRIMARY KEY (request_id, user_id)
+    );
+"""
+
+# Chỉ mục giống những gì Odoo tạo cho các field index=True / bảng Many2many
+INDEX_SQL = """
+    CREATE INDEX ON hr_employee (user_id);
+    CREATE INDEX ON hr_employee (parent_id);
+    CREATE INDEX ON epr_purchase_request (employee_id);
+    CREATE INDEX ON epr_purchase_request (department_id);
+    CREATE INDEX ON epr_purchase_request_res_users_rel (res_users_id, epr_purchase_request_id);
+    CREATE INDEX ON epr_purchase_request_visibility_rel (user_id, request_id);
+    ANALYZE;
+"""
+
+DATA_SQL = """
+    INSERT INTO res_users SELECT g FROM generate_series(1, %(employees)s) g;
+
+    -- Mỗi phòng ban có 1 trưởng phòng là nhân viên đầu tiên của phòng
+    INSERT INTO hr_department
+    SELECT g, (g - 1) * (%(employees)s / %(departments)s) + 1
+      FROM generate_series(1, %(departments)s) g;
+
+    INSERT INTO hr_employee
+    SELECT g, g,
+           CASE WHEN g %% 10 = 1 THEN NULL ELSE g - (g - 1) %% 10 END,
+           ((g - 1) / (%(employees)s / %(departments)s)) + 1
+      FROM generate_series(1, %(employees)s) g;
+
+    INSERT INTO epr_purchase_request
+    SELECT g, e.id, e.department_id
+      FROM generate_series(1, %(requests)s) g
+      JOIN hr_employee e ON e.id = (g %% %(employees)s) + 1;
+
+    INSERT INTO epr_purchase_request_res_users_rel
+    SELECT r.id, p.user_id
+      FROM epr_purchase_request r
+      JOIN hr_employee e ON e.id = r.employee_id
+      JOIN hr_employee p ON p.id = e.parent_id;
+
+    -- Bảng hiển thị: hợp của 4 nhánh trong domain cũ
+    INSERT INTO epr_purchase_request_visibility_rel
+    SELECT DISTINCT request_id, user_id FROM (
+        SELECT r.id AS request_id, e.user_id
+          FROM epr_purchase_request r JOIN hr_employee e ON e.id = r.employee_id
+        UNION ALL
+        SELECT epr_purchase_request_id, res_users_id FROM epr_purchase_request_res_users_rel
+        UNION ALL
+        SELECT r.id, m.user_id
+          FROM epr_purchase_request r
+          JOIN hr_department d ON d.id = r.department_id
+          JOIN hr_employee m ON m.id = d.manager_id
+        UNION ALL
+        SELECT r.id, p.user_id
+          FROM epr_purchase_request r
+          JOIN hr_employee e ON e.id = r.employee_id
+          JOIN hr_employee p ON p.id = e.parent_id
+    ) AS vis
+     WHERE user_id IS NOT NULL;
+"""
+
+# SQL tương đương với domain cũ sau khi Odoo biên dịch (LEFT JOIN cho các path)
+OR_QUERY = """
+    SELECT r.id
+      FROM epr_purchase_request r
+ LEFT JOIN hr_employee e ON e.id = r.employee_id
+ LEFT JOIN hr_department d ON d.id = r.department_id
+ LEFT JOIN hr_employee dm ON dm.id = d.manager_id
+ LEFT JOIN hr_employee p ON p.id = e.parent_id
+     WHERE e.user_id = %(uid)s
+        OR EXISTS (SELECT 1 FROM epr_purchase_request_res_users_rel a
+                    WHERE a.epr_purchase_request_id = r.id AND a.res_users_id = %(uid)s)
+        OR dm.user_id = %(uid)s
+        OR p.user_id = %(uid)s
+  ORDER BY r.id DESC
+     LIMIT %(limit)s
+"""
+
+SEMI_JOIN_QUERY = """
+    SELECT r.id
+      FROM epr_purchase_request r
+     WHERE EXISTS (SELECT 1 FROM epr_purchase_request_visibility_rel v
+                    WHERE v.request_id = r.id AND v.user_id = %(uid)s)
+  ORDER BY r.id DESC
+     LIMIT %(limit)s
+"""
+
+
+def run_query(cr, query, params, repeat):
+    """Chạy `query` `repeat` lần, trả về (median ms, số dòng)."""
+    timings = []
+    rows = 0
+    for _i in range(repeat):
+        start = time.perf_counter()
+        cr.execute(query, params)
+        rows = len(cr.fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500000)
+    parser.add_argument('--employees', type=int, default=5000)
+    parser.add_argument('--departments', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=80, help="Kích thước trang List View")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help="Giữ lại schema sau khi chạy")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=os.environ.get('HOST', 'localhost'),
+        user=os.environ.get('USER', 'odoo'),
+        password=os.environ.get('PASSWORD', ''),
+        dbname=os.environ.get('DB', 'postgres'),
+    )
+    conn.autocommit = True
+    cr = conn.cursor()
+    try:
+        print("Preparing %s requests..." % args.requests)
+        cr.execute(SCHEMA_SQL.format(schema=BENCH_SCHEMA))
+        cr.execute(DATA_SQL, vars(args))
+        cr.execute(INDEX_SQL)
+
+        # Trưởng phòng (thấy cả phòng), line manager và nhân viên thường
+        managers = [1, 11, 2]
+        print("%-10s %-12s %12s %12s %8s" % ('user', 'query', 'median ms', 'rows', 'x'))
+        for uid in managers:
+            params = {'uid': uid, 'limit': args.limit}
+            or_ms, or_rows = run_query(cr, OR_QUERY, params, args.repeat)
+            semi_ms, semi_rows = run_query(cr, SEMI_JOIN_QUERY, params, args.repeat)
+            assert or_rows == semi_rows, "Kết quả 2 cách lọc không khớp"
+            print("%-10s %-12s %12.2f %12s" % (uid, 'or-4-way', or_ms, or_rows))
+            print("%-10s %-12s %12.2f %12s %8.1f" % (
+                uid, 'semi-join', semi_ms, semi_rows, or_ms / semi_ms if semi_ms else 0.0
+            ))
+    finally:
+        if not args.keep:
+            cr.execute("DROP SCHEMA IF EXISTS %s CASCADE" % BENCH_SCHEMA)
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
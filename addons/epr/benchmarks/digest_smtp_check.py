@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra digest phê duyệt với 1 SMTP server giả lập chạy local.
+
+Kịch bản (tất cả trong 1 transaction, rollback ở cuối -> không để lại dữ liệu):
+    1. Tạo 2 approver (A, B): A duyệt 1 PR + 1 bước duyệt RFQ, B duyệt 1 PR.
+    2. Chạy digest -> mỗi approver nhận đúng 1 email (A có 2 mục, B có 1 mục).
+    3. Chạy lại -> không có email nào (chống gửi trùng).
+    4. PR của B bị reset về Draft rồi trình lại -> chỉ B nhận lại 1 email.
+
+Chạy trong container Odoo (database đã cài module epr):
+
+    docker compose exec odoo18 python3 /mnt/extra-addons/epr/benchmarks/digest_smtp_check.py \\
+        -c /etc/odoo/odoo.conf -d <database>
+
+Chỉ email gửi cho các approver test được gửi (tới SMTP giả lập); email digest
+của người dùng thật trong DB bị bỏ qua và rollback cùng transaction.
+"""
+import argparse
+import email
+import socketserver
+import threading
+import time
+from datetime import timedelta
+
+from odoo import api, fields, Command, SUPERUSER_ID
+from odoo.modules.registry import Registry
+from odoo.tools import config
+
+
+class SmtpStandInHandler(socketserver.StreamRequestHandler):
+    """SMTP tối giản: đủ cho smtplib của Odoo (EHLO, MAIL, RCPT, DATA, QUIT)."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost ePR SMTP stand-in')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                self.server.messages.append({
+                    'from': mail_from,
+                    'to': rcpt_to,
+                    'message': email.message_from_bytes(b''.join(data)),
+                })
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port):
+        super().__init__(('127.0.0.1', port), SmtpStandInHandler)
+        self.messages = []
+
+
+def setup_data(env):
+    stamp = int(time.time())
+    users = env['res.users'].create([{
+        'name': 'EPR Digest Approver %s' % code,
+        'login': 'epr_digest_%s_%s' % (stamp, code),
+        'email': 'epr.digest.%s.%s@example.com' % (stamp, code.lower()),
+        'groups_id': [Command.link(env.ref('epr.group_epr_manager').id)],
+    } for code in ('A', 'B')])
+    employee = env['hr.employee'].create({'name': 'EPR Digest Requester %s' % stamp})
+
+    requests = env['epr.purchase.request'].create([{
+        'employee_id': employee.id,
+        'state': 'to_approve',
+        'approver_ids': [Command.set(user.ids)],
+        'date_submitted': fields.Datetime.now() - timedelta(minutes=10),
+    } for user in users])
+
+    partner = env['res.partner'].create({'name': 'EPR Digest Vendor %s' % stamp})
+    rfq = env['epr.rfq'].create({'partner_id': partner.id})
+    env['epr.approval.entry'].create({
+        'rfq_id': rfq.id,
+        'name': 'Digest Step',
+        'sequence': 1,
+        'status': 'new',
+        'required_user_ids': [Command.set(users[:1].ids)],
+    })
+    return users, requests
+
+
+def run_digest(env, server, mail_server, users):
+    """Chạy cron digest, chỉ gửi email của approver test. Trả về {login: subject}."""
+    sent_before = len(server.messages)
+    mails = env['epr.approval.digest.item']._cron_send_digest()
+    test_mails = mails.filtered(lambda m: m.recipient_ids & users.partner_id)
+    test_mails.write({'mail_server_id': mail_server.id, 'auto_delete': False})
+    test_mails.send(auto_commit=False, raise_exception=True)
+
+    received = {}
+    for message in server.messages[sent_before:]:
+        user = users.filtered(lambda u: u.email in message['to'])
+        received[user.login] = message['message']['Subject']
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-c', '--config', required=True)
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--port', type=int, default=2525)
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    registry = Registry(args.database)
+
+    server = SmtpStandIn(args.port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ok = True
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        try:
+            mail_server = env['ir.mail_server'].create({
+                'name': 'ePR SMTP stand-in',
+                'smtp_host': '127.0.0.1',
+                'smtp_port': args.port,
+                'smtp_encryption': 'none',
+            })
+            users, requests = setup_data(env)
+            user_a, user_b = users
+
+            steps = [
+                ('first run', {user_a.login: 2, user_b.login: 1}),
+                ('second run (dedup)', {}),
+                ('after resubmit', {user_b.login: 1}),
+            ]
+            for label, expected in steps:
+                if label == 'after resubmit':
+                    requests[1].write({'state': 'draft', 'approver_ids': [Command.clear()]})
+                    requests[1].write({
+                        'state': 'to_approve',
+                        'approver_ids': [Command.set(user_b.ids)],
+                        'date_submitted': fields.Datetime.now(),
+                    })
+                received = run_digest(env, server, mail_server, users)
+                step_ok = set(received) == set(expected) and all(
+                    received[login].startswith(str(count)) for login, count in expected.items()
+                )
+                ok &= step_ok
+                print("%-20s received=%s %s" % (label, received, 'OK' if step_ok else 'FAIL'))
+        finally:
+            cr.rollback()
+            server.shutdown()
+
+    print("RESULT: %s" % ('PASS' if ok else 'FAIL'))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Stress test: N approver duyệt song song cùng 1 tầng (sequence) của 1 RFQ.
+
+Kịch bản:
+    - Tạo N user, 1 Approval Rule có tầng 1 gồm N bước (mỗi bước 1 user),
+      tầng 2 và tầng 3 mỗi tầng 1 bước.
+    - Tạo 1 RFQ và trình duyệt -> N entry 'new' ở tầng 1.
+    - N thread (mỗi thread 1 cursor / 1 transaction riêng) cùng bấm Approve
+      tại cùng một thời điểm (threading.Barrier).
+
+Kết quả mong đợi:
+    - Không thread nào gặp lỗi serialization (không cần retry).
+    - Tầng 2 được kích hoạt đúng 1 lần (1 câu UPDATE duy nhất), tầng 3 vẫn 'pending'.
+
+Chạy trong container Odoo (database đã cài module epr):
+
+    docker compose exec odoo18 python3 /mnt/extra-addons/epr/benchmarks/stress_parallel_approval.py \\
+        -c /etc/odoo/odoo.conf -d <database> --approvers 20
+
+Dữ liệu tạo ra được xóa sau khi chạy (trừ khi dùng --keep).
+"""
+import argparse
+import threading
+import time
+
+from odoo import api, Command, SUPERUSER_ID
+from odoo.modules.registry import Registry
+from odoo.tools import config
+
+
+def setup_data(registry, approvers):
+    """Tạo user, rule, RFQ và trình duyệt. Trả về dict id các bản ghi đã tạo."""
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        stamp = int(time.time())
+        manager_group = env.ref('epr.group_epr_manager')
+        users = env['res.users'].create([{
+            'name': 'EPR Stress Approver %s' % index,
+            'login': 'epr_stress_%s_%s' % (stamp, index),
+            'groups_id': [Command.link(manager_group.id)],
+        } for index in range(approvers)])
+
+        rule = env['epr.approval.rule'].create({
+            'name': 'EPR Stress Rule %s' % stamp,
+            'company_id': env.company.id,
+            'sequence': -1,
+            'line_ids': [
+                Command.create({'sequence': 1, 'name': 'Tier 1 / %s' % user.name,
+                                'user_ids': [Command.set(user.ids)]})
+                for user in users
+            ] + [
+                Command.create({'sequence': 2, 'name': 'Tier 2', 'user_ids': [Command.set(users[:1].ids)]}),
+                Command.create({'sequence': 3, 'name': 'Tier 3', 'user_ids': [Command.set(users[:1].ids)]}),
+            ],
+        })
+
+        partner = env['res.partner'].create({'name': 'EPR Stress Vendor %s' % stamp})
+        product = env['product.product'].create({'name': 'EPR Stress Product %s' % stamp})
+        rfq = env['epr.rfq'].create({
+            'partner_id': partner.id,
+            'state': 'received',
+            'line_ids': [Command.create({
+                'product_id': product.id,
+                'uom_id': product.uom_id.id,
+                'quantity': 1,
+                'price_unit': 100,
+            })],
+        })
+        rfq.action_submit_approval()
+
+        tier1 = rfq.approval_entry_ids.filtered(lambda e: e.sequence == 1)
+        assert len(tier1) == approvers and set(tier1.mapped('status')) == {'new'}
+        return {
+            'user_ids': users.ids,
+            'rule_id': rule.id,
+            'partner_id': partner.id,
+            'product_id': product.id,
+            'rfq_id': rfq.id,
+            'entries': {entry.required_user_ids.id: entry.id for entry in tier1},
+        }
+
+
+def approve(registry, barrier, user_id, entry_id, errors):
+    """1 approver = 1 transaction riêng, như 1 request HTTP."""
+    barrier.wait()
+    try:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, user_id, {})
+            env['epr.approval.entry'].browse(entry_id).action_approve_line()
+    except Exception as exc:  # noqa: BLE001 - ghi nhận mọi lỗi để báo cáo
+        errors.append((user_id, repr(exc)))
+
+
+def check_result(registry, data):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        rfq = env['epr.rfq'].browse(data['rfq_id'])
+        by_tier = {}
+        for entry in rfq.approval_entry_ids:
+            by_tier.setdefault(entry.sequence, []).append(entry)
+
+        tier1 = {entry.status for entry in by_tier[1]}
+        tier2 = by_tier[2]
+        tier3 = {entry.status for entry in by_tier[3]}
+        # Mỗi lần chuyển tầng là 1 câu UPDATE -> cùng write_date cho cả tầng
+        transitions = {(entry.write_uid.id, entry.write_date) for entry in tier2}
+        return {
+            'tier1': tier1,
+            'tier2': {entry.status for entry in tier2},
+            'tier3': tier3,
+            'tier2_transitions': len(transitions),
+            'rfq_state': rfq.state,
+        }
+
+
+def cleanup(registry, data):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['epr.rfq'].browse(data['rfq_id']).unlink()
+        env['epr.approval.rule'].browse(data['rule_id']).unlink()
+        env['product.product'].browse(data['product_id']).unlink()
+        env['res.partner'].browse(data['partner_id']).unlink()
+        # User đã để lại dấu vết (write_uid, chatter) -> lưu trữ thay vì xóa
+        env['res.users'].browse(data['user_ids']).write({'active': False})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-c', '--config', required=True)
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--approvers', type=int, default=20)
+    parser.add_argument('--keep', action='store_true', help="Giữ lại dữ liệu test")
+    args = parser.parse_args()
+
+    config.parse_config(['-c', args.config, '-d', args.database])
+    config['db_maxconn'] = max(config['db_maxconn'], args.approvers * 2 + 4)
+    registry = Registry(args.database)
+
+    data = setup_data(registry, args.approvers)
+    try:
+        barrier = threading.Barrier(args.approvers)
+        errors = []
+        threads = [
+            threading.Thread(target=approve, args=(registry, barrier, user_id, entry_id, errors))
+            for user_id, entry_id in data['entries'].items()
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        result = check_result(registry, data)
+        print("approvers=%s elapsed=%.2fs errors=%s" % (args.approvers, elapsed, len(errors)))
+        for user_id, error in errors:
+            print("  user %s: %s" % (user_id, error))
+        print("tier1=%(tier1)s tier2=%(tier2)s tier3=%(tier3)s "
+              "tier2_transitions=%(tier2_transitions)s rfq_state=%(rfq_state)s" % result)
+
+        ok = (
+            not errors
+            and result['tier1'] == {'approved'}
+            and result['tier2'] == {'new'}
+            and result['tier3'] == {'pending'}
+            and result['tier2_transitions'] == 1
+        )
+        print("RESULT: %s" % ('PASS' if ok else 'FAIL'))
+        return 0 if ok else 1
+    finally:
+        if not args.keep:
+            cleanup(registry, data)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
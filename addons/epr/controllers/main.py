@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from odoo import http
+from odoo.exceptions import AccessError, UserError, ValidationError
+from odoo.http import request
+
+# Giới hạn số dòng mỗi trang để tránh request quá nặng
+MAX_PAGE_SIZE = 200
+
+# Tên chứng từ trên URL -> model
+DOCUMENT_MODELS = {
+    'requests': 'epr.purchase.request',
+    'rfqs': 'epr.rfq',
+}
+
+
+class EprAPI(http.Controller):
+
+    @http.route('/api/epr/approvals/inbox', type='http', auth='user', methods=['GET'])
+    def approval_inbox(self, limit=80, offset=0, **kw):
+        """Các bước duyệt RFQ đang chờ User hiện tại (phân trang limit/offset)."""
+        try:
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+            offset = max(int(offset), 0)
+        except ValueError:
+            return request.make_json_response({'error': 'Invalid limit/offset'}, status=400)
+
+        inbox = request.env['epr.approval.entry']._get_approval_inbox(limit=limit, offset=offset)
+        return request.make_json_response(inbox, status=200)
+
+    @http.route('/api/epr/<string:document>', type='http', auth='bearer', methods=['GET'])
+    def list_documents(self, document, fields=None, cursor=None, limit=80, **kw):
+        """
+        Danh sách PR / RFQ theo (write_date, id) tăng dần, phân trang keyset:
+        truyền lại `next_cursor` để lấy trang sau (hoặc để poll các thay đổi mới).
+        Trang đọc tiếp từ cursor có thể lặp lại vài bản ghi vừa trả về (khoảng an toàn
+        cho transaction commit muộn): phía client ghi đè theo id.
+        `fields` (phân cách bằng dấu phẩy) chọn trường trả về.
+        Hỗ trợ ETag / If-None-Match: trang không đổi -> 304, không đọc dữ liệu.
+        """
+        if document not in DOCUMENT_MODELS:
+            return request.make_json_response({'error': 'Unknown document type'}, status=404)
+        Model = request.env[DOCUMENT_MODELS[document]]
+        try:
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return request.make_json_response({'error': 'Invalid limit'}, status=400)
+
+        field_names = [fname.strip() for fname in fields.split(',') if fname.strip()] if fields else []
+        field_names = list(dict.fromkeys(['id'] + (field_names or list(Model._api_default_fields))))
+        try:
+            Model._api_check_fields(field_names)
+            rows, next_cursor = Model._api_keyset_search(cursor=cursor, limit=limit)
+        except ValidationError as e:
+            return request.make_json_response({'error': e.args[0]}, status=400)
+
+        # ETag theo (User, trường, id + write_date của trang): đổi khi có bản ghi được ghi lại
+        etag = '"%s"' % hashlib.sha1(json.dumps([
+            request.env.uid,
+            field_names,
+            [(record_id, write_date.isoformat()) for record_id, write_date in rows],
+        ]).encode()).hexdigest()
+        headers = [('ETag', etag), ('Cache-Control', 'private, no-cache')]
+        if_none_match = request.httprequest.headers.get('If-None-Match', '')
+        if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+            return request.make_response('', headers=headers, status=304)
+
+        try:
+            records = Model.browse([record_id for record_id, _write_date in rows]).read(field_names)
+        except AccessError as e:
+            return request.make_json_response({'error': e.args[0]}, status=403)
+
+        return request.make_json_response(
+            {'records': records, 'next_cursor': next_cursor},
+            headers=headers,
+            status=200,
+        )
+
+    @http.route('/api/epr/requests', type='http', auth='bearer', methods=['POST'], csrf=False)
+    def create_requests(self, **kw):
+        """
+        Tạo nhiều PR (kèm dòng) trong 1 lần gọi: {"records": [{..., "line_ids": [{...}]}]}.
+        Tất cả hoặc không: lỗi ở 1 PR sẽ hủy cả lô.
+        """
+        # Chỉ nhận JSON: trình duyệt không gửi được content-type này cross-site nếu không qua CORS
+        if request.httprequest.mimetype != 'application/json':
+            return request.make_json_response({'error': 'Content-Type must be application/json'}, status=415)
+        try:
+            payload = request.get_json_data()
+        except ValueError:
+            return request.make_json_response({'error': 'Invalid JSON body'}, status=400)
+
+        records = payload.get('records') if isinstance(payload, dict) else None
+        if not isinstance(records, list) or not records:
+            return request.make_json_response({'error': 'Expected a non-empty "records" list'}, status=400)
+        if len(records) > MAX_PAGE_SIZE:
+            return request.make_json_response(
+                {'error': 'At most %s records per call' % MAX_PAGE_SIZE}, status=400)
+
+        try:
+            with request.env.cr.savepoint():
+                created = request.env['epr.purchase.request']._api_create(records)
+        except AccessError as e:
+            return request.make_json_response({'error': e.args[0]}, status=403)
+        except (UserError, ValidationError, ValueError) as e:
+            return request.make_json_response({'error': str(e.args[0]) if e.args else str(e)}, status=400)
+
+        return request.make_json_response(
+            {'records': created.read(['id', 'name', 'state', 'write_date'])},
+            status=201,
+        )
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """
+    Rule Manager nằm trong <data noupdate="1"> nên không tự cập nhật khi upgrade.
+    Chuyển domain sang bảng hiển thị tính sẵn (visible_user_ids).
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    rule = env.ref('epr.rule_epr_manager_approver', raise_if_not_found=False)
+    if rule:
+        rule.domain_force = "[('visible_user_ids', 'in', [user.id])]"
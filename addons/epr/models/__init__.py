@@ -1,5 +1,19 @@
+from . import epr_relation_count_mixin
+from . import epr_api_mixin
+from . import epr_deferred_tracking_mixin
+from . import epr_tracking_queue
 from . import epr_purchase_request
 from . import epr_rfq
 from . import epr_approval_rule
 from . import epr_approval_entry
-from . import epr_po
\ No newline at end of file
+from . import epr_approval_digest
+from . import epr_po
+from . import epr_vendor_price
+from . import res_partner
+from . import epr_vendor_match
+from . import epr_image_offload
+from . import epr_archive
+from . import epr_document_history
+from . import epr_lineage
+from . import epr_quote_comparison
+from . import epr_lead_time_report
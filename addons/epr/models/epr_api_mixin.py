@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo import models, api, Command, _
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+
+class EprApiMixin(models.AbstractModel):
+    """
+    Đọc / tạo chứng từ qua JSON API (controllers/main.py).
+    Phân trang keyset trên (write_date, id): mỗi trang là 1 range scan trên
+    index (write_date, id), không phụ thuộc vị trí trang như offset.
+    write_date là thời điểm bắt đầu transaction nên bản ghi của 1 transaction dài
+    có thể commit sau khi cursor đã vượt qua nó: mỗi lần đọc tiếp, khoảng
+    _api_cursor_window phía sau cursor được đọc lại (caller ghi đè theo id).
+    Mọi truy vấn chạy với env của User gọi API nên Record Rule vẫn áp dụng.
+    """
+    _name = 'epr.api.mixin'
+    _description = 'ePR JSON API Mixin'
+
+    # Trường trả về khi caller không truyền `fields`
+    _api_default_fields = ('id', 'write_date')
+    # Khoảng đọc lại phía sau cursor (lớn hơn thời gian tối đa của 1 transaction)
+    _api_cursor_window = timedelta(minutes=5)
+    # Trường được phép ghi khi tạo qua API; {tên One2many: trường được phép của dòng}
+    _api_create_fields = ()
+    _api_create_lines = {}
+
+    def init(self):
+        if self._abstract:
+            return
+        create_index(
+            self.env.cr,
+            '%s_write_date_id_index' % self._table,
+            self._table,
+            ['write_date', 'id'],
+        )
+
+    # ==========================================================================
+    # ĐỌC (KEYSET)
+    # ==========================================================================
+
+    @api.model
+    def _api_parse_cursor(self, cursor):
+        """'<write_date ISO>,<id>' -> (datetime, int); ValidationError nếu sai định dạng."""
+        try:
+            write_date, record_id = cursor.rsplit(',', 1)
+            return datetime.fromisoformat(write_date), int(record_id)
+        except ValueError:
+            raise ValidationError(_("Invalid cursor: %s", cursor))
+
+    @api.model
+    def _api_format_cursor(self, row):
+        """(id, write_date) -> '<write_date ISO>,<id>' (ngược với _api_parse_cursor)."""
+        record_id, write_date = row
+        return '%s,%s' % (write_date.isoformat(sep=' '), record_id)
+
+    @api.model
+    def _api_keyset_search(self, cursor=None, limit=80):
+        """
+        Id + write_date của trang tiếp theo sau `cursor`, theo (write_date, id) tăng dần.
+        So sánh theo row value trong SQL để giữ nguyên microsecond của write_date
+        (domain ORM sẽ cắt mất phần này và làm lệch trang).
+        Có `cursor`: thêm vào đầu trang các bản ghi trong _api_cursor_window phía
+        sau cursor, gần cursor nhất trước, để không bỏ sót bản ghi commit muộn; các
+        dòng này có thể đã trả về ở trang trước nên caller phải gộp theo id.
+        Cả trang không quá `limit` dòng: phần đọc lại chiếm tối đa 1 nửa, phần còn
+        lại dành cho bản ghi sau cursor nên trang luôn tiến lên.
+
+        :return: (list[(id, write_date)], next_cursor hoặc None nếu đã hết trang)
+        """
+        key = SQL(
+            "(%s, %s)",
+            SQL.identifier(self._table, 'write_date'),
+            SQL.identifier(self._table, 'id'),
+        )
+        late_rows = []
+        after = None
+        if cursor:
+            write_date, record_id = self._api_parse_cursor(cursor)
+            late_query = self._search([], order='write_date desc, id desc', limit=limit // 2)
+            late_query.add_where(SQL(
+                "%s <= (%s, %s) AND %s >= %s",
+                key, write_date, record_id,
+                SQL.identifier(self._table, 'write_date'), write_date - self._api_cursor_window,
+            ))
+            late_rows = self._api_execute_keyset(late_query)[::-1]
+            after = SQL("%s > (%s, %s)", key, write_date, record_id)
+
+        page_limit = limit - len(late_rows)
+        query = self._search([], order='write_date, id', limit=page_limit)
+        if after is not None:
+            query.add_where(after)
+        rows = self._api_execute_keyset(query)
+        next_cursor = self._api_format_cursor(rows[-1]) if len(rows) == page_limit else None
+        # Bỏ trùng theo id, giữ thứ tự (write_date, id)
+        rows = list({row[0]: row for row in late_rows + rows}.values())
+        return rows, next_cursor
+
+    @api.model
+    def _api_execute_keyset(self, query):
+        return self.env.execute_query(query.select(
+            SQL.identifier(self._table, 'id'),
+            SQL.identifier(self._table, 'write_date'),
+        ))
+
+    @api.model
+    def _api_check_fields(self, field_names):
+        unknown = [fname for fname in field_names if fname not in self._fields]
+        if unknown:
+            raise ValidationError(_("Unknown field(s): %s", ', '.join(unknown)))
+
+    # ==========================================================================
+    # TẠO HÀNG LOẠT
+    # ==========================================================================
+
+    @api.model
+    def _api_create(self, records):
+        """
+        Tạo nhiều chứng từ (kèm dòng con) bằng 1 lần create(vals_list).
+        Chỉ nhận các trường trong _api_create_fields / _api_create_lines.
+        """
+        vals_list = []
+        for index, data in enumerate(records):
+            if not isinstance(data, dict):
+                raise ValidationError(_("Record #%s must be a JSON object.", index))
+            allowed = set(self._api_create_fields) | set(self._api_create_lines)
+            unknown = sorted(set(data) - allowed)
+            if unknown:
+                raise ValidationError(_("Record #%(index)s: field(s) not allowed: %(fields)s",
+                                        index=index, fields=', '.join(unknown)))
+            vals = dict(data)
+            for fname, line_fields in self._api_create_lines.items():
+                lines = vals.get(fname) or []
+                if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+                    raise ValidationError(_("Record #%(index)s: %(field)s must be a list of objects.",
+                                            index=index, field=fname))
+                for line in lines:
+                    unknown = sorted(set(line) - set(line_fields))
+                    if unknown:
+                        raise ValidationError(_("Record #%(index)s: line field(s) not allowed: %(fields)s",
+                                                index=index, fields=', '.join(unknown)))
+                if fname in vals:
+                    vals[fname] = [Command.create(line) for line in lines]
+            vals_list.append(vals)
+        return self.create(vals_list)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, Command, _
+from odoo.tools import SQL
+
+
+class EprApprovalDigestItem(models.Model):
+    """
+    Digest thông báo phê duyệt: gom tất cả PR (approver_ids) và bước duyệt RFQ
+    (epr.approval.entry) đang chờ từng người duyệt, gửi 1 email tổng hợp
+    cho mỗi người mỗi lần cron chạy (chu kỳ = chu kỳ cron).
+
+    Mỗi dòng của model này = 1 mục đã được báo cho 1 người duyệt (chống gửi trùng),
+    theo thời điểm bắt đầu chờ duyệt: PR trình lại / bước duyệt được kích hoạt
+    lại có thời điểm mới nên được báo lại. Dòng bị xóa khi mục không còn chờ.
+    """
+    _name = 'epr.approval.digest.item'
+    _description = 'ePR Approval Digest Sent Item'
+    _log_access = False
+
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Approver',
+        required=True,
+        ondelete='cascade'
+    )
+
+    res_model = fields.Char(
+        string='Model',
+        required=True
+    )
+
+    res_id = fields.Many2oneReference(
+        string='Record ID',
+        model_field='res_model',
+        required=True
+    )
+
+    pending_since = fields.Datetime(
+        string='Pending Since'
+    )
+
+    _sql_constraints = [
+        ('user_item_uniq', 'unique (user_id, res_model, res_id, pending_since)',
+         'An item can only be notified once per approver.'),
+    ]
+
+    # ==========================================================================
+    # CRON
+    # ==========================================================================
+
+    @api.model
+    def _cron_send_digest(self):
+        """
+        1. Xóa các mục đã gửi nhưng không còn chờ duyệt.
+        2. Lấy các mục đang chờ mà chưa có trong bảng đã gửi, theo từng người duyệt
+           (1 query). Không lọc theo thời điểm bắt đầu chờ: mục chờ từ lâu nhưng
+           chưa được báo (tầng được kích hoạt muộn, commit trễ...) vẫn được gửi.
+        3. Tạo 1 mail.mail cho mỗi người duyệt (1 lần create), ghi nhận đã gửi.
+        """
+        self._prune_sent_items()
+        pending = self._get_new_pending_items()
+
+        mails = self.env['mail.mail']
+        if pending:
+            mails = self._create_digest_mails(pending)
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO epr_approval_digest_item (user_id, res_model, res_id, pending_since)
+                SELECT * FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::timestamp[])
+                ON CONFLICT DO NOTHING
+                """,
+                [user_id for user_id, items in pending.items() for _item in items],
+                [item['res_model'] for items in pending.values() for item in items],
+                [item['res_id'] for items in pending.values() for item in items],
+                [item['since'] for items in pending.values() for item in items],
+            ))
+        return mails
+
+    @api.model
+    def _get_pending_sql(self):
+        """Tất cả mục đang chờ duyệt theo người duyệt (PR + bước duyệt RFQ)."""
+        Request = self.env['epr.purchase.request']
+        Entry = self.env['epr.approval.entry']
+        Request.flush_model(['state', 'approver_ids', 'date_submitted', 'name', 'estimated_total'])
+        Entry.flush_model(['status', 'required_user_ids', 'name', 'rfq_id', 'sequence', 'approval_date'])
+        self.env['epr.rfq'].flush_model(['name', 'amount_total', 'currency_id'])
+        approvers = Request._fields['approver_ids']
+        required = Entry._fields['required_user_ids']
+        return SQL(
+            """
+            SELECT rel.%(pr_user)s AS user_id,
+                   'epr.purchase.request' AS res_model,
+                   pr.id AS res_id,
+                   pr.name AS name,
+                   pr.estimated_total AS amount,
+                   pr.currency_id AS currency_id,
+                   pr.date_submitted AS since,
+                   'epr.purchase.request' AS link_model,
+                   pr.id AS link_id
+              FROM epr_purchase_request pr
+              JOIN %(pr_rel)s rel ON rel.%(pr_col)s = pr.id
+             WHERE pr.state = 'to_approve'
+         UNION ALL
+            SELECT rel.%(entry_user)s,
+                   'epr.approval.entry',
+                   entry.id,
+                   rfq.name || ' - ' || entry.name,
+                   rfq.amount_total,
+                   rfq.currency_id,
+                   -- Chờ từ lúc tầng trước duyệt xong (tầng đầu: lúc tạo entry)
+                   COALESCE(previous.approval_date, entry.create_date),
+                   'epr.rfq',
+                   rfq.id
+              FROM epr_approval_entry entry
+              JOIN epr_rfq rfq ON rfq.id = entry.rfq_id
+              JOIN %(entry_rel)s rel ON rel.%(entry_col)s = entry.id
+         LEFT JOIN LATERAL (
+                   SELECT MAX(prev.approval_date) AS approval_date
+                     FROM epr_approval_entry prev
+                    WHERE prev.rfq_id = entry.rfq_id
+                      AND prev.sequence < entry.sequence
+                      AND prev.status = 'approved'
+                   ) previous ON TRUE
+             WHERE entry.status = 'new'
+            """,
+            pr_rel=SQL.identifier(approvers.relation),
+            pr_col=SQL.identifier(approvers.column1),
+            pr_user=SQL.identifier(approvers.column2),
+            entry_rel=SQL.identifier(required.relation),
+            entry_col=SQL.identifier(required.column1),
+            entry_user=SQL.identifier(required.column2),
+        )
+
+    @api.model
+    def _prune_sent_items(self):
+        """Quên các mục đã gửi nhưng không còn chờ duyệt (đã duyệt / từ chối / reset)."""
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM epr_approval_digest_item sent
+             WHERE NOT EXISTS (
+                   SELECT 1 FROM (%s) pending
+                    WHERE pending.user_id = sent.user_id
+                      AND pending.res_model = sent.res_model
+                      AND pending.res_id = sent.res_id
+                      AND pending.since IS NOT DISTINCT FROM sent.pending_since)
+            """,
+            self._get_pending_sql(),
+        ))
+
+    @api.model
+    def _get_new_pending_items(self):
+        """
+        Các mục chờ duyệt chưa gửi, gom theo người duyệt trong 1 query.
+        :return: dict {user_id: [dict(res_model, res_id, name, amount, currency_id,
+            since, link_model, link_id)]}
+        """
+        self.env.cr.execute(SQL(
+            """
+            SELECT pending.user_id,
+                   json_agg(json_build_object(
+                       'res_model', pending.res_model,
+                       'res_id', pending.res_id,
+                       'name', pending.name,
+                       'amount', pending.amount,
+                       'currency_id', pending.currency_id,
+                       'since', pending.since,
+                       'link_model', pending.link_model,
+                       'link_id', pending.link_id
+                   ) ORDER BY pending.since, pending.res_id)
+              FROM (%s) pending
+              JOIN res_users usr ON usr.id = pending.user_id AND usr.active
+         LEFT JOIN epr_approval_digest_item sent
+                ON sent.user_id = pending.user_id
+               AND sent.res_model = pending.res_model
+               AND sent.res_id = pending.res_id
+               AND sent.pending_since IS NOT DISTINCT FROM pending.since
+             WHERE sent.id IS NULL
+          GROUP BY pending.user_id
+            """,
+            self._get_pending_sql(),
+        ))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _create_digest_mails(self, pending):
+        """1 email tổng hợp cho mỗi người duyệt, tạo bằng 1 lần create."""
+        users = self.env['res.users'].sudo().browse(list(pending))
+        currencies = self.env['res.currency'].browse(list({
+            item['currency_id'] for items in pending.values() for item in items if item['currency_id']
+        }))
+        currency_by_id = {currency.id: currency for currency in currencies}
+        base_url = self.get_base_url()
+        email_from = self.env.company.partner_id.email_formatted or self.env.ref('base.partner_root').email_formatted
+
+        vals_list = []
+        for user in users:
+            items = pending[user.id]
+            for item in items:
+                # Bước duyệt RFQ: link mở thẳng RFQ
+                item['url'] = '%s/odoo/%s/%s' % (base_url, item['link_model'], item['link_id'])
+                item['currency'] = currency_by_id.get(item['currency_id'])
+            body = self.env['ir.qweb'].with_context(lang=user.lang)._render('epr.approval_digest_mail', {
+                'user': user,
+                'requests': [item for item in items if item['res_model'] == 'epr.purchase.request'],
+                'entries': [item for item in items if item['res_model'] == 'epr.approval.entry'],
+                'inbox_url': '%s/odoo/action-epr.action_epr_my_approvals' % base_url,
+            })
+            vals_list.append({
+                'subject': _('%s approval(s) waiting for you', len(items)),
+                'body_html': body,
+                'email_from': email_from,
+                'recipient_ids': [Command.link(user.partner_id.id)],
+                'auto_delete': True,
+            })
+        return self.env['mail.mail'].sudo().create(vals_list)
@@ -13,7 +13,8 @@ class EprApprovalEntry(models.Model):
         comodel_name='epr.rfq',
         string='RFQ Reference',
         ondelete='cascade',
-        required=True
+        required=True,
+        index=True
     )
 
     currency_id = fields.Many2one(
@@ -54,7 +55,8 @@ class EprApprovalEntry(models.Model):
         string='Status',
         default='new',
         required=True,
-        readonly=True
+        readonly=True,
+        index=True
     )
 
     # Ai cần duyệt (Copy từ Rule sang)
@@ -81,8 +83,10 @@ class EprApprovalEntry(models.Model):
     )
 
     # Logic UI: Cho phép nút Duyệt hiện hay ẩn
+    # search: biên dịch thẳng sang SQL (status = 'new' + bảng required_user_ids)
     can_approve = fields.Boolean(
-        compute='_compute_can_approve'
+        compute='_compute_can_approve',
+        search='_search_can_approve'
     )
 
     @api.depends('status', 'required_user_ids')
@@ -97,13 +101,61 @@ class EprApprovalEntry(models.Model):
             else:
                 entry.can_approve = False
 
+    def _search_can_approve(self, operator, value):
+        if operator not in ('=', '!='):
+            raise UserError(_("Unsupported search operator on 'can_approve': %s", operator))
+
+        if (operator == '=') == bool(value):
+            return [('status', '=', 'new'), ('required_user_ids', 'in', [self.env.uid])]
+        return ['|', ('status', '!=', 'new'), ('required_user_ids', 'not in', [self.env.uid])]
+
+    # =========================================================================
+    # INBOX
+    # =========================================================================
+    @api.model
+    def _get_approval_inbox(self, limit=80, offset=0):
+        """
+        Danh sách các bước đang chờ User hiện tại duyệt (phân trang).
+        Số query cố định: count + entries + RFQs + vendors, không phụ thuộc
+        vào số dòng trả về.
+        """
+        domain = [('can_approve', '=', True)]
+        total = self.search_count(domain)
+        entries = self.search_fetch(
+            domain, ['rfq_id', 'name', 'sequence', 'create_date'],
+            limit=limit, offset=offset, order='create_date, id'
+        )
+        rfqs = entries.rfq_id
+        rfqs.fetch(['name', 'partner_id', 'amount_total', 'currency_id'])
+        rfqs.partner_id.fetch(['name'])
+        rfqs.currency_id.fetch(['name'])
+
+        return {
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'items': [{
+                'id': entry.id,
+                'step': entry.name,
+                'sequence': entry.sequence,
+                'requested_date': fields.Datetime.to_string(entry.create_date),
+                'rfq_id': entry.rfq_id.id,
+                'rfq_name': entry.rfq_id.name,
+                'vendor': entry.rfq_id.partner_id.name,
+                'amount_total': entry.rfq_id.amount_total,
+                'currency': entry.rfq_id.currency_id.name,
+            } for entry in entries],
+        }
+
     # =========================================================================
     # ACTIONS
     # =========================================================================
     def action_approve_line(self):
-        """User bấm nút Approve trên dòng"""
-        self.ensure_one()
-        if not self.can_approve:
+        """
+        User bấm nút Approve trên dòng.
+        Có thể duyệt nhiều dòng (nhiều RFQ) cùng lúc từ List View.
+        """
+        if not all(entry.can_approve for entry in self):
             raise UserError(_("You are not authorized to approve this step or it is not ready."))
 
         self.write({
@@ -112,8 +164,9 @@ class EprApprovalEntry(models.Model):
             'approval_date': fields.Datetime.now()
         })
 
-        # Trigger kiểm tra xem RFQ đã được duyệt hoàn toàn chưa
-        self.rfq_id._check_approval_completion()
+        # Trigger kiểm tra xem các RFQ đã được duyệt hoàn toàn chưa
+        # (chạy sau commit, tuần tự theo advisory lock của từng RFQ)
+        self.rfq_id._schedule_approval_completion()
 
     def action_reject_line(self):
         """User bấm nút Refuse - Mở wizard để nhập lý do"""
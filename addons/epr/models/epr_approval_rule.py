@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from bisect import bisect_right
+from collections import namedtuple
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
+# Snapshot bất biến của 1 bước duyệt (lưu trong ormcache, không giữ recordset)
+ApprovalStep = namedtuple(
+    'ApprovalStep', ['min_amount', 'sequence', 'line_id', 'name', 'user_ids']
+)
+
 
 class EprApprovalRule(models.Model):
     _name = 'epr.approval.rule'
@@ -45,6 +53,81 @@ class EprApprovalRule(models.Model):
         string='Approval Steps'
     )
 
+    # -------------------------------------------------------------------------
+    # CRUD: Xóa cache resolver khi Rule thay đổi
+    # -------------------------------------------------------------------------
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    # -------------------------------------------------------------------------
+    # RESOLVER
+    # -------------------------------------------------------------------------
+    @api.model
+    @tools.ormcache('company_id', 'department_id')
+    def _get_compiled_steps(self, company_id, department_id):
+        """
+        Biên dịch Rule đang active cho cặp (company, department).
+        Ưu tiên Rule riêng của phòng ban, sau đó tới Rule chung (không có phòng ban).
+
+        :return: (rule_id, min_amounts, steps) với steps sắp xếp theo min_amount
+            và min_amounts là khóa tương ứng dùng cho bisect.
+        """
+        rules = self.sudo().with_context(active_test=True).search([
+            ('company_id', '=', company_id),
+            '|', ('department_id', '=', False), ('department_id', '=', department_id)
+        ])
+        if not rules:
+            return (False, (), ())
+
+        rule = rules.sorted(
+            lambda r: (not r.department_id, r.sequence, -r.id)
+        )[0]
+
+        steps = sorted(
+            (
+                ApprovalStep(
+                    # Bước không có ngưỡng tiền luôn được áp dụng
+                    line.min_amount or float('-inf'),
+                    line.sequence,
+                    line.id,
+                    line.name,
+                    tuple(line.user_ids.ids),
+                )
+                for line in rule.line_ids
+            ),
+            key=lambda step: (step.min_amount, step.sequence, step.line_id)
+        )
+        return (
+            rule.id,
+            tuple(step.min_amount for step in steps),
+            tuple(steps),
+        )
+
+    @api.model
+    def _resolve_steps(self, company_id, department_id, amount):
+        """
+        Trả về (rule_id, steps) áp dụng cho số tiền `amount` (tiền tệ công ty),
+        steps đã sắp xếp theo sequence. rule_id = False nếu không có Rule nào.
+        """
+        rule_id, min_amounts, steps = self._get_compiled_steps(
+            company_id, department_id or False
+        )
+        applicable = steps[:bisect_right(min_amounts, amount)]
+        return rule_id, sorted(applicable, key=lambda step: (step.sequence, step.line_id))
+
 
 class EprApprovalRuleLine(models.Model):
     _name = 'epr.approval.rule.line'
@@ -89,3 +172,19 @@ class EprApprovalRuleLine(models.Model):
         ('any', 'Any User'),
         ('all', 'All Users')
     ], string='Approval Type', default='any', required=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
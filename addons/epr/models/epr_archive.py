@@ -0,0 +1,802 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Tuổi tối thiểu (ngày, tính từ lần sửa cuối) để chuyển chứng từ đã đóng vào kho lưu trữ
+ARCHIVE_AGE_PARAM = 'epr.archive.age_days'
+ARCHIVE_AGE_DAYS = 365
+
+# Số chứng từ mỗi lô (mỗi lô commit riêng)
+ARCHIVE_BATCH_SIZE = 500
+
+PR_CLOSED_STATES = ('done', 'rejected', 'cancel')
+RFQ_CLOSED_STATES = ('confirmed', 'rejected', 'cancel')
+
+# Cột được chép sang bảng lưu trữ: (tên cột, kiểu). Giữ nguyên id của chứng từ gốc.
+LOG_ACCESS_COLUMNS = [
+    ('create_uid', 'integer'),
+    ('create_date', 'timestamp'),
+    ('write_uid', 'integer'),
+    ('write_date', 'timestamp'),
+]
+
+PR_COLUMNS = [
+    ('id', 'integer NOT NULL'),
+    ('name', 'varchar'),
+    ('employee_id', 'integer'),
+    ('department_id', 'integer'),
+    ('date_required', 'date'),
+    ('priority', 'varchar'),
+    ('state', 'varchar'),
+    ('currency_id', 'integer'),
+    ('estimated_total', 'numeric'),
+    ('rejection_reason', 'text'),
+    ('date_submitted', 'timestamp'),
+    ('date_approved', 'timestamp'),
+    ('approved_by_id', 'integer'),
+    ('date_rejected', 'timestamp'),
+    ('rejected_by_id', 'integer'),
+] + LOG_ACCESS_COLUMNS
+
+PR_LINE_COLUMNS = [
+    ('id', 'integer NOT NULL'),
+    ('request_id', 'integer'),
+    ('currency_id', 'integer'),
+    ('product_id', 'integer'),
+    ('name', 'varchar'),
+    ('uom_name', 'varchar'),
+    ('product_description', 'text'),
+    ('user_vendor_id', 'integer'),
+    ('suggested_vendor_name', 'varchar'),
+    ('final_vendor_id', 'integer'),
+    ('quantity', 'numeric'),
+    ('estimated_price', 'numeric'),
+    ('subtotal_estimated', 'numeric'),
+] + LOG_ACCESS_COLUMNS
+
+RFQ_COLUMNS = [
+    ('id', 'integer NOT NULL'),
+    ('name', 'varchar'),
+    ('state', 'varchar'),
+    ('approval_state', 'varchar'),
+    ('partner_id', 'integer'),
+    ('company_id', 'integer'),
+    ('currency_id', 'integer'),
+    ('department_id', 'integer'),
+    ('date_order', 'timestamp'),
+    ('date_deadline', 'date'),
+    ('amount_total', 'numeric'),
+    ('rejection_reason', 'text'),
+] + LOG_ACCESS_COLUMNS
+
+RFQ_LINE_COLUMNS = [
+    ('id', 'integer NOT NULL'),
+    ('rfq_id', 'integer'),
+    ('pr_line_id', 'integer'),
+    ('purchase_request_id', 'integer'),
+    ('product_id', 'integer'),
+    ('description', 'text'),
+    ('quantity', 'numeric'),
+    ('uom_id', 'integer'),
+    ('price_unit', 'numeric'),
+    ('currency_id', 'integer'),
+    ('subtotal', 'numeric'),
+    ('purchase_line_id', 'integer'),
+] + LOG_ACCESS_COLUMNS
+
+ENTRY_COLUMNS = [
+    ('id', 'integer PRIMARY KEY'),
+    ('rfq_id', 'integer'),
+    ('name', 'varchar'),
+    ('sequence', 'integer'),
+    ('status', 'varchar'),
+    ('actual_user_id', 'integer'),
+    ('approval_date', 'timestamp'),
+    ('rejection_reason', 'text'),
+] + LOG_ACCESS_COLUMNS
+
+
+# ==============================================================================
+# SQL HELPERS
+# ==============================================================================
+
+def _create_archive_table(cr, table, columns, index_columns=(), partitioned=True):
+    """
+    Bảng lưu trữ, phân vùng theo năm của create_date (partition theo năm được tạo
+    khi cần, partition DEFAULT nhận dòng không có create_date). Có thể detach /
+    drop cả năm cũ mà không đụng tới bảng đang dùng.
+    """
+    definition = SQL(', '.join('%s %s' % column for column in columns))
+    if partitioned:
+        definition = SQL('%s, date_archived timestamp', definition)
+    cr.execute(SQL(
+        "CREATE TABLE IF NOT EXISTS %s (%s)%s",
+        SQL.identifier(table),
+        definition,
+        SQL(' PARTITION BY RANGE (create_date)') if partitioned else SQL(),
+    ))
+    if partitioned:
+        cr.execute(SQL(
+            "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s DEFAULT",
+            SQL.identifier('%s_default' % table), SQL.identifier(table),
+        ))
+    for column in index_columns:
+        cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (%s)",
+            SQL.identifier('%s_%s_idx' % (table, column)), SQL.identifier(table), SQL.identifier(column),
+        ))
+
+
+def _create_archive_relation(cr, table, column1, column2):
+    cr.execute(SQL(
+        """
+        CREATE TABLE IF NOT EXISTS %(table)s (
+            %(column1)s integer NOT NULL,
+            %(column2)s integer NOT NULL,
+            PRIMARY KEY (%(column1)s, %(column2)s)
+        );
+        CREATE INDEX IF NOT EXISTS %(index)s ON %(table)s (%(column2)s, %(column1)s)
+        """,
+        table=SQL.identifier(table),
+        column1=SQL.identifier(column1),
+        column2=SQL.identifier(column2),
+        index=SQL.identifier('%s_%s_idx' % (table, column2)),
+    ))
+
+
+def _copy_rows(cr, source, archive, columns, key, ids, partitioned=True):
+    """Chép các dòng `source` có `key` thuộc `ids` sang bảng lưu trữ (1 câu INSERT ... SELECT)."""
+    if partitioned:
+        cr.execute(SQL(
+            """
+            SELECT DISTINCT date_part('year', create_date)::integer
+              FROM %s WHERE %s = ANY(%s) AND create_date IS NOT NULL
+            """,
+            SQL.identifier(source), SQL.identifier(key), ids,
+        ))
+        for (year,) in cr.fetchall():
+            cr.execute(SQL(
+                "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM (%s) TO (%s)",
+                SQL.identifier('%s_y%s' % (archive, year)), SQL.identifier(archive),
+                '%s-01-01' % year, '%s-01-01' % (year + 1),
+            ))
+    names = SQL(', '.join(name for name, _type in columns))
+    cr.execute(SQL(
+        "INSERT INTO %s (%s%s) SELECT %s%s FROM %s WHERE %s = ANY(%s)",
+        SQL.identifier(archive), names, SQL(', date_archived') if partitioned else SQL(),
+        names, SQL(", (now() at time zone 'UTC')") if partitioned else SQL(),
+        SQL.identifier(source), SQL.identifier(key), ids,
+    ))
+
+
+def _copy_relation(cr, source, archive, column1, column2, ids):
+    """Chép các dòng quan hệ có `column1` thuộc `ids`; trả về các id ở `column2`."""
+    cr.execute(SQL(
+        """
+        INSERT INTO %(archive)s (%(column1)s, %(column2)s)
+        SELECT %(column1)s, %(column2)s FROM %(source)s WHERE %(column1)s = ANY(%(ids)s)
+        ON CONFLICT DO NOTHING
+        """,
+        archive=SQL.identifier(archive),
+        source=SQL.identifier(source),
+        column1=SQL.identifier(column1),
+        column2=SQL.identifier(column2),
+        ids=ids,
+    ))
+    cr.execute(SQL(
+        "SELECT DISTINCT %s FROM %s WHERE %s = ANY(%s)",
+        SQL.identifier(column2), SQL.identifier(source), SQL.identifier(column1), ids,
+    ))
+    return [row[0] for row in cr.fetchall()]
+
+
+def _move_document_links(cr, model, archive_model, ids):
+    """
+    Chuyển chatter, follower, file đính kèm, external id và hàng đợi tracking
+    sang model lưu trữ (id giữ nguyên); xóa activity còn treo.
+    """
+    for table, column in (
+        ('mail_message', 'model'),
+        ('mail_followers', 'res_model'),
+        ('ir_attachment', 'res_model'),
+        ('ir_model_data', 'model'),
+        ('epr_tracking_queue', 'res_model'),
+    ):
+        cr.execute(SQL(
+            "UPDATE %(table)s SET %(column)s = %(archive)s WHERE %(column)s = %(model)s AND res_id = ANY(%(ids)s)",
+            table=SQL.identifier(table),
+            column=SQL.identifier(column),
+            archive=archive_model,
+            model=model,
+            ids=ids,
+        ))
+    cr.execute(
+        "DELETE FROM mail_activity WHERE res_model = %s AND res_id = ANY(%s)", (model, ids)
+    )
+
+
+# ==============================================================================
+# ARCHIVE MODELS (chỉ đọc)
+# ==============================================================================
+
+
+class EprPurchaseRequestArchive(models.Model):
+    """
+    PR đã đóng (Done / Rejected / Cancelled) được chuyển khỏi bảng đang dùng.
+    Model chỉ đọc trên bảng phân vùng theo năm; id giữ nguyên như PR gốc.
+    Cron _cron_archive_documents điều phối việc chuyển cả PR và RFQ.
+    """
+    _name = 'epr.purchase.request.archive'
+    _description = 'ePR Archived Purchase Request'
+    _inherit = ['mail.thread']
+    _auto = False
+    _log_access = True
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Request Reference',
+        readonly=True
+    )
+
+    employee_id = fields.Many2one(
+        comodel_name='hr.employee',
+        string='Employee',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    date_required = fields.Date(
+        string='Date Required',
+        readonly=True
+    )
+
+    priority = fields.Selection(
+        selection=lambda self: self.env['epr.purchase.request']._fields['priority'].selection,
+        string='Priority',
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['epr.purchase.request']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    estimated_total = fields.Monetary(
+        string='Estimated Total',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    rejection_reason = fields.Text(
+        string='Rejection Reason',
+        readonly=True
+    )
+
+    date_submitted = fields.Datetime(
+        string='Submitted Date',
+        readonly=True
+    )
+
+    date_approved = fields.Datetime(
+        string='Approved Date',
+        readonly=True
+    )
+
+    approved_by_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Approved By',
+        readonly=True
+    )
+
+    date_rejected = fields.Datetime(
+        string='Rejected Date',
+        readonly=True
+    )
+
+    rejected_by_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Rejected By',
+        readonly=True
+    )
+
+    date_archived = fields.Datetime(
+        string='Archived On',
+        readonly=True
+    )
+
+    line_ids = fields.One2many(
+        comodel_name='epr.purchase.request.line.archive',
+        inverse_name='request_id',
+        string='Products',
+        readonly=True
+    )
+
+    rfq_ids = fields.Many2many(
+        comodel_name='epr.rfq.archive',
+        relation='epr_rfq_purchase_request_rel_archive',
+        column1='request_id',
+        column2='rfq_id',
+        string='RFQs',
+        readonly=True
+    )
+
+    purchase_ids = fields.Many2many(
+        comodel_name='purchase.order',
+        relation='epr_pr_purchase_order_rel_archive',
+        column1='epr_pr_id',
+        column2='purchase_id',
+        string='Purchase Orders',
+        readonly=True
+    )
+
+    # Bảng hiển thị chép từ PR gốc: Record Rule của Manager giữ nguyên cách lọc
+    visible_user_ids = fields.Many2many(
+        comodel_name='res.users',
+        relation='epr_purchase_request_visibility_rel_archive',
+        column1='request_id',
+        column2='user_id',
+        string='Visible To',
+        readonly=True
+    )
+
+    def init(self):
+        cr = self.env.cr
+        _create_archive_table(cr, 'epr_purchase_request_archive', PR_COLUMNS,
+                              ['id', 'employee_id', 'department_id'])
+        _create_archive_relation(cr, 'epr_purchase_request_visibility_rel_archive', 'request_id', 'user_id')
+        _create_archive_relation(cr, 'epr_rfq_purchase_request_rel_archive', 'rfq_id', 'request_id')
+        _create_archive_relation(cr, 'epr_pr_purchase_order_rel_archive', 'epr_pr_id', 'purchase_id')
+
+    # ==========================================================================
+    # ARCHIVAL
+    # ==========================================================================
+
+    @api.model
+    def _cron_archive_documents(self, batch_size=ARCHIVE_BATCH_SIZE):
+        """
+        Chuyển chứng từ đã đóng, không sửa trong `epr.archive.age_days` ngày,
+        theo lô (commit sau mỗi lô). RFQ chạy trước để dòng RFQ còn giữ được
+        liên kết tới dòng PR khi chép; PR chỉ được chuyển khi không còn RFQ
+        nào trong bảng đang dùng.
+        """
+        age = int(self.env['ir.config_parameter'].sudo().get_param(ARCHIVE_AGE_PARAM, ARCHIVE_AGE_DAYS))
+        cutoff = fields.Datetime.now() - timedelta(days=age)
+        commit = not self.env.registry.in_test_mode()
+
+        for archive in (self.env['epr.rfq.archive'], self):
+            while True:
+                self.env.flush_all()
+                ids = archive._get_archivable_ids(cutoff, batch_size)
+                if not ids:
+                    break
+                archive._archive_documents(ids)
+                if commit:
+                    self.env.cr.commit()
+
+    @api.model
+    def _get_archivable_ids(self, cutoff, limit):
+        self.env.cr.execute("""
+            SELECT pr.id
+              FROM epr_purchase_request pr
+             WHERE pr.state IN %s
+               AND pr.write_date < %s
+               AND NOT EXISTS (SELECT 1 FROM epr_rfq_purchase_request_rel rel WHERE rel.request_id = pr.id)
+          ORDER BY pr.id
+             LIMIT %s
+        """, (PR_CLOSED_STATES, cutoff, limit))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _archive_documents(self, ids):
+        """Chép PR + dòng + bảng quan hệ sang bảng lưu trữ rồi xóa khỏi bảng đang dùng."""
+        cr = self.env.cr
+        _copy_rows(cr, 'epr_purchase_request', 'epr_purchase_request_archive', PR_COLUMNS, 'id', ids)
+        _copy_rows(cr, 'epr_purchase_request_line', 'epr_purchase_request_line_archive',
+                   PR_LINE_COLUMNS, 'request_id', ids)
+        _copy_relation(cr, 'epr_purchase_request_visibility_rel',
+                       'epr_purchase_request_visibility_rel_archive', 'request_id', 'user_id', ids)
+        po_ids = _copy_relation(cr, 'epr_pr_purchase_order_rel',
+                                'epr_pr_purchase_order_rel_archive', 'epr_pr_id', 'purchase_id', ids)
+
+        cr.execute("SELECT id FROM epr_purchase_request_line WHERE request_id = ANY(%s)", (ids,))
+        line_ids = [row[0] for row in cr.fetchall()]
+        _move_document_links(cr, 'epr.purchase.request', self._name, ids)
+        _move_document_links(cr, 'epr.purchase.request.line', 'epr.purchase.request.line.archive', line_ids)
+
+        # Dòng và bảng quan hệ bị xóa theo ON DELETE CASCADE (đã chép ở trên);
+        # báo cáo lead time và bảng truy vết không có FK tới PR nên được giữ nguyên
+        cr.execute("DELETE FROM epr_purchase_request WHERE id = ANY(%s)", (ids,))
+        self.env.invalidate_all()
+        self.env['purchase.order'].browse(po_ids).exists().modified(['epr_source_pr_ids'])
+
+
+class EprPurchaseRequestLineArchive(models.Model):
+    _name = 'epr.purchase.request.line.archive'
+    _description = 'ePR Archived Purchase Request Line'
+    _auto = False
+    _log_access = True
+    _order = 'request_id, id'
+
+    request_id = fields.Many2one(
+        comodel_name='epr.purchase.request.archive',
+        string='Purchase Request',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        readonly=True
+    )
+
+    name = fields.Char(
+        string='Product Name',
+        readonly=True
+    )
+
+    uom_name = fields.Char(
+        string='Unit of Measure',
+        readonly=True
+    )
+
+    # Đã được sanitize khi ghi vào bảng gốc
+    product_description = fields.Html(
+        string='Product Description',
+        sanitize=False,
+        readonly=True
+    )
+
+    user_vendor_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Approved Vendor',
+        readonly=True
+    )
+
+    suggested_vendor_name = fields.Char(
+        string='Suggested Vendor Name',
+        readonly=True
+    )
+
+    final_vendor_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Final Vendor',
+        readonly=True
+    )
+
+    quantity = fields.Float(
+        string='Quantity',
+        digits='Product Unit of Measure',
+        readonly=True
+    )
+
+    estimated_price = fields.Monetary(
+        string='Estimated Unit Price',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    subtotal_estimated = fields.Monetary(
+        string='Estimated Subtotal',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    def init(self):
+        _create_archive_table(self.env.cr, 'epr_purchase_request_line_archive', PR_LINE_COLUMNS,
+                              ['id', 'request_id'])
+
+
+class EprRfqArchive(models.Model):
+    """RFQ đã đóng (Confirmed / Rejected / Cancelled), chỉ đọc, kèm dòng và các bước duyệt."""
+    _name = 'epr.rfq.archive'
+    _description = 'ePR Archived RFQ'
+    _inherit = ['mail.thread']
+    _auto = False
+    _log_access = True
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='RFQ Reference',
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['epr.rfq']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    approval_state = fields.Selection(
+        selection=lambda self: self.env['epr.rfq']._fields['approval_state'].selection,
+        string='Approval Matrix Status',
+        readonly=True
+    )
+
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Vendor',
+        readonly=True
+    )
+
+    company_id = fields.Many2one(
+        comodel_name='res.company',
+        string='Company',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    date_order = fields.Datetime(
+        string='Order Date',
+        readonly=True
+    )
+
+    date_deadline = fields.Date(
+        string='Bid Deadline',
+        readonly=True
+    )
+
+    amount_total = fields.Monetary(
+        string='Total',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    rejection_reason = fields.Text(
+        string='Rejection Reason',
+        readonly=True
+    )
+
+    date_archived = fields.Datetime(
+        string='Archived On',
+        readonly=True
+    )
+
+    line_ids = fields.One2many(
+        comodel_name='epr.rfq.line.archive',
+        inverse_name='rfq_id',
+        string='Products',
+        readonly=True
+    )
+
+    approval_entry_ids = fields.One2many(
+        comodel_name='epr.approval.entry.archive',
+        inverse_name='rfq_id',
+        string='Approval Steps',
+        readonly=True
+    )
+
+    request_ids = fields.Many2many(
+        comodel_name='epr.purchase.request.archive',
+        relation='epr_rfq_purchase_request_rel_archive',
+        column1='rfq_id',
+        column2='request_id',
+        string='Source Requests',
+        readonly=True
+    )
+
+    purchase_ids = fields.Many2many(
+        comodel_name='purchase.order',
+        relation='epr_rfq_purchase_order_rel_archive',
+        column1='epr_rfq_id',
+        column2='purchase_id',
+        string='Purchase Orders',
+        readonly=True
+    )
+
+    def init(self):
+        cr = self.env.cr
+        _create_archive_table(cr, 'epr_rfq_archive', RFQ_COLUMNS, ['id', 'partner_id'])
+        _create_archive_relation(cr, 'epr_rfq_purchase_order_rel_archive', 'epr_rfq_id', 'purchase_id')
+
+    @api.model
+    def _get_archivable_ids(self, cutoff, limit):
+        """RFQ đã đóng mà mọi PR nguồn còn trong bảng đang dùng cũng đã đóng đủ lâu."""
+        self.env.cr.execute("""
+            SELECT rfq.id
+              FROM epr_rfq rfq
+             WHERE rfq.state IN %(rfq_closed)s
+               AND rfq.write_date < %(cutoff)s
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM epr_rfq_purchase_request_rel rel
+                     JOIN epr_purchase_request pr ON pr.id = rel.request_id
+                    WHERE rel.rfq_id = rfq.id
+                      AND NOT (pr.state IN %(pr_closed)s AND pr.write_date < %(cutoff)s))
+          ORDER BY rfq.id
+             LIMIT %(limit)s
+        """, {
+            'rfq_closed': RFQ_CLOSED_STATES,
+            'pr_closed': PR_CLOSED_STATES,
+            'cutoff': cutoff,
+            'limit': limit,
+        })
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _archive_documents(self, ids):
+        """Chép RFQ + dòng + bước duyệt + bảng quan hệ sang bảng lưu trữ rồi xóa khỏi bảng đang dùng."""
+        cr = self.env.cr
+        _copy_rows(cr, 'epr_rfq', 'epr_rfq_archive', RFQ_COLUMNS, 'id', ids)
+        _copy_rows(cr, 'epr_rfq_line', 'epr_rfq_line_archive', RFQ_LINE_COLUMNS, 'rfq_id', ids)
+        _copy_rows(cr, 'epr_approval_entry', 'epr_approval_entry_archive', ENTRY_COLUMNS, 'rfq_id', ids,
+                   partitioned=False)
+        request_ids = _copy_relation(cr, 'epr_rfq_purchase_request_rel',
+                                     'epr_rfq_purchase_request_rel_archive', 'rfq_id', 'request_id', ids)
+        po_ids = _copy_relation(cr, 'epr_rfq_purchase_order_rel',
+                                'epr_rfq_purchase_order_rel_archive', 'epr_rfq_id', 'purchase_id', ids)
+        _move_document_links(cr, 'epr.rfq', self._name, ids)
+
+        # Dòng PO trỏ tới dòng RFQ bằng FK ON DELETE SET NULL: chuyển liên kết sang
+        # dòng lưu trữ (cùng id) trước khi xóa để dòng PO vẫn biết dòng RFQ nguồn
+        cr.execute("""
+            UPDATE purchase_order_line po_line
+               SET epr_rfq_line_archive_id = po_line.epr_rfq_line_id
+              FROM epr_rfq_line line
+             WHERE line.id = po_line.epr_rfq_line_id
+               AND line.rfq_id = ANY(%s)
+        """, (ids,))
+
+        # Bước duyệt được đọc lại từ bảng lưu trữ cho thống kê lead time; bảng truy vết giữ nguyên
+        cr.execute("DELETE FROM epr_rfq WHERE id = ANY(%s)", (ids,))
+        self.env.invalidate_all()
+        # PR nguồn (đã đóng, chờ được chuyển ở bước sau) và PO: cập nhật số đếm đã lưu
+        self.env['epr.purchase.request'].browse(request_ids).exists().modified(['rfq_ids'])
+        self.env['purchase.order'].browse(po_ids).exists().modified(['epr_source_rfq_ids'])
+
+
+class EprRfqLineArchive(models.Model):
+    _name = 'epr.rfq.line.archive'
+    _description = 'ePR Archived RFQ Line'
+    _auto = False
+    _log_access = True
+    _order = 'rfq_id, id'
+
+    rfq_id = fields.Many2one(
+        comodel_name='epr.rfq.archive',
+        string='RFQ Reference',
+        readonly=True
+    )
+
+    # Dòng PR gốc có thể vẫn còn trong bảng đang dùng hoặc đã được lưu trữ
+    pr_line_id = fields.Many2one(
+        comodel_name='epr.purchase.request.line.archive',
+        string='Source PR Line',
+        readonly=True
+    )
+
+    purchase_request_id = fields.Many2one(
+        comodel_name='epr.purchase.request.archive',
+        string='Purchase Request',
+        readonly=True
+    )
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        readonly=True
+    )
+
+    description = fields.Text(
+        string='Description',
+        readonly=True
+    )
+
+    quantity = fields.Float(
+        string='Quantity',
+        digits='Product Unit of Measure',
+        readonly=True
+    )
+
+    uom_id = fields.Many2one(
+        comodel_name='uom.uom',
+        string='UoM',
+        readonly=True
+    )
+
+    price_unit = fields.Float(
+        string='Unit Price',
+        digits='Product Price',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    subtotal = fields.Monetary(
+        string='Subtotal',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    purchase_line_id = fields.Many2one(
+        comodel_name='purchase.order.line',
+        string='Purchase Order Line',
+        readonly=True
+    )
+
+    def init(self):
+        _create_archive_table(self.env.cr, 'epr_rfq_line_archive', RFQ_LINE_COLUMNS, ['id', 'rfq_id'])
+
+
+class EprApprovalEntryArchive(models.Model):
+    _name = 'epr.approval.entry.archive'
+    _description = 'ePR Archived Approval Entry'
+    _auto = False
+    _log_access = True
+    _order = 'sequence, id'
+
+    rfq_id = fields.Many2one(
+        comodel_name='epr.rfq.archive',
+        string='RFQ Reference',
+        readonly=True
+    )
+
+    name = fields.Char(
+        string='Step Name',
+        readonly=True
+    )
+
+    sequence = fields.Integer(
+        string='Step Sequence',
+        readonly=True
+    )
+
+    status = fields.Selection(
+        selection=lambda self: self.env['epr.approval.entry']._fields['status'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    actual_user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Approved By',
+        readonly=True
+    )
+
+    approval_date = fields.Datetime(
+        string='Date',
+        readonly=True
+    )
+
+    rejection_reason = fields.Text(
+        string='Reason',
+        readonly=True
+    )
+
+    def init(self):
+        _create_archive_table(self.env.cr, 'epr_approval_entry_archive', ENTRY_COLUMNS, ['rfq_id'],
+                              partitioned=False)
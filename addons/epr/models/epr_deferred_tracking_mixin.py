@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+# System Parameter bật chế độ ghi chatter tracking trễ (cron ghi theo lô)
+DEFERRED_TRACKING_PARAM = 'epr.deferred_tracking'
+
+
+class EprDeferredTrackingMixin(models.AbstractModel):
+    """
+    Tracking trễ cho các model mail.thread của ePR.
+
+    Khi System Parameter `epr.deferred_tracking` bật, thay đổi của các field
+    tracking=True không được ghi thành mail.message / mail.tracking.value ngay
+    trong transaction của người dùng, mà chỉ được đẩy vào bảng hàng đợi
+    epr.tracking.queue (1 INSERT cho cả recordset). Cron ghi chatter theo lô.
+
+    Phải đặt TRƯỚC 'mail.thread' trong _inherit để override _track_finalize.
+    """
+    _name = 'epr.deferred.tracking.mixin'
+    _description = 'ePR Deferred Tracking Mixin'
+
+    def _track_finalize(self):
+        if not self.env['epr.tracking.queue']._is_deferred_tracking_enabled():
+            return super()._track_finalize()
+
+        initial_values = self.env.cr.precommit.data.pop(f'mail.tracking.{self._name}', {})
+        ids = [id_ for id_, vals in initial_values.items() if vals]
+        if not ids:
+            return
+
+        Queue = self.env['epr.tracking.queue']
+        author_id = self.env.user.partner_id.id
+        now = fields.Datetime.now()
+        vals_list = []
+        for record in self.browse(ids).sudo().exists():
+            changes = {}
+            for fname, initial_value in initial_values[record.id].items():
+                new_value = record[fname]
+                if new_value == initial_value or (not new_value and not initial_value):
+                    continue
+                field = record._fields[fname]
+                changes[fname] = [
+                    Queue._serialize_value(field, initial_value),
+                    Queue._serialize_value(field, new_value),
+                ]
+            if changes:
+                vals_list.append({
+                    'res_model': self._name,
+                    'res_id': record.id,
+                    'author_id': author_id,
+                    'date': now,
+                    'changes': changes,
+                })
+        if vals_list:
+            Queue.sudo().create(vals_list)
+        # Hàm chạy sau flush chính, ngay trước commit: flush lại hàng đợi
+        self.env.flush_all()
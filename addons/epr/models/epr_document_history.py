@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, tools
+
+
+class EprDocumentHistoryMixin(models.AbstractModel):
+    """
+    Tìm kiếm "kể cả đã lưu trữ": view SQL gộp (UNION ALL) bảng đang dùng và
+    bảng lưu trữ của 1 loại chứng từ. Id không trùng nhau vì chứng từ lưu trữ
+    giữ nguyên id gốc; mở 1 dòng sẽ mở form của model tương ứng.
+    """
+    _name = 'epr.document.history.mixin'
+    _description = 'ePR Document History Mixin'
+
+    _live_model = None
+    _archive_model = None
+
+    is_archived = fields.Boolean(
+        string='Archived',
+        readonly=True
+    )
+
+    def action_open_document(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._archive_model if self.is_archived else self._live_model,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+
+class EprPurchaseRequestHistory(models.Model):
+    _name = 'epr.purchase.request.history'
+    _description = 'ePR Purchase Request History'
+    _inherit = ['epr.document.history.mixin']
+    _auto = False
+    _order = 'id desc'
+
+    _live_model = 'epr.purchase.request'
+    _archive_model = 'epr.purchase.request.archive'
+
+    name = fields.Char(
+        string='Request Reference',
+        readonly=True
+    )
+
+    employee_id = fields.Many2one(
+        comodel_name='hr.employee',
+        string='Employee',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    date_required = fields.Date(
+        string='Date Required',
+        readonly=True
+    )
+
+    date_submitted = fields.Datetime(
+        string='Submitted Date',
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['epr.purchase.request']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    estimated_total = fields.Monetary(
+        string='Estimated Total',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    # View gộp 2 bảng hiển thị: Record Rule của Manager dùng lại cách lọc của PR
+    visible_user_ids = fields.Many2many(
+        comodel_name='res.users',
+        relation='epr_purchase_request_visibility_history',
+        column1='request_id',
+        column2='user_id',
+        string='Visible To',
+        readonly=True
+    )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, 'epr_purchase_request_visibility_history')
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE VIEW epr_purchase_request_visibility_history AS (
+                SELECT request_id, user_id FROM epr_purchase_request_visibility_rel
+                 UNION ALL
+                SELECT request_id, user_id FROM epr_purchase_request_visibility_rel_archive
+            );
+            CREATE VIEW epr_purchase_request_history AS (
+                SELECT id, name, employee_id, department_id, date_required, date_submitted,
+                       state, currency_id, estimated_total, FALSE AS is_archived
+                  FROM epr_purchase_request
+                 UNION ALL
+                SELECT id, name, employee_id, department_id, date_required, date_submitted,
+                       state, currency_id, estimated_total, TRUE
+                  FROM epr_purchase_request_archive
+            )
+        """)
+
+
+class EprRfqHistory(models.Model):
+    _name = 'epr.rfq.history'
+    _description = 'ePR RFQ History'
+    _inherit = ['epr.document.history.mixin']
+    _auto = False
+    _order = 'id desc'
+
+    _live_model = 'epr.rfq'
+    _archive_model = 'epr.rfq.archive'
+
+    name = fields.Char(
+        string='RFQ Reference',
+        readonly=True
+    )
+
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Vendor',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    date_order = fields.Datetime(
+        string='Order Date',
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['epr.rfq']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    amount_total = fields.Monetary(
+        string='Total',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE VIEW epr_rfq_history AS (
+                SELECT id, name, partner_id, department_id, date_order,
+                       state, currency_id, amount_total, FALSE AS is_archived
+                  FROM epr_rfq
+                 UNION ALL
+                SELECT id, name, partner_id, department_id, date_order,
+                       state, currency_id, amount_total, TRUE
+                  FROM epr_rfq_archive
+            )
+        """)
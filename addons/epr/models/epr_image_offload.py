@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import re
+
+from odoo import models, fields, api
+
+LINE_MODEL = 'epr.purchase.request.line'
+
+# Số dòng PR mỗi lô backfill (mỗi dòng có thể chứa vài MB ảnh base64)
+IMAGE_OFFLOAD_BATCH_SIZE = 100
+
+# Ảnh raster nhúng dạng data URI trong thẻ <img>. SVG giữ nguyên (text, nhỏ,
+# và không được phép lưu thành attachment bởi user thường)
+INLINE_IMAGE_RE = re.compile(
+    r'(?P<prefix><img\b[^>]*?\s)src=(?P<quote>["\'])'
+    r'data:(?P<mimetype>image/(?:png|jpeg|jpg|gif|webp));base64,(?P<data>[A-Za-z0-9+/=\s]+)'
+    r'(?P=quote)',
+    re.IGNORECASE
+)
+
+
+class EprImageOffloadLog(models.Model):
+    """
+    Chuyển ảnh dán trực tiếp (base64) trong product_description của dòng PR
+    sang ir.attachment (filestore), thay bằng URL /web/image có access token,
+    load lazy. Ảnh trùng nội dung (checksum) dùng chung 1 attachment.
+
+    Mỗi dòng của model này = 1 lô backfill, dùng làm báo cáo dung lượng thu hồi.
+    """
+    _name = 'epr.image.offload.log'
+    _description = 'ePR Inline Image Offload Log'
+    _order = 'create_date desc, id desc'
+
+    line_count = fields.Integer(
+        string='Lines Updated',
+        readonly=True
+    )
+
+    image_count = fields.Integer(
+        string='Images Offloaded',
+        readonly=True
+    )
+
+    attachment_count = fields.Integer(
+        string='New Attachments',
+        readonly=True,
+        help="Ảnh trùng với attachment đã có không tạo attachment mới."
+    )
+
+    bytes_before = fields.Integer(
+        string='HTML Size Before (bytes)',
+        readonly=True
+    )
+
+    bytes_after = fields.Integer(
+        string='HTML Size After (bytes)',
+        readonly=True
+    )
+
+    bytes_reclaimed = fields.Integer(
+        string='Reclaimed (bytes)',
+        readonly=True,
+        help="Dung lượng HTML giảm trong bảng dòng PR "
+             "(vùng TOAST chỉ được giải phóng sau VACUUM)."
+    )
+
+    attachment_bytes = fields.Integer(
+        string='New Filestore Size (bytes)',
+        readonly=True
+    )
+
+    # ==========================================================================
+    # PIPELINE
+    # ==========================================================================
+
+    @api.model
+    def _offload_vals(self, vals_list):
+        """Chuyển ảnh nhúng trong product_description của các vals (sửa tại chỗ)."""
+        targets = [vals for vals in vals_list if vals.get('product_description')]
+        if not targets:
+            return
+        html_list, _stats = self._offload_images([vals['product_description'] for vals in targets])
+        for vals, html in zip(targets, html_list):
+            vals['product_description'] = html
+
+    @api.model
+    def _offload_images(self, html_list):
+        """
+        Thay các data URI trong danh sách HTML bằng URL attachment.
+        Toàn bộ ảnh của danh sách được tra / tạo attachment trong 1 search + 1 create.
+        :return: (html_list mới, dict(image_count, attachment_count, attachment_bytes))
+        """
+        images = {}
+        for html in html_list:
+            for match in INLINE_IMAGE_RE.finditer(html or ''):
+                try:
+                    raw = base64.b64decode(match['data'])
+                except (binascii.Error, ValueError):
+                    continue
+                images.setdefault(hashlib.sha1(raw).hexdigest(), (match['mimetype'].lower(), raw))
+
+        stats = {'image_count': 0, 'attachment_count': 0, 'attachment_bytes': 0}
+        if not images:
+            return html_list, stats
+
+        attachments, created = self._get_image_attachments(images)
+        stats['attachment_count'] = len(created)
+        stats['attachment_bytes'] = sum(created.mapped('file_size'))
+        url_by_checksum = {
+            checksum: '/web/image/%s?access_token=%s' % (attachment.id, attachment.access_token)
+            for checksum, attachment in attachments.items()
+        }
+
+        def replace(match):
+            try:
+                checksum = hashlib.sha1(base64.b64decode(match['data'])).hexdigest()
+            except (binascii.Error, ValueError):
+                return match.group(0)
+            stats['image_count'] += 1
+            return '%ssrc="%s" loading="lazy"' % (match['prefix'], url_by_checksum[checksum])
+
+        return [INLINE_IMAGE_RE.sub(replace, html) if html else html for html in html_list], stats
+
+    @api.model
+    def _get_image_attachments(self, images):
+        """
+        Attachment dùng chung cho ảnh của dòng PR (không gắn res_id để xóa 1 dòng
+        không xóa ảnh của dòng khác), khóa theo checksum.
+        :param images: dict {checksum: (mimetype, raw)}
+        :return: (dict {checksum: attachment}, attachment vừa tạo)
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        existing = Attachment.search([
+            ('res_model', '=', LINE_MODEL),
+            ('res_id', '=', False),
+            ('checksum', 'in', list(images)),
+        ])
+        attachments = {attachment.checksum: attachment for attachment in existing}
+        created = Attachment.create([{
+            'name': 'epr-image-%s.%s' % (checksum[:12], mimetype.split('/')[1]),
+            'raw': raw,
+            'mimetype': mimetype,
+            'res_model': LINE_MODEL,
+        } for checksum, (mimetype, raw) in images.items() if checksum not in attachments])
+        attachments.update({attachment.checksum: attachment for attachment in created})
+        (existing | created).generate_access_token()
+        return attachments, created
+
+    # ==========================================================================
+    # BACKFILL
+    # ==========================================================================
+
+    @api.model
+    def _cron_backfill(self, batch_size=IMAGE_OFFLOAD_BATCH_SIZE):
+        """
+        Backfill các dòng PR cũ theo lô (duyệt theo id), mỗi lô:
+        1 SELECT, 1 UPDATE (không đổi write_date, không sanitize lại), 1 dòng log,
+        commit riêng để không mất tiến độ.
+        """
+        commit = not self.env.registry.in_test_mode()
+        self.env[LINE_MODEL].flush_model(['product_description'])
+        logs = self
+        last_id = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, product_description
+                  FROM epr_purchase_request_line
+                 WHERE id > %s
+                   AND product_description LIKE '%%data:image/%%'
+              ORDER BY id
+                 LIMIT %s
+            """, (last_id, batch_size))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            html_list, stats = self._offload_images([html for _id, html in rows])
+            changed = [
+                (line_id, old, new)
+                for (line_id, old), new in zip(rows, html_list) if new != old
+            ]
+            if changed:
+                self.env.cr.execute("""
+                    UPDATE epr_purchase_request_line line
+                       SET product_description = data.html
+                      FROM unnest(%s::int[], %s::text[]) AS data (id, html)
+                     WHERE line.id = data.id
+                """, ([line_id for line_id, _old, _new in changed], [new for _id, _old, new in changed]))
+                bytes_before = sum(len(old.encode()) for _id, old, _new in changed)
+                bytes_after = sum(len(new.encode()) for _id, _old, new in changed)
+                logs |= self.create({
+                    'line_count': len(changed),
+                    'bytes_before': bytes_before,
+                    'bytes_after': bytes_after,
+                    'bytes_reclaimed': bytes_before - bytes_after,
+                    **stats,
+                })
+                self.env[LINE_MODEL].invalidate_model(['product_description'])
+            if commit:
+                self.env.cr.commit()
+        return logs
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Watermark: thời điểm bắt đầu lần refresh gần nhất
+LEAD_TIME_WATERMARK_PARAM = 'epr.lead_time_report.watermark'
+
+# Quét lùi thêm trước watermark để không sót transaction commit trễ
+LEAD_TIME_OVERLAP = timedelta(hours=1)
+
+STAGES = [
+    ('approval', 'Submitted → Approved/Rejected'),
+    ('rfq', 'Approved → RFQ'),
+    ('po', 'RFQ → PO'),
+    ('total', 'Submitted → PO'),
+    ('rfq_step', 'RFQ Approval Step'),
+]
+
+
+class EprLeadTimeReport(models.Model):
+    """
+    Bảng tổng hợp lead time theo PR (1 dòng / PR), "materialized" bằng bảng
+    thường để refresh từng phần: mỗi lần cron chỉ tính lại các PR có thay đổi
+    (PR, RFQ hoặc PO liên quan) kể từ watermark. Pivot/Graph đọc trực tiếp
+    bảng này, không phải join qua các bảng quan hệ.
+    """
+    _name = 'epr.lead.time.report'
+    _description = 'ePR Lead Time Analysis'
+    _auto = False
+    _rec_name = 'request_id'
+    _order = 'date_submitted desc'
+
+    # Trỏ vào view gộp (đang dùng + lưu trữ): dòng báo cáo của PR đã lưu trữ vẫn giữ nguyên
+    request_id = fields.Many2one(
+        comodel_name='epr.purchase.request.history',
+        string='Purchase Request',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    employee_id = fields.Many2one(
+        comodel_name='hr.employee',
+        string='Employee',
+        readonly=True
+    )
+
+    approver_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Approved/Rejected By',
+        readonly=True
+    )
+
+    state = fields.Selection(
+        selection=lambda self: self.env['epr.purchase.request']._fields['state'].selection,
+        string='Status',
+        readonly=True
+    )
+
+    date_submitted = fields.Datetime(
+        string='Submitted',
+        readonly=True
+    )
+
+    date_approved = fields.Datetime(
+        string='Approved',
+        readonly=True
+    )
+
+    date_rejected = fields.Datetime(
+        string='Rejected',
+        readonly=True
+    )
+
+    date_rfq = fields.Datetime(
+        string='First RFQ',
+        readonly=True
+    )
+
+    date_po = fields.Datetime(
+        string='First PO',
+        readonly=True
+    )
+
+    approval_hours = fields.Float(
+        string='Approval Lead Time (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    rfq_hours = fields.Float(
+        string='Approved → RFQ (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    po_hours = fields.Float(
+        string='RFQ → PO (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    total_hours = fields.Float(
+        string='Submitted → PO (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    # ==========================================================================
+    # TABLE
+    # ==========================================================================
+
+    def init(self):
+        # Không FK tới epr_purchase_request: PR chuyển sang kho lưu trữ vẫn giữ số liệu
+        # lead time; dòng của PR bị xóa hẳn được dọn trong _cron_refresh
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS epr_lead_time_report (
+                id integer PRIMARY KEY,
+                request_id integer NOT NULL,
+                department_id integer,
+                employee_id integer,
+                approver_id integer,
+                state varchar,
+                date_submitted timestamp,
+                date_approved timestamp,
+                date_rejected timestamp,
+                date_rfq timestamp,
+                date_po timestamp,
+                approval_hours double precision,
+                rfq_hours double precision,
+                po_hours double precision,
+                total_hours double precision
+            );
+            CREATE INDEX IF NOT EXISTS epr_lead_time_report_department_idx
+                ON epr_lead_time_report (department_id, date_submitted);
+            CREATE INDEX IF NOT EXISTS epr_lead_time_report_approver_idx
+                ON epr_lead_time_report (approver_id, date_submitted);
+            ALTER TABLE epr_lead_time_report DROP CONSTRAINT IF EXISTS epr_lead_time_report_id_fkey;
+        """)
+
+    # ==========================================================================
+    # REFRESH
+    # ==========================================================================
+
+    @api.model
+    def _cron_refresh(self):
+        """
+        Refresh từng phần: tính lại các PR thay đổi kể từ watermark
+        (lần đầu: toàn bộ), rồi tính lại bảng percentile.
+        """
+        run_start = fields.Datetime.now()
+        params = self.env['ir.config_parameter'].sudo()
+        watermark = fields.Datetime.to_datetime(params.get_param(LEAD_TIME_WATERMARK_PARAM))
+
+        self.env.flush_all()
+        request_ids = self._get_changed_request_ids(watermark - LEAD_TIME_OVERLAP if watermark else None)
+        self._refresh_requests(request_ids)
+        self._prune_deleted_requests()
+        self.env['epr.lead.time.stats']._refresh()
+
+        params.set_param(LEAD_TIME_WATERMARK_PARAM, fields.Datetime.to_string(run_start))
+        self.invalidate_model()
+
+    @api.model
+    def _get_changed_request_ids(self, since=None):
+        """PR có thay đổi ở chính nó, ở RFQ hoặc PO liên quan kể từ `since`."""
+        if since is None:
+            self.env.cr.execute("SELECT id FROM epr_purchase_request")
+        else:
+            self.env.cr.execute("""
+                SELECT id FROM epr_purchase_request WHERE write_date >= %(since)s
+                 UNION
+                SELECT rel.request_id
+                  FROM epr_rfq_purchase_request_rel rel
+                  JOIN epr_rfq rfq ON rfq.id = rel.rfq_id
+                 WHERE rfq.write_date >= %(since)s
+                 UNION
+                SELECT rel.epr_pr_id
+                  FROM epr_pr_purchase_order_rel rel
+                  JOIN purchase_order po ON po.id = rel.purchase_id
+                 WHERE po.write_date >= %(since)s
+            """, {'since': since})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _prune_deleted_requests(self):
+        """Xóa dòng của PR đã bị xóa hẳn (không còn ở bảng đang dùng lẫn bảng lưu trữ)."""
+        self.env.cr.execute("""
+            DELETE FROM epr_lead_time_report report
+             WHERE NOT EXISTS (SELECT 1 FROM epr_purchase_request pr WHERE pr.id = report.id)
+               AND NOT EXISTS (SELECT 1 FROM epr_purchase_request_archive pr WHERE pr.id = report.id)
+        """)
+
+    @api.model
+    def _refresh_requests(self, request_ids):
+        """Xóa và tính lại dòng báo cáo của các PR (1 câu DELETE + 1 câu INSERT ... SELECT)."""
+        if not request_ids:
+            return
+        self.env.cr.execute(
+            "DELETE FROM epr_lead_time_report WHERE id = ANY(%s)", (request_ids,)
+        )
+        self.env.cr.execute("""
+            INSERT INTO epr_lead_time_report (
+                id, request_id, department_id, employee_id, approver_id, state,
+                date_submitted, date_approved, date_rejected, date_rfq, date_po,
+                approval_hours, rfq_hours, po_hours, total_hours)
+            SELECT pr.id, pr.id, pr.department_id, pr.employee_id,
+                   COALESCE(pr.approved_by_id, pr.rejected_by_id), pr.state,
+                   pr.date_submitted, pr.date_approved, pr.date_rejected,
+                   rfq.date_rfq, po.date_po,
+                   EXTRACT(EPOCH FROM COALESCE(pr.date_approved, pr.date_rejected) - pr.date_submitted) / 3600,
+                   EXTRACT(EPOCH FROM rfq.date_rfq - pr.date_approved) / 3600,
+                   EXTRACT(EPOCH FROM po.date_po - rfq.date_rfq) / 3600,
+                   EXTRACT(EPOCH FROM po.date_po - pr.date_submitted) / 3600
+              FROM epr_purchase_request pr
+         LEFT JOIN LATERAL (
+                   -- RFQ có thể đã được lưu trữ trước PR nguồn
+                   SELECT MIN(rfq.create_date) AS date_rfq
+                     FROM (SELECT rfq_id FROM epr_rfq_purchase_request_rel WHERE request_id = pr.id
+                            UNION ALL
+                           SELECT rfq_id FROM epr_rfq_purchase_request_rel_archive WHERE request_id = pr.id) rel
+                     JOIN (SELECT id, create_date FROM epr_rfq
+                            UNION ALL
+                           SELECT id, create_date FROM epr_rfq_archive) rfq ON rfq.id = rel.rfq_id) rfq ON TRUE
+         LEFT JOIN LATERAL (
+                   SELECT MIN(po.create_date) AS date_po
+                     FROM epr_pr_purchase_order_rel rel
+                     JOIN purchase_order po ON po.id = rel.purchase_id
+                    WHERE rel.epr_pr_id = pr.id) po ON TRUE
+             WHERE pr.id = ANY(%s)
+               AND pr.date_submitted IS NOT NULL
+        """, (request_ids,))
+
+
+class EprLeadTimeStats(models.Model):
+    """
+    Percentile lead time theo phòng ban và theo người duyệt, tính lại toàn bộ
+    (percentile_cont trên bảng epr_lead_time_report đã gọn) sau mỗi lần refresh.
+    """
+    _name = 'epr.lead.time.stats'
+    _description = 'ePR Lead Time Percentiles'
+    _auto = False
+    _order = 'dimension, stage'
+
+    dimension = fields.Selection(
+        [('department', 'Department'), ('approver', 'Approver')],
+        string='Dimension',
+        readonly=True
+    )
+
+    stage = fields.Selection(
+        STAGES,
+        string='Stage',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    approver_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Approver',
+        readonly=True
+    )
+
+    sample_count = fields.Integer(
+        string='Samples',
+        readonly=True
+    )
+
+    avg_hours = fields.Float(
+        string='Average (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    p50_hours = fields.Float(
+        string='P50 (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    p90_hours = fields.Float(
+        string='P90 (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    p95_hours = fields.Float(
+        string='P95 (h)',
+        readonly=True,
+        aggregator='avg'
+    )
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS epr_lead_time_stats (
+                id serial PRIMARY KEY,
+                dimension varchar NOT NULL,
+                stage varchar NOT NULL,
+                department_id integer,
+                approver_id integer,
+                sample_count integer,
+                avg_hours double precision,
+                p50_hours double precision,
+                p90_hours double precision,
+                p95_hours double precision
+            )
+        """)
+
+    @api.model
+    def _refresh(self):
+        """
+        Tính lại percentile bằng 1 câu GROUP BY GROUPING SETS:
+        - Các giai đoạn PR lấy từ epr_lead_time_report (theo phòng ban / người duyệt PR).
+        - Bước duyệt RFQ lấy từ epr_approval_entry (kể cả bảng lưu trữ) đã duyệt theo người duyệt thực tế,
+          tính từ lúc tầng trước duyệt xong (tầng đầu: lúc tạo entry) -> approval_date,
+          để tầng sau không bị tính cả thời gian chờ các tầng trước.
+        """
+        self.env.cr.execute("""
+            DELETE FROM epr_lead_time_stats;
+            WITH entries AS (
+                SELECT rfq_id, sequence, status, actual_user_id, approval_date, create_date
+                  FROM epr_approval_entry
+                 UNION ALL
+                SELECT rfq_id, sequence, status, actual_user_id, approval_date, create_date
+                  FROM epr_approval_entry_archive
+            ),
+            tiers AS (
+                SELECT rfq_id, sequence, MAX(approval_date) AS done
+                  FROM entries
+                 WHERE status = 'approved'
+                   AND approval_date IS NOT NULL
+              GROUP BY rfq_id, sequence
+            ),
+            previous_tiers AS (
+                SELECT rfq_id, sequence,
+                       lag(done) OVER (PARTITION BY rfq_id ORDER BY sequence) AS previous_done
+                  FROM tiers
+            ),
+            samples (department_id, approver_id, stage, hours) AS (
+                -- Người duyệt PR chỉ gắn với giai đoạn duyệt
+                SELECT report.department_id,
+                       CASE WHEN stage.name = 'approval' THEN report.approver_id END,
+                       stage.name, stage.hours
+                  FROM epr_lead_time_report report
+                 CROSS JOIN LATERAL (VALUES
+                       ('approval', report.approval_hours),
+                       ('rfq', report.rfq_hours),
+                       ('po', report.po_hours),
+                       ('total', report.total_hours)) AS stage (name, hours)
+                 WHERE stage.hours IS NOT NULL
+                 UNION ALL
+                SELECT NULL::integer, entry.actual_user_id, 'rfq_step',
+                       EXTRACT(EPOCH FROM entry.approval_date
+                               - GREATEST(previous.previous_done, entry.create_date)) / 3600
+                  FROM entries entry
+                  JOIN previous_tiers previous
+                    ON previous.rfq_id = entry.rfq_id AND previous.sequence = entry.sequence
+                 WHERE entry.status = 'approved'
+                   AND entry.approval_date IS NOT NULL
+            )
+            INSERT INTO epr_lead_time_stats (
+                dimension, stage, department_id, approver_id, sample_count,
+                avg_hours, p50_hours, p90_hours, p95_hours)
+            SELECT CASE WHEN GROUPING(department_id) = 0 THEN 'department' ELSE 'approver' END,
+                   stage, department_id, approver_id, COUNT(*), AVG(hours),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY hours),
+                   percentile_cont(0.9) WITHIN GROUP (ORDER BY hours),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY hours)
+              FROM samples
+          GROUP BY GROUPING SETS ((stage, department_id), (stage, approver_id))
+            HAVING (GROUPING(department_id) = 0 AND department_id IS NOT NULL)
+                OR (GROUPING(approver_id) = 0 AND approver_id IS NOT NULL)
+        """)
+        self.invalidate_model()
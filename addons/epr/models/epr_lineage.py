@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, tools
+from odoo.tools import SQL
+
+# Bảng chứng từ có thể được chuyển sang kho lưu trữ: epr_lineage không giữ FK tới
+# các bảng này để dòng truy vết không bị xóa theo khi lưu trữ (ON DELETE CASCADE)
+ARCHIVABLE_TABLES = ('epr_purchase_request', 'epr_purchase_request_line', 'epr_rfq', 'epr_rfq_line')
+
+
+class EprLineage(models.Model):
+    """
+    Bảng truy vết 1 dòng / (dòng PR, dòng RFQ, dòng PO), kèm sẵn id header.
+    Được ghi khi tạo dòng RFQ có dòng PR nguồn và khi tạo dòng PO có epr_rfq_line_id,
+    nên mọi câu hỏi "dòng PO này từ PR nào" / "PR của tôi đến đâu rồi"
+    chỉ cần 1 lookup có index thay vì join nhiều bước.
+    PR / RFQ trỏ vào view gộp (đang dùng + lưu trữ) nên truy vết còn nguyên sau
+    khi chứng từ được lưu trữ; xóa hẳn chứng từ sẽ xóa dòng truy vết (_forget).
+    """
+    _name = 'epr.lineage'
+    _description = 'ePR Document Lineage'
+    _log_access = False
+
+    request_id = fields.Many2one(
+        comodel_name='epr.purchase.request.history',
+        string='Purchase Request',
+        required=True,
+        readonly=True,
+        index=True
+    )
+
+    pr_line_id = fields.Integer(
+        string='PR Line',
+        required=True,
+        readonly=True,
+        index=True
+    )
+
+    rfq_id = fields.Many2one(
+        comodel_name='epr.rfq.history',
+        string='RFQ',
+        required=True,
+        readonly=True,
+        index=True
+    )
+
+    rfq_line_id = fields.Integer(
+        string='RFQ Line',
+        required=True,
+        readonly=True
+    )
+
+    purchase_id = fields.Many2one(
+        comodel_name='purchase.order',
+        string='Purchase Order',
+        readonly=True,
+        ondelete='set null',
+        index='btree_not_null'
+    )
+
+    purchase_line_id = fields.Many2one(
+        comodel_name='purchase.order.line',
+        string='PO Line',
+        readonly=True,
+        ondelete='set null',
+        index='btree_not_null'
+    )
+
+    _sql_constraints = [
+        ('rfq_line_uniq', 'unique (rfq_line_id)', 'An RFQ line can only be traced once.'),
+    ]
+
+    def init(self):
+        # Bỏ FK (ON DELETE CASCADE) tạo bởi các phiên bản trước tới bảng chứng từ
+        self.env.cr.execute("""
+            SELECT conname
+              FROM pg_constraint
+             WHERE conrelid = 'epr_lineage'::regclass
+               AND contype = 'f'
+               AND confrelid::regclass::text IN %s
+        """, (ARCHIVABLE_TABLES,))
+        for (conname,) in self.env.cr.fetchall():
+            self.env.cr.execute(SQL(
+                "ALTER TABLE epr_lineage DROP CONSTRAINT %s", SQL.identifier(conname),
+            ))
+
+        # Backfill từ các liên kết sẵn có (chạy lại khi nâng cấp chỉ thêm dòng còn thiếu)
+        self.env.cr.execute("""
+            INSERT INTO epr_lineage (request_id, pr_line_id, rfq_id, rfq_line_id, purchase_id, purchase_line_id)
+            SELECT pr_line.request_id, pr_line.id, rfq_line.rfq_id, rfq_line.id,
+                   po_line.order_id, po_line.id
+              FROM epr_rfq_line rfq_line
+              JOIN epr_purchase_request_line pr_line ON pr_line.id = rfq_line.pr_line_id
+         LEFT JOIN purchase_order_line po_line ON po_line.id = rfq_line.purchase_line_id
+            ON CONFLICT (rfq_line_id) DO NOTHING
+        """)
+
+    # ==========================================================================
+    # MAINTENANCE (gọi từ create / write của dòng RFQ và dòng PO)
+    # ==========================================================================
+
+    @api.model
+    def _record_rfq_lines(self, rfq_lines):
+        """Thêm dòng truy vết cho các dòng RFQ có dòng PR nguồn (1 câu INSERT ... SELECT)."""
+        if not rfq_lines:
+            return
+        rfq_lines.flush_recordset(['pr_line_id', 'rfq_id'])
+        self.env.cr.execute("""
+            INSERT INTO epr_lineage (request_id, pr_line_id, rfq_id, rfq_line_id)
+            SELECT pr_line.request_id, pr_line.id, rfq_line.rfq_id, rfq_line.id
+              FROM epr_rfq_line rfq_line
+              JOIN epr_purchase_request_line pr_line ON pr_line.id = rfq_line.pr_line_id
+             WHERE rfq_line.id = ANY(%s)
+            ON CONFLICT (rfq_line_id) DO NOTHING
+        """, (rfq_lines.ids,))
+        self.invalidate_model()
+
+    @api.model
+    def _record_po_lines(self, po_lines):
+        """Gắn dòng PO (và PO) vào dòng truy vết theo epr_rfq_line_id (1 câu UPDATE)."""
+        po_lines = po_lines.filtered('epr_rfq_line_id')
+        if not po_lines:
+            return
+        po_lines.flush_recordset(['epr_rfq_line_id', 'order_id'])
+        self.env.cr.execute("""
+            UPDATE epr_lineage AS lineage
+               SET purchase_line_id = po_line.id,
+                   purchase_id = po_line.order_id
+              FROM purchase_order_line po_line
+             WHERE po_line.id = ANY(%s)
+               AND lineage.rfq_line_id = po_line.epr_rfq_line_id
+        """, (po_lines.ids,))
+        self.invalidate_model()
+
+    @api.model
+    def _forget(self, fname, ids):
+        """Xóa dòng truy vết của chứng từ bị xóa hẳn (gọi từ unlink của PR / RFQ và dòng)."""
+        if not ids:
+            return
+        self.env.cr.execute(SQL(
+            "DELETE FROM epr_lineage WHERE %s = ANY(%s)", SQL.identifier(fname), list(ids),
+        ))
+        self.invalidate_model()
+
+    # ==========================================================================
+    # LOOKUP
+    # ==========================================================================
+
+    @api.model
+    def _get_related_ids(self, fname, ids, target):
+        """
+        Id `target` liên quan đến các id `fname` (1 query, index trên `fname`).
+        VD: _get_related_ids('purchase_id', po.ids, 'request_id') -> PR nguồn của PO.
+        :return: dict {id: [target ids]}
+        """
+        return {
+            key.id: list(dict.fromkeys(targets))
+            for key, targets in self._read_group(
+                [(fname, 'in', ids), (target, '!=', False)], [fname], [f'{target}:array_agg'],
+            )
+        }
+
+
+class EprFulfilmentReport(models.Model):
+    """
+    Tình trạng thực hiện từng dòng PR (đã trình duyệt): chưa có RFQ, đang báo giá,
+    đã đặt hàng, đã nhận đủ hay đã hủy. Đọc thẳng từ bảng truy vết, 1 dòng / dòng PR
+    (qty_requested cộng dồn được trong pivot / graph).
+    Người tạo, trạng thái PR và visible_user_ids được đưa ra để Record Rule
+    giới hạn như trên PR gốc (security/epr_record_rules.xml).
+    """
+    _name = 'epr.fulfilment.report'
+    _description = 'ePR Fulfilment Status'
+    _auto = False
+    _rec_name = 'pr_line_id'
+    _order = 'request_id desc, pr_line_id'
+
+    request_id = fields.Many2one(
+        comodel_name='epr.purchase.request',
+        string='Purchase Request',
+        readonly=True
+    )
+
+    pr_line_id = fields.Many2one(
+        comodel_name='epr.purchase.request.line',
+        string='PR Line',
+        readonly=True
+    )
+
+    employee_id = fields.Many2one(
+        comodel_name='hr.employee',
+        string='Employee',
+        readonly=True
+    )
+
+    department_id = fields.Many2one(
+        comodel_name='hr.department',
+        string='Department',
+        readonly=True
+    )
+
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Requester',
+        readonly=True
+    )
+
+    request_state = fields.Selection(
+        selection=lambda self: self.env['epr.purchase.request']._fields['state'].selection,
+        string='Request Status',
+        readonly=True
+    )
+
+    # Dùng cho Record Rule của Manager (người duyệt / quản lý phòng ban của PR)
+    visible_user_ids = fields.Many2many(
+        related='request_id.visible_user_ids',
+        string='Visible To'
+    )
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        readonly=True
+    )
+
+    vendor_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Vendor',
+        readonly=True
+    )
+
+    date_submitted = fields.Datetime(
+        string='Submitted',
+        readonly=True
+    )
+
+    rfq_id = fields.Many2one(
+        comodel_name='epr.rfq',
+        string='RFQ',
+        readonly=True
+    )
+
+    purchase_id = fields.Many2one(
+        comodel_name='purchase.order',
+        string='Purchase Order',
+        readonly=True
+    )
+
+    qty_requested = fields.Float(
+        string='Requested Qty',
+        digits='Product Unit of Measure',
+        readonly=True
+    )
+
+    qty_ordered = fields.Float(
+        string='Ordered Qty',
+        digits='Product Unit of Measure',
+        readonly=True
+    )
+
+    qty_received = fields.Float(
+        string='Received Qty',
+        digits='Product Unit of Measure',
+        readonly=True
+    )
+
+    status = fields.Selection(
+        [
+            ('pending', 'Waiting for RFQ'),
+            ('rfq', 'Quoting'),
+            ('ordered', 'Ordered'),
+            ('received', 'Received'),
+            ('cancelled', 'Cancelled'),
+        ],
+        string='Fulfilment',
+        readonly=True
+    )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        # 1 dòng / dòng PR. Dòng PR được nhiều NCC báo giá (so sánh báo giá) có nhiều
+        # dòng truy vết: chỉ lấy 1 dòng đại diện, ưu tiên dòng có PO chưa hủy, rồi báo
+        # giá thắng thầu, rồi RFQ chưa bị từ chối / hủy; báo giá thua bị bỏ qua
+        self.env.cr.execute("""
+            CREATE VIEW epr_fulfilment_report AS (
+                SELECT pr_line.id,
+                       pr.id AS request_id,
+                       pr_line.id AS pr_line_id,
+                       pr.employee_id,
+                       pr.department_id,
+                       employee.user_id,
+                       pr.state AS request_state,
+                       COALESCE(po_line.product_id, pr_line.product_id) AS product_id,
+                       COALESCE(po.partner_id, quote.partner_id, pr_line.final_vendor_id) AS vendor_id,
+                       pr.date_submitted,
+                       quote.rfq_id,
+                       quote.purchase_id,
+                       pr_line.quantity AS qty_requested,
+                       po_line.product_qty AS qty_ordered,
+                       po_line.qty_received,
+                       CASE
+                           WHEN pr.state IN ('rejected', 'cancel') OR po.state = 'cancel'
+                             OR (po_line.id IS NULL AND quote.rfq_state IN ('rejected', 'cancel')) THEN 'cancelled'
+                           WHEN po_line.id IS NOT NULL AND po_line.qty_received >= po_line.product_qty THEN 'received'
+                           WHEN po_line.id IS NOT NULL THEN 'ordered'
+                           WHEN quote.rfq_id IS NOT NULL THEN 'rfq'
+                           ELSE 'pending'
+                       END AS status
+                  FROM epr_purchase_request_line pr_line
+                  JOIN epr_purchase_request pr ON pr.id = pr_line.request_id
+             LEFT JOIN hr_employee employee ON employee.id = pr.employee_id
+             LEFT JOIN LATERAL (
+                       SELECT lineage.rfq_id,
+                              lineage.purchase_id,
+                              lineage.purchase_line_id,
+                              rfq.partner_id,
+                              rfq.state AS rfq_state
+                         FROM epr_lineage lineage
+                         JOIN epr_rfq_history rfq ON rfq.id = lineage.rfq_id
+                    LEFT JOIN purchase_order line_po ON line_po.id = lineage.purchase_id
+                    LEFT JOIN epr_rfq_line rfq_line ON rfq_line.id = lineage.rfq_line_id
+                        WHERE lineage.pr_line_id = pr_line.id
+                     ORDER BY COALESCE(line_po.state != 'cancel', FALSE) DESC,
+                              COALESCE(rfq_line.is_awarded, FALSE) DESC,
+                              rfq.state IN ('rejected', 'cancel'),
+                              lineage.id DESC
+                        LIMIT 1
+                   ) quote ON TRUE
+             LEFT JOIN purchase_order_line po_line ON po_line.id = quote.purchase_line_id
+             LEFT JOIN purchase_order po ON po.id = quote.purchase_id
+                 WHERE pr.state != 'draft'
+            )
+        """)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 
 
 class PurchaseOrder(models.Model):
@@ -28,57 +29,110 @@ class PurchaseOrder(models.Model):
     )
 
     # === COMPUTED FIELDS CHO SMART BUTTON (Line-Level Linking) ===
+    # store=True để search/sort trực tiếp bằng SQL
     epr_rfq_count = fields.Integer(
         string='RFQ Count',
-        compute='_compute_epr_counts'
+        compute='_compute_epr_counts',
+        store=True
     )
 
     epr_pr_count = fields.Integer(
         string='PR Count',
-        compute='_compute_epr_counts'
+        compute='_compute_epr_counts',
+        store=True
     )
 
-    @api.depends('epr_source_rfq_ids', 'epr_source_pr_ids')
+    @api.depends('epr_source_rfq_ids', 'epr_source_rfq_ids.active',
+                 'epr_source_pr_ids', 'epr_source_pr_ids.active')
     def _compute_epr_counts(self):
+        # PR / RFQ nguồn: bảng quan hệ đang dùng + bảng quan hệ của chứng từ đã lưu trữ
+        rfq_ids = self._get_epr_source_ids('epr_source_rfq_ids')
+        pr_ids = self._get_epr_source_ids('epr_source_pr_ids')
         for po in self:
-            po.epr_rfq_count = len(po.epr_source_rfq_ids)
-            po.epr_pr_count = len(po.epr_source_pr_ids)
+            po.epr_rfq_count = len(rfq_ids.get(po.id, []))
+            po.epr_pr_count = len(pr_ids.get(po.id, []))
+
+    def _get_epr_source_ids(self, fname):
+        """
+        Id PR / RFQ nguồn của các PO, kể cả chứng từ đã chuyển sang kho lưu trữ
+        (bảng quan hệ được chép sang *_rel_archive khi lưu trữ), 1 query.
+
+        :return: dict {po_id: [ids]}
+        """
+        ids = self.filtered('id').ids
+        result = {po.id: [] for po in self if not po.id}
+        if not ids:
+            return result
+        field = self._fields[fname]
+        archive_relation = {
+            'epr_source_rfq_ids': ('epr_rfq_purchase_order_rel_archive', 'epr_rfq_id'),
+            'epr_source_pr_ids': ('epr_pr_purchase_order_rel_archive', 'epr_pr_id'),
+        }[fname]
+        comodel = self.env[field.comodel_name]
+        self.flush_model([fname])
+        comodel.flush_model(['active'])
+        # Chứng từ đang dùng nhưng đã lưu trữ kiểu Odoo (active = False) không được đếm,
+        # như len() trên recordset
+        self.env.cr.execute(SQL(
+            """
+            SELECT purchase_id, array_agg(DISTINCT source_id)
+              FROM (SELECT rel.%(column1)s AS purchase_id, rel.%(column2)s AS source_id
+                      FROM %(relation)s rel
+                      JOIN %(table)s source ON source.id = rel.%(column2)s AND source.active
+                     WHERE rel.%(column1)s = ANY(%(ids)s)
+                     UNION ALL
+                    SELECT purchase_id, %(archive_column)s
+                      FROM %(archive)s WHERE purchase_id = ANY(%(ids)s)) rel
+          GROUP BY purchase_id
+            """,
+            column1=SQL.identifier(field.column1),
+            column2=SQL.identifier(field.column2),
+            relation=SQL.identifier(field.relation),
+            table=SQL.identifier(comodel._table),
+            archive=SQL.identifier(archive_relation[0]),
+            archive_column=SQL.identifier(archive_relation[1]),
+            ids=ids,
+        ))
+        result.update(self.env.cr.fetchall())
+        return result
 
     # === ACTION SMART BUTTON ===
     def action_view_epr_rfqs(self):
-        """Mở danh sách các EPR RFQ nguồn"""
+        """Mở danh sách các EPR RFQ nguồn (kể cả RFQ đã lưu trữ)"""
         self.ensure_one()
-        rfq_ids = self.epr_source_rfq_ids.ids
+        lineage_ids = self.env['epr.lineage']._get_related_ids('purchase_id', self.ids, 'rfq_id')
+        rfq_ids = list(dict.fromkeys(
+            lineage_ids.get(self.id, []) + self._get_epr_source_ids('epr_source_rfq_ids').get(self.id, [])
+        ))
 
         # Nếu chỉ có 1 RFQ nguồn, mở form view trực tiếp cho tiện
         if len(rfq_ids) == 1:
-            return {
-                'type': 'ir.actions.act_window',
-                'res_model': 'epr.rfq',
-                'view_mode': 'form',
-                'res_id': rfq_ids[0],
-                'target': 'current',
-            }
+            return self.env['epr.rfq.history'].browse(rfq_ids).action_open_document()
 
         # Nếu có nhiều RFQs nguồn, mở list view
         return {
             'name': _('Source RFQs'),
             'type': 'ir.actions.act_window',
-            'res_model': 'epr.rfq',
-            'view_mode': 'list,form',
+            'res_model': 'epr.rfq.history',
+            'view_mode': 'list',
             'domain': [('id', 'in', rfq_ids)],
-            'context': {'create': False}, 
+            'context': {'create': False},
         }
 
     def action_view_epr_prs(self):
         """Mở danh sách các PR nguồn"""
         self.ensure_one()
-        pr_ids = self.epr_source_pr_ids.ids
+        # PR nguồn theo dòng PO (bảng truy vết) + PR gắn tay ở header
+        # (kể cả PR đã lưu trữ: mở qua view gộp Request History)
+        lineage_ids = self.env['epr.lineage']._get_related_ids('purchase_id', self.ids, 'request_id')
+        pr_ids = list(dict.fromkeys(
+            lineage_ids.get(self.id, []) + self._get_epr_source_ids('epr_source_pr_ids').get(self.id, [])
+        ))
         return {
             'name': _('Source PRs'),
             'type': 'ir.actions.act_window',
-            'res_model': 'epr.purchase.request',
-            'view_mode': 'list,form',
+            'res_model': 'epr.purchase.request.history',
+            'view_mode': 'list',
             'domain': [('id', 'in', pr_ids)],
             'context': {'create': False},
         }
@@ -96,3 +150,45 @@ class PurchaseOrderLine(models.Model):
         ondelete='set null',
         help="Dòng chi tiết tương ứng trên phiếu yêu cầu báo giá."
     )
+
+    # Khi RFQ được lưu trữ, FK ở trên bị xóa (set null): liên kết chuyển sang dòng lưu trữ
+    epr_rfq_line_archive_id = fields.Many2one(
+        comodel_name='epr.rfq.line.archive',
+        string='EPR Archived RFQ Line Ref',
+        readonly=True,
+        copy=False,
+        help="Dòng RFQ tương ứng sau khi phiếu yêu cầu báo giá đã được lưu trữ."
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.filtered('epr_rfq_line_id')._link_epr_rfq_lines()
+        return lines
+
+    def _link_epr_rfq_lines(self):
+        """
+        Link ngược RFQ Line -> PO Line theo khóa epr_rfq_line_id (1 câu UPDATE)
+        và gắn dòng PO vào bảng truy vết. Dùng chung cho wizard tạo PO và nút
+        Create PO trên RFQ.
+        """
+        if not self:
+            return
+        self.flush_recordset(['epr_rfq_line_id', 'order_id'])
+        self.env.cr.execute("""
+            UPDATE epr_rfq_line AS line
+               SET purchase_line_id = link.purchase_line_id,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM (SELECT unnest(%s::int[]) AS rfq_line_id,
+                           unnest(%s::int[]) AS purchase_line_id) AS link
+             WHERE line.id = link.rfq_line_id
+        """, (
+            self.env.uid,
+            [po_line.epr_rfq_line_id.id for po_line in self],
+            self.ids,
+        ))
+        rfq_lines = self.epr_rfq_line_id
+        rfq_lines.invalidate_recordset(['purchase_line_id', 'write_uid', 'write_date'])
+        rfq_lines.modified(['purchase_line_id'])
+        self.env['epr.lineage']._record_po_lines(self)
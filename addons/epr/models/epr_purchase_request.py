@@ -1,14 +1,33 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from odoo import models, fields, api, Command, _
 from odoo.exceptions import UserError, ValidationError
 
 
 class EprPurchaseRequest(models.Model):
     _name = 'epr.purchase.request'
     _description = 'Electronic Purchase Request'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'epr.deferred.tracking.mixin',  # Phải đứng trước mail.thread
+        'mail.thread',
+        'mail.activity.mixin',
+        'epr.relation.count.mixin',
+        'epr.api.mixin',
+    ]
     _order = 'id desc'
 
+    # JSON API (controllers/main.py)
+    _api_default_fields = (
+        'id', 'name', 'state', 'employee_id', 'department_id',
+        'date_required', 'estimated_total', 'currency_id', 'write_date',
+    )
+    _api_create_fields = ('employee_id', 'date_required', 'priority', 'currency_id')
+    _api_create_lines = {
+        'line_ids': (
+            'name', 'product_id', 'product_description', 'quantity', 'uom_name',
+            'estimated_price', 'user_vendor_id', 'suggested_vendor_name',
+        ),
+    }
+
     name = fields.Char(
         string='Request Reference',
         required=True,
@@ -27,6 +46,7 @@ class EprPurchaseRequest(models.Model):
         string='Employee',
         required=True,
         tracking=True,
+        index=True,
         default=lambda self: self.env.user.employee_id
     )
 
@@ -39,8 +59,10 @@ class EprPurchaseRequest(models.Model):
     )
 
     # Xác định người tạo PR
+    # search: biên dịch thẳng sang SQL (employee_id IN hr_employee theo user_id)
     is_owner = fields.Boolean(
         compute='_compute_is_owner',
+        search='_search_is_owner',
         store=False
     )
 
@@ -87,6 +109,20 @@ class EprPurchaseRequest(models.Model):
         tracking=True
     )
 
+    # Bảng hiển thị (request, user) được tính sẵn từ cây HR và người duyệt.
+    # Record Rule của Manager chỉ cần 1 semi-join có index trên bảng này
+    # thay vì OR 4 nhánh join qua hr_employee / hr_department.
+    visible_user_ids = fields.Many2many(
+        comodel_name='res.users',
+        relation='epr_purchase_request_visibility_rel',
+        column1='request_id',
+        column2='user_id',
+        string='Visible To',
+        compute='_compute_visible_user_ids',
+        store=True,
+        copy=False
+    )
+
     currency_id = fields.Many2one(
         comodel_name='res.currency',
         string='Currency',
@@ -117,10 +153,17 @@ class EprPurchaseRequest(models.Model):
         readonly=True
     )
 
-    # Số lượng RFQ
+    # Số lượng RFQ (store=True để search/sort trực tiếp bằng SQL)
     rfq_count = fields.Integer(
         compute='_compute_rfq_count',
-        string='RFQ Count'
+        string='RFQ Count',
+        store=True
+    )
+
+    # Số PO sinh ra từ PR, đếm trên bảng truy vết (epr.lineage)
+    purchase_count = fields.Integer(
+        compute='_compute_purchase_count',
+        string='PO Count'
     )
 
     # ==========================================================================
@@ -168,11 +211,18 @@ class EprPurchaseRequest(models.Model):
     # Hàm tạo sequence cho Request Reference
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('epr.purchase.request') or _('New')
+        # Cấp số thứ tự cho cả lô trong 1 lần gọi sequence
+        to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence']._next_by_code_block('epr.purchase.request', len(to_name))
+        for vals, name in zip(to_name, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
+    def unlink(self):
+        # Dòng PR bị xóa theo (ON DELETE CASCADE) không đi qua unlink của dòng
+        self.env['epr.lineage']._forget('request_id', self.ids)
+        return super().unlink()
+
     # --- Kanban Grouping (Để Kanban hiển thị đủ cột Draft/Done dù không có data) ---
     @api.model
     def _expand_groups(self, states, domain, order=None):
@@ -189,12 +239,37 @@ class EprPurchaseRequest(models.Model):
             total = sum(line.subtotal_estimated for line in request.line_ids)
             request.estimated_total = total
 
+    # Người được xem PR: Owner, Line Manager, Trưởng phòng và Approvers
+    @api.depends(
+        'employee_id.user_id',
+        'employee_id.parent_id.user_id',
+        'department_id.manager_id.user_id',
+        'approver_ids'
+    )
+    def _compute_visible_user_ids(self):
+        for request in self:
+            request.visible_user_ids = (
+                request.employee_id.user_id
+                | request.employee_id.parent_id.user_id
+                | request.department_id.manager_id.user_id
+                | request.approver_ids
+            )
+
     # Xác định người tạo PR
+    @api.depends('employee_id.user_id')
     @api.depends_context('uid')
     def _compute_is_owner(self):
         for record in self:
             record.is_owner = record.employee_id.user_id.id == self.env.uid
 
+    def _search_is_owner(self, operator, value):
+        if operator not in ('=', '!='):
+            raise UserError(_("Unsupported search operator on 'is_owner': %s", operator))
+
+        if (operator == '=') == bool(value):
+            return [('employee_id.user_id', '=', self.env.uid)]
+        return [('employee_id.user_id', '!=', self.env.uid)]
+
     # Compute approvers
     # @api.depends('employee_id', 'department_id', 'estimated_total')
     # def _compute_approvers(self):
@@ -209,10 +284,16 @@ class EprPurchaseRequest(models.Model):
     #             request.approver_ids = False
 
     # Compute RFQ count
-    @api.depends('rfq_ids')
+    @api.depends('rfq_ids', 'rfq_ids.active')
     def _compute_rfq_count(self):
+        counts = self._count_relation('rfq_ids')
+        for record in self:
+            record.rfq_count = counts.get(record.id, 0)
+
+    def _compute_purchase_count(self):
+        po_ids = self.env['epr.lineage']._get_related_ids('request_id', self.ids, 'purchase_id')
         for record in self:
-            record.rfq_count = len(record.rfq_ids)
+            record.purchase_count = len(po_ids.get(record.id, []))
 
     # ==========================================================================
     # HELPER METHODS (Tách logic tìm người duyệt ra riêng)
@@ -238,31 +319,73 @@ class EprPurchaseRequest(models.Model):
 
         return approvers
 
+    def _check_approver_rights(self, message):
+        """
+        Kiểm tra quyền duyệt cho cả recordset bằng 1 query duy nhất
+        trên bảng quan hệ approver_ids (thay vì `user in approver_ids` từng phiếu).
+        Administrator được bypass.
+        """
+        if self.env.is_superuser() or not self:
+            return
+
+        self.flush_recordset(['approver_ids'])
+        field = self._fields['approver_ids']
+        self.env.cr.execute(
+            f'SELECT "{field.column1}" FROM "{field.relation}" '
+            f'WHERE "{field.column1}" IN %s AND "{field.column2}" = %s',
+            (tuple(self.ids), self.env.uid)
+        )
+        allowed_ids = {row[0] for row in self.env.cr.fetchall()}
+
+        denied = self.filtered(lambda r: r.id not in allowed_ids)
+        if denied:
+            raise UserError(message + '\n' + ', '.join(denied.mapped('name')))
+
     # ==========================================================================
     # BUSINESS ACTIONS
     # ==========================================================================
 
     # Submit PR for approval
     def action_submit(self):
-        """Submit PR for approval"""
-        self.ensure_one()
-
+        """
+        Submit PR for approval.
+        Hỗ trợ chạy trên nhiều phiếu: gom các phiếu có cùng danh sách
+        người duyệt để ghi 1 lần cho mỗi nhóm.
+        """
         # 1. Validate dữ liệu đầu vào
-        if not self.line_ids:
-            raise ValidationError(_('Cannot submit an empty purchase request. Please add at least one product line.'))
+        not_draft = self.filtered(lambda r: r.state != 'draft')
+        if not_draft:
+            raise UserError(_(
+                'Only draft requests can be submitted: %s'
+            ) % ', '.join(not_draft.mapped('name')))
+
+        empty = self.filtered(lambda r: not r.line_ids)
+        if empty:
+            raise ValidationError(_(
+                'Cannot submit an empty purchase request. '
+                'Please add at least one product line: %s'
+            ) % ', '.join(empty.mapped('name')))
 
         # 2. Tính toán và Gán người duyệt (Freeze approvers list)
         # Thay vì dùng compute field, ta gán trực tiếp lúc submit để "chốt" người duyệt
-        required_approvers = self._get_applicable_approvers()
-
-        if not required_approvers:
-            raise ValidationError(_('No approver found (Line Manager). Please contact HR or Admin to update your employee profile.'))
-
-        self.write({
-            'approver_ids': [(6, 0, required_approvers.ids)],
-            'state': 'to_approve',
-            'date_submitted': fields.Datetime.now()
-        })
+        grouped = {}
+        for request in self:
+            required_approvers = request._get_applicable_approvers()
+            if not required_approvers:
+                raise ValidationError(_(
+                    'No approver found (Line Manager) for %s. '
+                    'Please contact HR or Admin to update your employee profile.'
+                ) % request.name)
+            key = tuple(sorted(required_approvers.ids))
+            grouped[key] = grouped.get(key, self.browse()) | request
+
+        now = fields.Datetime.now()
+        for approver_ids, requests in grouped.items():
+            requests.write({
+                'approver_ids': [Command.set(list(approver_ids))],
+                'state': 'to_approve',
+                'date_submitted': now
+            })
 
         # # 3. Tạo Activity (To-Do) cho người duyệt để họ nhận thông báo
         # NOTE: Commented out for testing without mail server
@@ -290,13 +413,19 @@ class EprPurchaseRequest(models.Model):
 
     # Approver action: Approve PR
     def action_approve(self):
-        """Approve PR"""
-        self.ensure_one()
+        """
+        Approve PR.
+        Chạy được trên nhiều phiếu (duyệt hàng loạt từ List View).
+        """
+        not_pending = self.filtered(lambda r: r.state != 'to_approve')
+        if not_pending:
+            raise UserError(_(
+                'Only requests in "To Approve" state can be approved: %s'
+            ) % ', '.join(not_pending.mapped('name')))
 
-        # 1. Check quyền: User hiện tại có nằm trong danh sách được duyệt không?
+        # 1. Check quyền cho toàn bộ recordset (1 query)
         # Cho phép Administrator bypass
-        if not self.env.is_superuser() and self.env.user not in self.approver_ids:
-            raise UserError(_('You are not authorized to approve this request.'))
+        self._check_approver_rights(_('You are not authorized to approve these requests:'))
 
         # 2. Cập nhật trạng thái
         self.write({
@@ -324,22 +453,24 @@ class EprPurchaseRequest(models.Model):
     def action_reject(self, reason):
         """
         Reject PR with reason (called from wizard).
-        Chuyển trạng thái sang 'draft' và ghi log.
+        Chuyển trạng thái sang 'rejected' và ghi log.
+        Chạy được trên nhiều phiếu với cùng một lý do.
         """
-        self.ensure_one()
+        not_pending = self.filtered(lambda r: r.state != 'to_approve')
+        if not_pending:
+            raise UserError(_(
+                'Only requests in "To Approve" state can be rejected: %s'
+            ) % ', '.join(not_pending.mapped('name')))
 
         # Check quyền: User hiện tại có nằm trong danh sách được duyệt không?
         # Lưu ý: Nên cho phép cả Administrator bypass check này để xử lý sự cố
-        if not self.env.is_superuser() and self.env.user not in self.approver_ids:
-            raise UserError(
-                _('You are not authorized to reject this request.')
-            )
+        self._check_approver_rights(_('You are not authorized to reject these requests:'))
 
         # Thực hiện ghi dữ liệu
         self.write({
             'state': 'rejected',
             'rejection_reason': reason,
-            'approver_ids': [(5, 0, 0)],  # QUAN TRỌNG: Xóa sạch người duyệt để clear danh sách chờ
+            'approver_ids': [Command.clear()],  # QUAN TRỌNG: Xóa sạch người duyệt để clear danh sách chờ
             # LOG: Ghi nhận thông tin từ chối
             'date_rejected': fields.Datetime.now(),
             'rejected_by_id': self.env.user.id,
@@ -352,27 +483,27 @@ class EprPurchaseRequest(models.Model):
         Cho phép User sửa lại phiếu khi submit nhầm hoặc sau khi bị reject.
         Chỉ owner mới được reset (không phải Manager).
         """
-        self.ensure_one()
-
         # Validation 1: Check state
-        if self.state not in ['to_approve', 'rejected']:
+        if any(state not in ['to_approve', 'rejected'] for state in self.mapped('state')):
             raise UserError(_(
                 'You can only reset PR when it is in "To Approve" '
                 'or "Rejected" state.'
             ))
 
         # Validation 2: Check permission - Only owner can reset
-        # Admin có thể bypass
-        if (not self.env.is_superuser() and
-                self.employee_id.user_id != self.env.user):
-            raise UserError(_(
-                'Only the requester (%s) can reset this PR to draft.'
-            ) % self.employee_id.name)
+        # Admin có thể bypass. Kiểm tra trên chính recordset (không search lại:
+        # search bỏ qua bản ghi bị Record Rule / active ẩn đi và làm lọt kiểm tra)
+        if not self.env.is_superuser():
+            not_owned = self.filtered(lambda pr: not pr.is_owner)[:1]
+            if not_owned:
+                raise UserError(_(
+                    'Only the requester (%s) can reset this PR to draft.'
+                ) % not_owned.employee_id.name)
 
         # Reset state và clear data
         self.write({
             'state': 'draft',
-            'approver_ids': [(5, 0, 0)],  # Clear approvers list
+            'approver_ids': [Command.clear()],  # Clear approvers list
             'rejection_reason': False,  # Clear rejection reason
             'date_submitted': False,  # Clear submission date
         })
@@ -389,6 +520,64 @@ class EprPurchaseRequest(models.Model):
         # NOTE: Commented out for testing without mail server
         # self.activity_ids.unlink()
 
+    def action_suggest_vendors(self):
+        """
+        Gợi ý NCC tốt nhất (giá trung bình trượt thấp nhất) cho các dòng đã map
+        sản phẩm nhưng chưa chốt Final Vendor, trên nhiều PR cùng lúc.
+        Đơn giá ước tính chỉ được điền nếu dòng chưa có giá.
+        """
+        lines = self.line_ids.filtered(lambda l: l.product_id and not l.final_vendor_id)
+        updated = self.env['epr.purchase.request.line']
+        for currency, currency_lines in lines.grouped('currency_id').items():
+            best = self.env['epr.vendor.price']._get_prices(currency_lines.product_id.ids, currency.id)
+            # Gom theo (vendor, giá) để ghi 1 lần cho mỗi nhóm
+            groups = {}
+            for line in currency_lines:
+                price = best.get(line.product_id.id)
+                if not price:
+                    continue
+                estimated = line.estimated_price or price['avg_price']
+                key = (price['partner_id'], estimated)
+                groups[key] = groups.get(key, self.env['epr.purchase.request.line']) | line
+            for (partner_id, estimated), group_lines in groups.items():
+                group_lines.write({'final_vendor_id': partner_id, 'estimated_price': estimated})
+                updated |= group_lines
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'success' if updated else 'warning',
+                'message': _('%s line(s) received a suggested vendor.', len(updated)),
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
+
+    def action_match_vendors(self):
+        """
+        So khớp tên NCC tự do của các dòng chưa có Final Vendor với danh bạ NCC
+        (pg_trgm), trên nhiều PR cùng lúc. Dòng không đủ tin cậy -> hàng chờ review.
+        """
+        matched, reviews = self.env['epr.vendor.match.review']._match_lines(self.line_ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'success' if matched else 'warning',
+                'message': _(
+                    '%(matched)s line(s) matched a vendor, %(review)s line(s) need review.',
+                    matched=len(matched), review=len(reviews),
+                ),
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
+
+    def action_compare_quotes(self):
+        """Bảng so sánh báo giá (dòng PR x NCC) của các PR đã chọn"""
+        action = self.env['ir.actions.act_window']._for_xml_id('epr.action_epr_quote_comparison')
+        action['domain'] = [('request_id', 'in', self.ids)]
+        return action
+
     # === ACTION SMART BUTTON ===
     def action_view_rfqs(self):
         """Mở danh sách các RFQ liên quan đến PR này"""
@@ -405,6 +594,28 @@ class EprPurchaseRequest(models.Model):
             },
         }
 
+    def action_view_purchase_orders(self):
+        """Mở các PO sinh ra từ PR này (tra trên bảng truy vết)"""
+        self.ensure_one()
+        po_ids = self.env['epr.lineage']._get_related_ids('request_id', self.ids, 'purchase_id')
+        return {
+            'name': _('Purchase Orders'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.order',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', po_ids.get(self.id, []))],
+            'context': {'create': False},
+        }
+
+    def action_view_fulfilment(self):
+        """Tình trạng thực hiện từng dòng của PR này"""
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('epr.action_epr_fulfilment_report')
+        action['domain'] = [('request_id', '=', self.id)]
+        action['context'] = {'search_default_group_pr_line': 1}
+        return action
+
+
 # ==============================================================================
 # CLASS CON: epr.purchase.request.line (Chi tiết hàng hóa trong PR)
 # ==============================================================================
@@ -533,6 +744,25 @@ class EprPurchaseRequestLine(models.Model):
         help="Tổng tiền ước tính (Số lượng * Đơn giá)."
     )
 
+    # ==========================================================================
+    # MODEL METHODS
+    # ==========================================================================
+    # Ảnh dán trực tiếp (base64) trong mô tả được chuyển sang filestore
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['epr.image.offload.log']._offload_vals(vals_list)
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('product_description'):
+            vals = dict(vals)
+            self.env['epr.image.offload.log']._offload_vals([vals])
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['epr.lineage']._forget('pr_line_id', self.ids)
+        return super().unlink()
+
     # ==========================================================================
     # COMPUTE FIELDS
     # ==========================================================================
@@ -564,6 +794,17 @@ class EprPurchaseRequestLine(models.Model):
             self.final_vendor_id = False
             # suggested_vendor_name giữ nguyên để User có thể nhập thủ công
 
+    @api.onchange('product_id', 'final_vendor_id')
+    def _onchange_suggest_estimated_price(self):
+        """Điền đơn giá ước tính từ lịch sử giá (nếu dòng chưa có giá)."""
+        if not self.product_id or self.estimated_price:
+            return
+        price = self.env['epr.vendor.price']._get_prices(
+            self.product_id.ids, self.currency_id.id, self.final_vendor_id.id or None
+        ).get(self.product_id.id)
+        if price:
+            self.estimated_price = price['avg_price']
+
     @api.constrains('user_vendor_id', 'suggested_vendor_name')
     def _check_vendor_presence(self):
         """
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, tools, _
+from odoo.exceptions import UserError
+
+# Trạng thái RFQ mà báo giá được coi là hợp lệ để so sánh / chọn thầu
+VALID_RFQ_STATES = ('received', 'to_approve', 'approved', 'confirmed')
+
+
+class EprQuoteComparison(models.Model):
+    """
+    Bảng so sánh báo giá (dòng PR x NCC): 1 dòng / dòng RFQ có dòng PR nguồn.
+    Pivot (dòng PR x NCC) chỉ là 1 read_group trên view này; giá rẻ nhất của
+    mỗi dòng PR được tính sẵn bằng subquery theo index pr_line_id nên lọc theo
+    PR / dòng PR / NCC đều đẩy xuống được bảng gốc.
+    """
+    _name = 'epr.quote.comparison'
+    _description = 'ePR Quote Comparison'
+    _auto = False
+    _rec_name = 'pr_line_id'
+    _order = 'pr_line_id, price_company, id'
+
+    pr_line_id = fields.Many2one(
+        comodel_name='epr.purchase.request.line',
+        string='PR Line',
+        readonly=True
+    )
+
+    request_id = fields.Many2one(
+        comodel_name='epr.purchase.request',
+        string='Purchase Request',
+        readonly=True
+    )
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        readonly=True
+    )
+
+    rfq_id = fields.Many2one(
+        comodel_name='epr.rfq',
+        string='RFQ',
+        readonly=True
+    )
+
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Vendor',
+        readonly=True
+    )
+
+    rfq_state = fields.Selection(
+        selection=lambda self: self.env['epr.rfq']._fields['state'].selection,
+        string='RFQ Status',
+        readonly=True
+    )
+
+    date_order = fields.Datetime(
+        string='Order Date',
+        readonly=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        readonly=True
+    )
+
+    company_currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Company Currency',
+        readonly=True
+    )
+
+    quantity = fields.Float(
+        string='Quantity',
+        digits='Product Unit of Measure',
+        readonly=True,
+        aggregator='min'
+    )
+
+    price_unit = fields.Float(
+        string='Unit Price',
+        digits='Product Price',
+        readonly=True,
+        aggregator='min'
+    )
+
+    subtotal = fields.Monetary(
+        string='Subtotal',
+        currency_field='currency_id',
+        readonly=True,
+        aggregator='min'
+    )
+
+    # Đơn giá quy đổi theo tỷ giá đã dùng cho tổng tiền của RFQ (amount_company / amount_total)
+    price_company = fields.Monetary(
+        string='Unit Price (Company Currency)',
+        currency_field='company_currency_id',
+        readonly=True,
+        aggregator='min'
+    )
+
+    is_valid = fields.Boolean(
+        string='Valid Quote',
+        readonly=True
+    )
+
+    is_cheapest = fields.Boolean(
+        string='Cheapest',
+        readonly=True
+    )
+
+    is_awarded = fields.Boolean(
+        string='Awarded',
+        readonly=True
+    )
+
+    def init(self):
+        valid = """
+            {rfq}.active AND {rfq}.state IN %(states)s AND {line}.price_unit > 0
+        """
+        price = """
+            {line}.price_unit * COALESCE({rfq}.amount_company / NULLIF({rfq}.amount_total, 0), 1)
+        """
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE VIEW epr_quote_comparison AS (
+                SELECT line.id,
+                       line.pr_line_id,
+                       pr_line.request_id,
+                       line.product_id,
+                       line.rfq_id,
+                       rfq.partner_id,
+                       rfq.state AS rfq_state,
+                       rfq.date_order,
+                       rfq.currency_id,
+                       company.currency_id AS company_currency_id,
+                       line.quantity,
+                       line.price_unit,
+                       line.subtotal,
+                       {price.format(line='line', rfq='rfq')} AS price_company,
+                       {valid.format(line='line', rfq='rfq')} AS is_valid,
+                       COALESCE(
+                           {valid.format(line='line', rfq='rfq')}
+                           AND {price.format(line='line', rfq='rfq')} <= best.price_company,
+                           FALSE
+                       ) AS is_cheapest,
+                       COALESCE(line.is_awarded, FALSE) AS is_awarded
+                  FROM epr_rfq_line line
+                  JOIN epr_rfq rfq ON rfq.id = line.rfq_id
+                  JOIN res_company company ON company.id = rfq.company_id
+                  JOIN epr_purchase_request_line pr_line ON pr_line.id = line.pr_line_id
+             LEFT JOIN LATERAL (
+                       SELECT MIN({price.format(line='other', rfq='other_rfq')}) AS price_company
+                         FROM epr_rfq_line other
+                         JOIN epr_rfq other_rfq ON other_rfq.id = other.rfq_id
+                        WHERE other.pr_line_id = line.pr_line_id
+                          AND {valid.format(line='other', rfq='other_rfq')}
+                   ) best ON TRUE
+            )
+        """, {'states': VALID_RFQ_STATES})
+
+    # ==========================================================================
+    # ACTIONS
+    # ==========================================================================
+
+    def action_award(self):
+        """Chọn thầu theo các báo giá đã chọn (tối đa 1 báo giá / dòng PR)."""
+        if not all(self.mapped('is_valid')):
+            raise UserError(_("Chỉ có thể chọn thầu các báo giá hợp lệ (RFQ đã nhận báo giá, đơn giá > 0)."))
+        if len(self.pr_line_id) != len(self):
+            raise UserError(_("Mỗi dòng PR chỉ được chọn thầu 1 báo giá."))
+        self._award()
+
+    def action_award_cheapest(self):
+        """Chọn thầu báo giá rẻ nhất cho mọi dòng PR có trong lựa chọn."""
+        cheapest = self.search(
+            [('pr_line_id', 'in', self.pr_line_id.ids), ('is_cheapest', '=', True)],
+            order='pr_line_id, id',
+        )
+        # Nhiều NCC bằng giá: lấy báo giá đầu tiên của mỗi dòng PR
+        picked = {}
+        for quote in cheapest:
+            picked.setdefault(quote.pr_line_id.id, quote.id)
+        self.browse(list(picked.values()))._award()
+
+    def _award(self):
+        """
+        Đánh dấu dòng RFQ thắng thầu (bỏ đánh dấu các báo giá khác của cùng dòng PR)
+        và ghi Final Vendor lên dòng PR: 1 write cho mỗi chiều + 1 write / NCC.
+        """
+        if not self:
+            return
+        RfqLine = self.env['epr.rfq.line']
+        pr_lines = self.pr_line_id
+        if RfqLine.search_count([('pr_line_id', 'in', pr_lines.ids), ('purchase_line_id', '!=', False)], limit=1):
+            raise UserError(_("Không thể chọn lại thầu cho dòng PR đã có Đơn mua hàng (PO)."))
+
+        RfqLine.search([
+            ('pr_line_id', 'in', pr_lines.ids),
+            ('is_awarded', '=', True),
+            ('id', 'not in', self.ids),
+        ]).write({'is_awarded': False})
+        RfqLine.browse(self.ids).write({'is_awarded': True})
+        for partner, quotes in self.grouped('partner_id').items():
+            quotes.pr_line_id.write({'final_vendor_id': partner.id})
+        self.invalidate_model()
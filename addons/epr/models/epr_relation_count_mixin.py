@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools import SQL
+
+
+class EprRelationCountMixin(models.AbstractModel):
+    """
+    Đếm số bản ghi liên kết qua bảng trung gian Many2many bằng SQL.
+    Dùng cho các Smart Button (RFQ Count, PO Count, PR Count...) để không phải
+    load toàn bộ recordset liên kết chỉ để gọi len().
+    Field đếm được lưu (store) phải depends cả `<fname>.active` khi comodel có
+    trường active, để lưu trữ / bỏ lưu trữ bản ghi liên kết cũng tính lại số đếm.
+    """
+    _name = 'epr.relation.count.mixin'
+    _description = 'ePR Relation Counter Mixin'
+
+    def _count_relation(self, fname):
+        """
+        Đếm số dòng trong bảng quan hệ của field Many2many `fname`
+        cho toàn bộ recordset bằng 1 câu GROUP BY.
+
+        :return: dict {record_id: count}
+        """
+        field = self._fields[fname]
+        counts = {}
+
+        # Bản ghi chưa lưu (onchange) đếm trực tiếp trên cache
+        new_records = self.filtered(lambda r: not r.id)
+        for record in new_records:
+            counts[record.id] = len(record[fname])
+
+        ids = (self - new_records).ids
+        if not ids:
+            return counts
+
+        comodel = self.env[field.comodel_name]
+        self.flush_model([fname])
+        # Như len() trên recordset (active_test): không đếm bản ghi đã lưu trữ (active = False)
+        active_clause = SQL()
+        if comodel._active_name:
+            comodel.flush_model([comodel._active_name])
+            active_clause = SQL(
+                "JOIN %s comodel ON comodel.id = rel.%s AND comodel.%s",
+                SQL.identifier(comodel._table),
+                SQL.identifier(field.column2),
+                SQL.identifier(comodel._active_name),
+            )
+        self.env.cr.execute(SQL(
+            "SELECT rel.%s, COUNT(*) FROM %s rel %s WHERE rel.%s IN %s GROUP BY rel.%s",
+            SQL.identifier(field.column1),
+            SQL.identifier(field.relation),
+            active_clause,
+            SQL.identifier(field.column1),
+            tuple(ids),
+            SQL.identifier(field.column1),
+        ))
+        counts.update(self.env.cr.fetchall())
+        return counts
@@ -1,14 +1,36 @@
 # -*- coding: utf-8 -*-
+import logging
+
 from odoo import models, fields, api, Command, _
 from odoo.exceptions import UserError, ValidationError
 
+_logger = logging.getLogger(__name__)
+
+# Namespace (key 1) của advisory lock theo rfq_id khi chuyển tầng duyệt
+APPROVAL_LOCK_NAMESPACE = 0x45505231  # 'EPR1'
+
+# Số tiền tham chiếu để lấy hệ số thuế tỷ lệ của 1 nhóm dòng RFQ (_compute_subtotal)
+TAX_FACTOR_BASE = 1000000.0
+
 
 class EprRfq(models.Model):
     _name = 'epr.rfq'
     _description = 'EPR Request for Quotation'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'epr.deferred.tracking.mixin',  # Phải đứng trước mail.thread
+        'mail.thread',
+        'mail.activity.mixin',
+        'epr.relation.count.mixin',
+        'epr.api.mixin',
+    ]
     _order = 'id desc'
 
+    # JSON API (controllers/main.py): chỉ đọc, RFQ được tạo từ wizard
+    _api_default_fields = (
+        'id', 'name', 'state', 'approval_state', 'partner_id',
+        'amount_total', 'currency_id', 'date_order', 'write_date',
+    )
+
     # === 1. IDENTIFICATION ===
     name = fields.Char(
         string='Reference',
@@ -40,6 +62,9 @@ class EprRfq(models.Model):
     )
 
     # Tích hợp với Approval Entry
+    # Được ghi bởi approval state engine (submit / _check_approval_completion / reject),
+    # không compute theo approval_entry_ids.status để mỗi lần duyệt 1 dòng entry
+    # không phải ghi lại dòng header của RFQ (tránh tranh chấp khi duyệt song song).
     approval_state = fields.Selection(
         selection=[
             ('draft', 'Not Required'),
@@ -48,8 +73,9 @@ class EprRfq(models.Model):
             ('refused', 'Refused')
         ],
         string='Approval Matrix Status',
-        compute='_compute_approval_state',
-        store=True
+        default='draft',
+        readonly=True,
+        copy=False
     )
 
     approval_entry_ids = fields.One2many(
@@ -59,12 +85,24 @@ class EprRfq(models.Model):
     )
 
     # Tính tổng tiền trên RFQ để so sánh trong approval process
+    # store=True để sort/group/filter trực tiếp bằng SQL (List, Approval Inbox)
     amount_total = fields.Monetary(
         compute='_compute_amount_total',
         string='Total',
+        store=True,
         currency_field='currency_id'
     )
 
+    # Tổng tiền quy đổi về tiền tệ công ty (theo tỷ giá ngày date_order)
+    # Dùng để so khớp ngưỡng tiền của Approval Rule và báo cáo
+    amount_company = fields.Monetary(
+        compute='_compute_amount_total',
+        string='Total (Company Currency)',
+        store=True,
+        index=True,
+        currency_field='company_currency_id'
+    )
+
     # Stores the reason directly on the RFQ for easy visibility
     rejection_reason = fields.Text(
         string='Rejection Reason',
@@ -122,6 +160,12 @@ class EprRfq(models.Model):
         readonly=True
     )
 
+    company_currency_id = fields.Many2one(
+        related='company_id.currency_id',
+        string='Company Currency',
+        readonly=True
+    )
+
     # === 3. DATES ===
     date_order = fields.Datetime(
         string='Order Date', 
@@ -154,12 +198,14 @@ class EprRfq(models.Model):
 
     purchase_count = fields.Integer(
         compute='_compute_purchase_count',
-        string='PO Count'
+        string='PO Count',
+        store=True
     )
 
     request_count = fields.Integer(
         compute='_compute_request_count',
-        string='PR Count'
+        string='PR Count',
+        store=True
     )
 
     # -------------------------------------------------------------------------
@@ -167,45 +213,71 @@ class EprRfq(models.Model):
     # -------------------------------------------------------------------------
     @api.depends('purchase_ids')
     def _compute_purchase_count(self):
+        counts = self._count_relation('purchase_ids')
         for rfq in self:
-            rfq.purchase_count = len(rfq.purchase_ids)
+            rfq.purchase_count = counts.get(rfq.id, 0)
 
     # Link ngược về PR gốc
-    @api.depends('request_ids')
+    @api.depends('request_ids', 'request_ids.active')
     def _compute_request_count(self):
+        counts = self._count_relation('request_ids')
         for rfq in self:
-            rfq.request_count = len(rfq.request_ids)
-
-    # Compute Approval State
-    @api.depends('approval_entry_ids.status')
-    def _compute_approval_state(self):
-        for rfq in self:
-            if not rfq.approval_entry_ids:
-                rfq.approval_state = 'draft'
-                continue
-
-            # Nếu có bất kỳ dòng nào bị từ chối -> Toàn bộ bị từ chối
-            if any(e.status == 'refused' for e in rfq.approval_entry_ids):
-                rfq.approval_state = 'refused'
-            # Nếu tất cả đã duyệt -> Approved
-            elif all(e.status == 'approved' for e in rfq.approval_entry_ids):
-                rfq.approval_state = 'approved'
-            # Còn lại là đang chờ
-            else:
-                rfq.approval_state = 'pending'
+            rfq.request_count = counts.get(rfq.id, 0)
 
     # === 6. CRUD OVERRIDES ===
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('epr.rfq') or _('New')
+        # Cấp số thứ tự cho cả lô trong 1 lần gọi sequence
+        to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence']._next_by_code_block('epr.rfq', len(to_name))
+        for vals, name in zip(to_name, names):
+            vals['name'] = name or _('New')
         return super().create(vals_list)
 
-    @api.depends('line_ids.subtotal')
+    def unlink(self):
+        # Dòng RFQ bị xóa theo (ON DELETE CASCADE) không đi qua unlink của dòng
+        self.env['epr.lineage']._forget('rfq_id', self.ids)
+        return super().unlink()
+
+    @api.depends('line_ids.subtotal', 'currency_id', 'company_id', 'date_order')
     def _compute_amount_total(self):
+        """
+        Tính tổng theo lô: cộng subtotal đã lưu của các dòng bằng 1 read_group,
+        quy đổi sang tiền tệ công ty với cache tỷ giá theo (currency, date).
+        """
+        stored = self.filtered('id')
+        totals = {}
+        if stored:
+            totals = {
+                rfq.id: amount
+                for rfq, amount in self.env['epr.rfq.line']._read_group(
+                    [('rfq_id', 'in', stored.ids)],
+                    groupby=['rfq_id'],
+                    aggregates=['subtotal:sum'],
+                )
+            }
+
+        rates = {}
         for rfq in self:
-            rfq.amount_total = sum(rfq.line_ids.mapped('subtotal'))
+            if rfq.id:
+                total = totals.get(rfq.id, 0.0)
+            else:
+                # Bản ghi chưa lưu (onchange): cộng trực tiếp trên cache
+                total = sum(rfq.line_ids.mapped('subtotal'))
+            rfq.amount_total = total
+
+            company_currency = rfq.company_id.currency_id
+            if not rfq.currency_id or rfq.currency_id == company_currency:
+                rfq.amount_company = total
+                continue
+
+            date = fields.Date.to_date(rfq.date_order) or fields.Date.context_today(rfq)
+            key = (rfq.currency_id.id, company_currency.id, rfq.company_id.id, date)
+            if key not in rates:
+                rates[key] = self.env['res.currency']._get_conversion_rate(
+                    rfq.currency_id, company_currency, rfq.company_id, date
+                )
+            rfq.amount_company = company_currency.round(total * rates[key])
 
     # -------------------------------------------------------------------------
     # 7. ACTIONS
@@ -234,6 +306,8 @@ class EprRfq(models.Model):
             rfq.write({
                 'state': 'confirmed',
             })
+        # Cập nhật lịch sử giá theo (Sản phẩm, NCC, Tiền tệ)
+        self.env['epr.vendor.price'].sudo()._update_from_rfqs(self)
 
     def action_cancel_rfq(self):
         """Hủy RFQ ở bất kỳ trạng thái nào (trừ khi đã hủy rồi)"""
@@ -258,6 +332,7 @@ class EprRfq(models.Model):
             'partner_id': self.partner_id.id,
             'date_order': fields.Datetime.now(),
             'epr_source_rfq_ids': [Command.link(self.id)],  # Link ngược lại RFQ này (Many2many)
+            'epr_source_pr_ids': [Command.set(self.line_ids.pr_line_id.request_id.ids)],
             'origin': self.name,
             'company_id': self.company_id.id,
             'currency_id': self.currency_id.id,
@@ -272,11 +347,18 @@ class EprRfq(models.Model):
                 'price_unit': line.price_unit,
                 'product_uom': line.uom_id.id,
                 'date_planned': fields.Datetime.now(),
+                'taxes_id': [Command.set(line.taxes_id.ids)],
+                # Dòng PO tự link ngược RFQ Line + bảng truy vết (purchase.order.line.create)
+                'epr_rfq_line_id': line.id,
             }))
 
         new_po = self.env['purchase.order'].create(po_vals)
 
+        # Lịch sử giá chỉ ghi khi RFQ chuyển sang Confirmed (action_confirm đã ghi nếu
+        # RFQ đã được xác nhận trước đó), tránh đếm 2 lần cùng 1 báo giá
+        newly_confirmed = self.filtered(lambda rfq: rfq.state != 'confirmed')
         self.write({'state': 'confirmed'})
+        self.env['epr.vendor.price'].sudo()._update_from_rfqs(newly_confirmed)
 
         # Mở view PO vừa tạo
         return {
@@ -365,69 +447,68 @@ class EprRfq(models.Model):
     # -------------------------------------------------------------------------
 
     def action_submit_approval(self):
-        """Nút bấm Submit for Approval - Odoo 18 Optimized"""
-        self.ensure_one()
-
-        if not self.line_ids:
-            raise UserError(_("Vui lòng nhập chi tiết sản phẩm trước khi trình duyệt."))
-
-        # 1. Quy đổi tiền tệ
-        currency_company = self.company_id.currency_id
-        amount_company = self.amount_total
-        if self.currency_id and self.currency_id != currency_company:
-            amount_company = self.currency_id._convert(
-                self.amount_total, currency_company, self.company_id, 
-                self.date_order or fields.Date.context_today(self)
+        """
+        Nút bấm Submit for Approval - Odoo 18 Optimized.
+        Chạy được trên nhiều RFQ (trình duyệt cuối ngày theo lô):
+        resolve Rule cho tất cả RFQ trong 1 lượt, xóa entry cũ bằng 1 lệnh
+        và tạo toàn bộ entry mới bằng 1 lần create(vals_list).
+        """
+        # Chỉ RFQ đã nhận báo giá (như điều kiện hiện nút trên form): tránh server
+        # action trên List View xóa entry và trình duyệt lại RFQ đã duyệt / đã xác nhận
+        not_received = self.filtered(lambda rfq: rfq.state != 'received')
+        if not_received:
+            raise UserError(_(
+                "Chỉ có thể trình duyệt RFQ ở trạng thái 'Received': %s",
+                ', '.join(not_received.mapped('name'))
+            ))
+
+        empty = self.filtered(lambda rfq: not rfq.line_ids)
+        if empty:
+            raise UserError(_(
+                "Vui lòng nhập chi tiết sản phẩm trước khi trình duyệt: %s",
+                ', '.join(empty.mapped('name'))
+            ))
+
+        # 1. Tìm Rule & các bước duyệt phù hợp (resolver có cache, không query DB)
+        # amount_company đã được quy đổi và lưu sẵn trên RFQ
+        Rule = self.env['epr.approval.rule']
+        no_rule = self.browse()
+        vals_list = []
+        for rfq in self:
+            rule_id, applicable_steps = Rule._resolve_steps(
+                rfq.company_id.id, rfq.department_id.id, rfq.amount_company
             )
+            if not rule_id or not applicable_steps:
+                no_rule |= rfq
+                continue
 
-        # 2. Tìm Rule phù hợp
-        rule = self.env['epr.approval.rule'].search([
-            ('active', '=', True),
-            ('company_id', '=', self.company_id.id),
-            '|', ('department_id', '=', False), ('department_id', '=', self.department_id.id)
-        ], order='department_id desc, sequence asc, id desc', limit=1)
-
-        if not rule:
-            self.write({'state': 'approved', 'approval_state': 'approved'})
-            return 
-        # 3. Lọc các bước duyệt dựa trên giá trị đơn hàng
-        applicable_lines = rule.line_ids.filtered(
-            lambda l: (not l.min_amount or l.min_amount <= amount_company)
-        ).sorted('sequence')
-
-        if not applicable_lines:
-            self.write({'state': 'approved', 'approval_state': 'approved'})
-            return
+            # 2. Hỗ trợ Duyệt song song cùng tầng (Sequence)
+            min_seq = applicable_steps[0].sequence
+            for step in applicable_steps:
+                # Nếu cùng tầng Sequence nhỏ nhất -> 'new' luôn
+                status = 'new' if step.sequence == min_seq else 'pending'
+                vals_list.append({
+                    'rfq_id': rfq.id,
+                    'name': step.name,
+                    'sequence': step.sequence,
+                    'status': status,
+                    'required_user_ids': [Command.set(list(step.user_ids))],
+                    'rule_line_id': step.line_id,
+                })
+
+        # 3. Xóa các entry cũ của toàn bộ RFQ (1 lệnh unlink)
+        self.sudo().approval_entry_ids.unlink()
 
-        # 3. Lọc và Sắp xếp các bước duyệt
-        applicable_lines = rule.line_ids.filtered(
-            lambda l: (not l.min_amount or l.min_amount <= amount_company)
-        ).sorted('sequence')
-        if not applicable_lines:
-            self.write({'state': 'approved', 'approval_state': 'approved'})
-            return
+        if no_rule:
+            no_rule.write({'state': 'approved', 'approval_state': 'approved'})
 
-        # 4. Hỗ trợ Duyệt song song cùng tầng (Sequence)
-        self.sudo().approval_entry_ids.unlink()
-        vals_list = []
-        min_seq = applicable_lines[0].sequence
-        for line in applicable_lines:
-            # Nếu cùng tầng Sequence nhỏ nhất -> 'new' luôn
-            status = 'new' if line.sequence == min_seq else 'pending'
-            vals_list.append({
-                'rfq_id': self.id,
-                'name': line.name,
-                'sequence': line.sequence,
-                'status': status,
-                'required_user_ids': [Command.set(line.user_ids.ids)],
-                'rule_line_id': line.id,
+        to_approve = self - no_rule
+        if to_approve:
+            self.env['epr.approval.entry'].create(vals_list)
+            to_approve.write({
+                'state': 'to_approve',
+                'approval_state': 'pending'
             })
-        self.env['epr.approval.entry'].create(vals_list)
-
-        self.write({
-            'state': 'to_approve', 
-            'approval_state': 'pending'
-        })
 
         # Optional: Gửi email thông báo cho người duyệt bước đầu tiên
         # self._notify_next_approvers()
@@ -435,32 +516,138 @@ class EprRfq(models.Model):
     # -------------------------------------------------------------------------
     # APPROVAL LOGIC: LINEARIZATION
     # -------------------------------------------------------------------------
+    def _schedule_approval_completion(self):
+        """
+        Lên lịch kiểm tra/chuyển tầng duyệt sau khi transaction hiện tại commit.
+
+        Các approver cùng tầng duyệt song song chỉ ghi dòng entry của riêng họ.
+        Việc chuyển tầng chạy sau commit trong 1 transaction mới, tuần tự hóa
+        theo advisory lock của từng rfq_id: transaction này luôn đọc được
+        các phê duyệt đã commit nên không có lỗi serialization, không phải retry
+        và mỗi tầng chỉ được kích hoạt đúng 1 lần.
+        """
+        if not self:
+            return
+        if self.env.registry.in_test_mode():
+            # Test cursor không commit nên không có postcommit
+            self._check_approval_completion()
+            return
+
+        pending_ids = self.env.cr.postcommit.data.setdefault('epr.rfq.approval_completion', set())
+        if not pending_ids:
+            registry = self.env.registry
+            uid = self.env.uid
+            context = dict(self.env.context)
+
+            @self.env.cr.postcommit.add
+            def _complete_approvals():
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    env['epr.rfq']._run_approval_completion_locked(sorted(pending_ids))
+
+        pending_ids.update(self.ids)
+
+    @api.model
+    def _run_approval_completion_locked(self, rfq_ids):
+        """
+        Chạy _check_approval_completion cho `rfq_ids` dưới advisory lock
+        (session-level). Lock được lấy và commit trước, để transaction xử lý
+        bắt đầu với snapshot mới nhìn thấy mọi phê duyệt đã commit trước đó.
+        Lock được lấy theo thứ tự id tăng dần để tránh deadlock.
+        """
+        cr = self.env.cr
+        for rfq_id in rfq_ids:
+            cr.execute("SELECT pg_advisory_lock(%s, %s)", (APPROVAL_LOCK_NAMESPACE, rfq_id))
+        cr.commit()
+        try:
+            self.browse(rfq_ids).exists()._check_approval_completion()
+            cr.commit()
+        except Exception:
+            cr.rollback()
+            _logger.exception("ePR: approval completion failed for RFQs %s", rfq_ids)
+        finally:
+            for rfq_id in rfq_ids:
+                cr.execute("SELECT pg_advisory_unlock(%s, %s)", (APPROVAL_LOCK_NAMESPACE, rfq_id))
+            cr.commit()
+
+    @api.model
+    def _cron_check_approval_completion(self):
+        """
+        Lưới an toàn: chạy lại approval state engine cho các RFQ đang chờ duyệt
+        (ví dụ khi bước postcommit bị lỗi). Idempotent.
+        """
+        rfq_ids = self.search([('state', '=', 'to_approve')], order='id').ids
+        # Chia lô để không giữ quá nhiều advisory lock cùng lúc
+        for index in range(0, len(rfq_ids), 100):
+            self._run_approval_completion_locked(rfq_ids[index:index + 100])
+
     def _check_approval_completion(self):
         """
-        Hàm này được gọi mỗi khi 1 dòng entry được Approve/Refuse.
+        Hàm này được gọi mỗi khi dòng entry được Approve/Refuse.
         Nhiệm vụ: Kích hoạt bước tiếp theo hoặc Confirm RFQ.
+
+        Chạy trên nhiều RFQ cùng lúc: đọc trạng thái các tầng bằng 1 query
+        tổng hợp và kích hoạt tầng kế tiếp bằng 1 câu UPDATE.
         """
-        self.ensure_one()
+        if not self:
+            return
 
-        # A. Nếu có bất kỳ dòng nào bị từ chối -> Hủy toàn bộ quy trình
-        if any(e.status == 'refused' for e in self.approval_entry_ids):
-            self.write({
+        Entry = self.env['epr.approval.entry']
+        Entry.flush_model(['rfq_id', 'sequence', 'status'])
+
+        self.env.cr.execute("""
+            SELECT rfq_id,
+                   bool_or(status = 'refused'),
+                   count(*) FILTER (WHERE status = 'new'),
+                   count(*) FILTER (WHERE status = 'pending'),
+                   min(sequence) FILTER (WHERE status = 'pending')
+              FROM epr_approval_entry
+             WHERE rfq_id IN %s
+          GROUP BY rfq_id
+        """, (tuple(self.ids),))
+
+        refused_ids, approved_ids, promote = [], [], []
+        for rfq_id, has_refused, new_count, pending_count, next_seq in self.env.cr.fetchall():
+            # A. Nếu có bất kỳ dòng nào bị từ chối -> Hủy toàn bộ quy trình
+            if has_refused:
+                refused_ids.append(rfq_id)
+            # B. Không còn dòng nào chờ duyệt -> Approved
+            elif not new_count and not pending_count:
+                approved_ids.append(rfq_id)
+            # C. Tầng hiện tại đã duyệt xong hết -> Kích hoạt tầng tiếp theo
+            elif not new_count:
+                promote.append((rfq_id, next_seq))
+
+        if refused_ids:
+            self.browse(refused_ids).write({
                 'state': 'rejected',
                 'approval_state': 'refused'
             })
 
-            return
-
-        remaining = self.approval_entry_ids.filtered(lambda e: e.status in ['new', 'pending']).sorted('sequence')
-        if not remaining:
-            self.write({'state': 'approved', 'approval_state': 'approved'})
-            return
-
-        # Nếu tầng hiện tại đã duyệt xong hết (không còn ai status='new')
-        if not remaining.filtered(lambda e: e.status == 'new'):
-            # Kích hoạt tầng tiếp theo (tất cả các dòng có Sequence nhỏ nhất còn lại)
-            next_min_seq = remaining[0].sequence
-            remaining.filtered(lambda e: e.sequence == next_min_seq).write({'status': 'new'})
+        if approved_ids:
+            self.browse(approved_ids).write({'state': 'approved', 'approval_state': 'approved'})
+
+        if promote:
+            # Kích hoạt tất cả các dòng có Sequence nhỏ nhất còn lại của từng RFQ
+            self.env.cr.execute("""
+                UPDATE epr_approval_entry AS entry
+                   SET status = 'new',
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (SELECT unnest(%s::int[]) AS rfq_id,
+                               unnest(%s::int[]) AS sequence) AS tier
+                 WHERE entry.rfq_id = tier.rfq_id
+                   AND entry.sequence = tier.sequence
+                   AND entry.status = 'pending'
+             RETURNING entry.id
+            """, (
+                self.env.uid,
+                [rfq_id for rfq_id, _seq in promote],
+                [seq for _rfq_id, seq in promote],
+            ))
+            promoted = Entry.browse([row[0] for row in self.env.cr.fetchall()])
+            promoted.invalidate_recordset(['status', 'write_uid', 'write_date'])
+            promoted.modified(['status'])
 
 # ==============================================================================
 # CLASS CON: epr.rfq.line (Chi tiết hàng hóa trong RFQ)
@@ -533,6 +720,13 @@ class EprRfqLine(models.Model):
         context={'active_test': False}
     )
 
+    # Báo giá thắng thầu của dòng PR (chọn từ bảng so sánh báo giá)
+    is_awarded = fields.Boolean(
+        string='Awarded',
+        readonly=True,
+        copy=False
+    )
+
     # === TÍNH TOÁN TIỀN TỆ ===
     currency_id = fields.Many2one(
         related='rfq_id.currency_id',
@@ -550,18 +744,69 @@ class EprRfqLine(models.Model):
 
     @api.depends('quantity', 'price_unit', 'taxes_id')
     def _compute_subtotal(self):
-        """Tính tổng tiền (chưa bao gồm thuế)"""
+        """
+        Tính tổng tiền (đã bao gồm thuế) theo nhóm thuế.
+        Với thuế tỷ lệ (percent / division), tổng sau thuế tỷ lệ thuận với đơn giá x
+        số lượng: compute_all chỉ chạy 1 lần / (bộ thuế, tiền tệ, sản phẩm, NCC) để lấy
+        hệ số, mỗi dòng chỉ nhân và làm tròn 1 lần (có thể lệch 1 đơn vị làm tròn so
+        với compute_all theo từng thuế). Thuế cố định / code / nhóm vẫn gọi compute_all
+        cho từng dòng. Bộ nhớ tạm chỉ sống trong lần compute này.
+        """
+        factors = {}
         for line in self:
-            taxes = line.taxes_id.compute_all(
-                line.price_unit,
-                line.currency_id,
-                line.quantity,
-                product=line.product_id,
-                partner=line.rfq_id.partner_id
-            )
+            taxes = line.taxes_id
+            if not all(tax.amount_type in ('percent', 'division') for tax in taxes):
+                line.subtotal = line._compute_all_taxes(line.price_unit, line.quantity)['total_included']
+                continue
+
+            key = line._get_tax_group_key()
+            if key not in factors:
+                # Tính trên số tiền tham chiếu lớn để sai số làm tròn không đáng kể
+                factors[key] = line._compute_all_taxes(TAX_FACTOR_BASE, 1.0)['total_included'] / TAX_FACTOR_BASE
             # Nếu bạn muốn duyệt dựa trên GIÁ SAU THUẾ, dùng 'total_included'
             # Nếu muốn duyệt trên GIÁ TRƯỚC THUẾ, dùng 'total_excluded'
-            line.subtotal = taxes['total_included']
+            line.subtotal = line.currency_id.round(line.price_unit * line.quantity * factors[key])
+
+    def _compute_all_taxes(self, price_unit, quantity):
+        self.ensure_one()
+        return self.taxes_id.compute_all(
+            price_unit,
+            self.currency_id,
+            quantity,
+            product=self.product_id,
+            partner=self.rfq_id.partner_id
+        )
+
+    def _get_tax_group_key(self):
+        """Khóa nhóm tính thuế của dòng: (bộ thuế, tiền tệ, sản phẩm, NCC)."""
+        self.ensure_one()
+        return (
+            tuple(self.taxes_id.ids),
+            self.currency_id.id,
+            self.product_id.id,
+            self.rfq_id.partner_id.id,
+        )
+
+    # === CRUD ===
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        # Dòng có dòng PR nguồn (từ wizard hoặc thêm tay trên form) -> bảng truy vết
+        self.env['epr.lineage']._record_rfq_lines(lines.filtered('pr_line_id'))
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'pr_line_id' in vals:
+            # Đổi dòng PR nguồn: ghi lại dòng truy vết theo dòng PR mới
+            self.env['epr.lineage']._forget('rfq_line_id', self.ids)
+            self.env['epr.lineage']._record_rfq_lines(self.filtered('pr_line_id'))
+            self.env['epr.lineage']._record_po_lines(self.purchase_line_id)
+        return res
+
+    def unlink(self):
+        self.env['epr.lineage']._forget('rfq_line_id', self.ids)
+        return super().unlink()
 
     # === ONCHANGE PRODUCT (GỢI Ý) ===
     @api.onchange('product_id')
@@ -572,6 +817,13 @@ class EprRfqLine(models.Model):
             self.description = self.product_id.display_name
             # Tự động lấy thuế mua hàng mặc định của sản phẩm
             self.taxes_id = self.product_id.supplier_taxes_id
+            # Gợi ý đơn giá từ lịch sử báo giá của chính NCC này
+            if not self.price_unit and self.rfq_id.partner_id:
+                price = self.env['epr.vendor.price']._get_prices(
+                    self.product_id.ids, self.currency_id.id, self.rfq_id.partner_id.id
+                ).get(self.product_id.id)
+                if price:
+                    self.price_unit = price['last_price']
 
     # ==============================================================================
     # LINE-LEVEL LINKING LOGIC (From RFQs to POs)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, Command
+
+from .epr_deferred_tracking_mixin import DEFERRED_TRACKING_PARAM
+
+# Số dòng hàng đợi xử lý trong 1 lô (1 lần create mail.message)
+TRACKING_QUEUE_BATCH_SIZE = 1000
+
+
+class EprTrackingQueue(models.Model):
+    """
+    Hàng đợi thay đổi field tracking (chế độ tracking trễ).
+    Mỗi dòng = 1 bản ghi thay đổi trong 1 transaction, lưu giá trị cũ/mới
+    dạng JSON. Cron _cron_process_queue() chuyển thành chatter theo lô.
+    """
+    _name = 'epr.tracking.queue'
+    _description = 'ePR Deferred Tracking Queue'
+    _order = 'id'
+    _log_access = False
+
+    res_model = fields.Char(
+        string='Model',
+        required=True
+    )
+
+    res_id = fields.Many2oneReference(
+        string='Record ID',
+        model_field='res_model',
+        required=True
+    )
+
+    author_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Author',
+        ondelete='set null'
+    )
+
+    date = fields.Datetime(
+        string='Date',
+        required=True
+    )
+
+    # {field_name: [old_value, new_value]}
+    changes = fields.Json(
+        string='Changes',
+        required=True
+    )
+
+    # ==========================================================================
+    # HELPER METHODS
+    # ==========================================================================
+
+    @api.model
+    def _is_deferred_tracking_enabled(self):
+        # get_param có ormcache nên gọi mỗi lần write không tốn query
+        param = self.env['ir.config_parameter'].sudo().get_param(DEFERRED_TRACKING_PARAM)
+        return param not in (False, '', '0', 'False', 'false')
+
+    @api.model
+    def _serialize_value(self, field, value):
+        """Giá trị field -> JSON (record -> id/ids, date/datetime -> chuỗi)."""
+        if field.type == 'many2one':
+            return value.id or False
+        if field.type in ('one2many', 'many2many'):
+            return value.ids
+        if field.type == 'datetime':
+            return fields.Datetime.to_string(value)
+        if field.type == 'date':
+            return fields.Date.to_string(value)
+        return value
+
+    def _deserialize_value(self, record, fname, value):
+        """JSON -> giá trị field như khi đọc record[fname] (cho _create_tracking_values)."""
+        field = record._fields[fname]
+        if field.type in ('many2one', 'one2many', 'many2many'):
+            return self.env[field.comodel_name].browse(value or [])
+        if field.type == 'datetime':
+            return fields.Datetime.to_datetime(value)
+        if field.type == 'date':
+            return fields.Date.to_date(value)
+        return value
+
+    # ==========================================================================
+    # CRON
+    # ==========================================================================
+
+    @api.model
+    def _cron_process_queue(self):
+        """
+        Ghi chatter cho hàng đợi theo lô: mỗi lô tạo toàn bộ mail.message
+        (kèm mail.tracking.value) bằng 1 lần create và xóa các dòng đã xử lý.
+        Chạy cả khi đã tắt chế độ trễ để xả nốt hàng đợi còn lại.
+        """
+        commit = not self.env.registry.in_test_mode()
+        while True:
+            entries = self.search([], limit=TRACKING_QUEUE_BATCH_SIZE)
+            if not entries:
+                break
+            entries._write_messages()
+            entries.unlink()
+            if commit:
+                self.env.cr.commit()
+
+    def _write_messages(self):
+        """Tạo mail.message tracking cho các dòng hàng đợi trong self."""
+        note_subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_note')
+        message_vals_list = []
+
+        by_model = {}
+        for entry in self:
+            by_model.setdefault(entry.res_model, []).append(entry)
+
+        TrackingValue = self.env['mail.tracking.value'].sudo()
+        for res_model, entries in by_model.items():
+            if res_model not in self.env:
+                continue
+            Model = self.env[res_model].sudo()
+            # Chỉ prefetch các bản ghi còn tồn tại
+            existing_ids = set(Model.browse([entry.res_id for entry in entries]).exists().ids)
+            fnames = {fname for entry in entries for fname in entry.changes}
+            col_info = Model.fields_get(
+                [fname for fname in fnames if fname in Model._fields],
+                attributes=('string', 'type', 'selection', 'currency_field'),
+            )
+            for entry in entries:
+                if entry.res_id not in existing_ids:
+                    continue
+                record = Model.browse(entry.res_id)
+                tracking_vals = []
+                for fname, (old_value, new_value) in entry.changes.items():
+                    if fname not in col_info:
+                        continue
+                    values = TrackingValue._create_tracking_values(
+                        self._deserialize_value(record, fname, old_value),
+                        self._deserialize_value(record, fname, new_value),
+                        fname, col_info[fname], record,
+                    )
+                    if values:
+                        tracking_vals.append(Command.create(values))
+                if not tracking_vals:
+                    continue
+                message_vals_list.append({
+                    'model': res_model,
+                    'res_id': record.id,
+                    'body': '',
+                    'author_id': entry.author_id.id,
+                    'date': entry.date,
+                    'message_type': 'notification',
+                    'subtype_id': note_subtype_id,
+                    'is_internal': True,
+                    'tracking_value_ids': tracking_vals,
+                })
+
+        if message_vals_list:
+            self.env['mail.message'].sudo().create(message_vals_list)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from .res_partner import normalize_vendor_name
+
+# Ngưỡng độ tương đồng (pg_trgm similarity) để tự động chốt Final Vendor
+VENDOR_MATCH_THRESHOLD_PARAM = 'epr.vendor_match.threshold'
+VENDOR_MATCH_THRESHOLD = 0.7
+
+# Ứng viên dưới ngưỡng này bị bỏ qua (ngưỡng mặc định của toán tử % trong pg_trgm)
+VENDOR_MATCH_MIN_SCORE = 0.3
+
+# Ứng viên tốt nhất phải hơn ứng viên thứ 2 ít nhất chừng này, nếu không -> cần review
+VENDOR_MATCH_MARGIN = 0.1
+
+
+class EprVendorMatchReview(models.Model):
+    """
+    Hàng chờ review khi so khớp tên NCC tự do (suggested_vendor_name) với
+    danh bạ NCC: dòng PR không đủ tin cậy để tự chốt Final Vendor
+    (điểm thấp, 2 ứng viên sát nhau hoặc không có ứng viên).
+    Mỗi dòng PR có tối đa 1 dòng review, bị xóa khi Purchasing xác nhận.
+    """
+    _name = 'epr.vendor.match.review'
+    _description = 'ePR Vendor Match Review'
+    _order = 'score desc, id'
+    _rec_name = 'line_id'
+
+    line_id = fields.Many2one(
+        comodel_name='epr.purchase.request.line',
+        string='Request Line',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    request_id = fields.Many2one(
+        related='line_id.request_id',
+        string='Purchase Request',
+        store=True
+    )
+
+    suggested_vendor_name = fields.Char(
+        related='line_id.suggested_vendor_name',
+        string='Suggested Vendor Name'
+    )
+
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Best Match',
+        domain="[('supplier_rank', '>', 0)]",
+        help="Ứng viên có điểm cao nhất. Purchasing có thể chọn lại trước khi xác nhận."
+    )
+
+    score = fields.Float(
+        string='Score',
+        digits=(3, 2),
+        readonly=True
+    )
+
+    alt_partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Runner-up',
+        readonly=True
+    )
+
+    alt_score = fields.Float(
+        string='Runner-up Score',
+        digits=(3, 2),
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('line_uniq', 'unique (line_id)', 'A request line can only be reviewed once.'),
+    ]
+
+    # ==========================================================================
+    # MATCHING
+    # ==========================================================================
+
+    @api.model
+    def _match_lines(self, lines, threshold=None):
+        """
+        So khớp hàng loạt: mỗi tên (đã chuẩn hóa, bỏ trùng) được chấm điểm
+        với res.partner bằng 1 query dùng index trigram trên epr_match_name.
+        - Điểm >= threshold và bỏ xa ứng viên thứ 2 -> ghi Final Vendor
+          (1 lần write cho mỗi NCC).
+        - Còn lại -> đưa vào hàng chờ review.
+        :return: (dòng đã tự chốt, review đã tạo)
+        """
+        if not self.env.registry.has_trigram:
+            raise UserError(_("Vendor matching requires the PostgreSQL extension pg_trgm."))
+        if threshold is None:
+            threshold = float(self.env['ir.config_parameter'].sudo().get_param(
+                VENDOR_MATCH_THRESHOLD_PARAM, VENDOR_MATCH_THRESHOLD))
+
+        lines = lines.filtered(
+            lambda l: l.suggested_vendor_name and not l.user_vendor_id and not l.final_vendor_id
+        )
+        if not lines:
+            return lines, self
+        lines_by_name = lines.grouped(lambda l: normalize_vendor_name(l.suggested_vendor_name))
+        candidates = self._get_candidates([name for name in lines_by_name if name])
+
+        matched = self.env['epr.purchase.request.line']
+        lines_by_partner = {}
+        review_vals = []
+        for name, name_lines in lines_by_name.items():
+            best, runner_up = (candidates.get(name, []) + [(False, 0.0)] * 2)[:2]
+            if best[0] and best[1] >= threshold and best[1] - runner_up[1] >= VENDOR_MATCH_MARGIN:
+                lines_by_partner[best[0]] = lines_by_partner.get(best[0], matched) | name_lines
+                continue
+            review_vals += [{
+                'line_id': line.id,
+                'partner_id': best[0],
+                'score': best[1],
+                'alt_partner_id': runner_up[0],
+                'alt_score': runner_up[1],
+            } for line in name_lines]
+
+        for partner_id, partner_lines in lines_by_partner.items():
+            partner_lines.write({'final_vendor_id': partner_id})
+            matched |= partner_lines
+
+        # Kết quả mới thay thế review cũ của các dòng này
+        self.search([('line_id', 'in', lines.ids)]).unlink()
+        return matched, self.create(review_vals)
+
+    @api.model
+    def _get_candidates(self, names):
+        """
+        2 NCC gần nhất cho mỗi tên đã chuẩn hóa (1 query, LATERAL + index trigram).
+        :return: dict {name: [(partner_id, score), ...]} theo điểm giảm dần
+        """
+        if not names:
+            return {}
+        Partner = self.env['res.partner']
+        Partner.flush_model(['epr_match_name', 'supplier_rank', 'active', 'company_id'])
+        # Toán tử % dùng ngưỡng này (thay cho mặc định), chỉ trong transaction hiện tại
+        self.env.cr.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+            (str(VENDOR_MATCH_MIN_SCORE),)
+        )
+        self.env.cr.execute("""
+            SELECT query.name,
+                   array_agg(ARRAY[candidate.id::float, candidate.score] ORDER BY candidate.score DESC)
+              FROM unnest(%s::varchar[]) AS query (name)
+              JOIN LATERAL (
+                   SELECT partner.id, similarity(partner.epr_match_name, query.name) AS score
+                     FROM res_partner partner
+                    WHERE partner.epr_match_name %% query.name
+                      AND partner.active
+                      AND partner.supplier_rank > 0
+                      AND (partner.company_id IS NULL OR partner.company_id = ANY(%s))
+                 ORDER BY score DESC, partner.id
+                    LIMIT 2) candidate ON TRUE
+          GROUP BY query.name
+        """, (names, self.env.companies.ids))
+        return {
+            name: [(int(partner_id), score) for partner_id, score in rows]
+            for name, rows in self.env.cr.fetchall()
+        }
+
+    # ==========================================================================
+    # ACTIONS
+    # ==========================================================================
+
+    def action_accept(self):
+        """Chốt Best Match làm Final Vendor cho các dòng đã chọn (1 write / NCC)."""
+        reviews = self.filtered('partner_id')
+        for partner, partner_reviews in reviews.grouped('partner_id').items():
+            partner_reviews.line_id.write({'final_vendor_id': partner.id})
+        reviews.unlink()
+
+    def action_accept_runner_up(self):
+        """Chốt ứng viên thứ 2 làm Final Vendor."""
+        reviews = self.filtered('alt_partner_id')
+        for partner, partner_reviews in reviews.grouped('alt_partner_id').items():
+            partner_reviews.line_id.write({'final_vendor_id': partner.id})
+        reviews.unlink()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+# Hệ số trung bình trượt (EMA) ~ cửa sổ 5 lần báo giá gần nhất: 2 / (5 + 1)
+PRICE_EMA_ALPHA = 1 / 3
+
+
+class EprVendorPrice(models.Model):
+    """
+    Lịch sử giá theo (Sản phẩm, Nhà cung cấp, Tiền tệ), gọn 1 dòng / bộ khóa.
+    Cập nhật khi RFQ được xác nhận (1 câu UPSERT cho cả recordset RFQ) và được
+    tra cứu bằng unique index (product_id, partner_id, currency_id) để gợi ý
+    đơn giá trên dòng PR / RFQ và gợi ý nhà cung cấp tốt nhất cho PR.
+    """
+    _name = 'epr.vendor.price'
+    _description = 'ePR Vendor Price History'
+    _order = 'product_id, avg_price'
+    _rec_name = 'product_id'
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string='Product',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    partner_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Vendor',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        string='Currency',
+        required=True,
+        readonly=True
+    )
+
+    last_price = fields.Monetary(
+        string='Last Price',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    min_price = fields.Monetary(
+        string='Min Price',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    max_price = fields.Monetary(
+        string='Max Price',
+        currency_field='currency_id',
+        readonly=True
+    )
+
+    avg_price = fields.Monetary(
+        string='Moving Average',
+        currency_field='currency_id',
+        readonly=True,
+        help="Trung bình trượt (EMA) của đơn giá báo giá, ưu tiên các báo giá gần đây."
+    )
+
+    quote_count = fields.Integer(
+        string='Quotes',
+        readonly=True
+    )
+
+    last_rfq_id = fields.Many2one(
+        comodel_name='epr.rfq',
+        string='Last RFQ',
+        readonly=True,
+        ondelete='set null'
+    )
+
+    last_date = fields.Datetime(
+        string='Last Quoted',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('product_partner_currency_uniq', 'unique (product_id, partner_id, currency_id)',
+         'Only one price history per product, vendor and currency.'),
+    ]
+
+    # ==========================================================================
+    # UPDATE
+    # ==========================================================================
+
+    @api.model
+    def _update_from_rfqs(self, rfqs):
+        """
+        Ghi nhận đơn giá các dòng RFQ đã xác nhận: gom theo
+        (product, vendor, currency) rồi UPSERT 1 lần.
+        Trong cùng 1 lô, dòng mới nhất (theo ngày RFQ) là last price,
+        EMA được cập nhật bằng giá trung bình của lô.
+        """
+        if not rfqs:
+            return
+        rfqs.line_ids.flush_recordset(['product_id', 'price_unit', 'currency_id', 'rfq_id'])
+        rfqs.flush_recordset(['partner_id', 'date_order'])
+        self.env.cr.execute("""
+            INSERT INTO epr_vendor_price (
+                product_id, partner_id, currency_id, last_price, min_price, max_price,
+                avg_price, quote_count, last_rfq_id, last_date,
+                create_uid, write_uid, create_date, write_date)
+            SELECT line.product_id, rfq.partner_id, line.currency_id,
+                   (array_agg(line.price_unit ORDER BY rfq.date_order DESC, rfq.id DESC))[1],
+                   MIN(line.price_unit), MAX(line.price_unit), AVG(line.price_unit), COUNT(*),
+                   (array_agg(rfq.id ORDER BY rfq.date_order DESC, rfq.id DESC))[1],
+                   MAX(rfq.date_order),
+                   %(uid)s, %(uid)s, (now() at time zone 'UTC'), (now() at time zone 'UTC')
+              FROM epr_rfq_line line
+              JOIN epr_rfq rfq ON rfq.id = line.rfq_id
+             WHERE line.rfq_id IN %(rfq_ids)s
+               AND line.product_id IS NOT NULL
+               AND line.currency_id IS NOT NULL
+               AND line.price_unit > 0
+          GROUP BY line.product_id, rfq.partner_id, line.currency_id
+            ON CONFLICT (product_id, partner_id, currency_id) DO UPDATE
+               SET last_price = EXCLUDED.last_price,
+                   min_price = LEAST(epr_vendor_price.min_price, EXCLUDED.min_price),
+                   max_price = GREATEST(epr_vendor_price.max_price, EXCLUDED.max_price),
+                   avg_price = epr_vendor_price.avg_price
+                             + %(alpha)s * (EXCLUDED.avg_price - epr_vendor_price.avg_price),
+                   quote_count = epr_vendor_price.quote_count + EXCLUDED.quote_count,
+                   last_rfq_id = EXCLUDED.last_rfq_id,
+                   last_date = EXCLUDED.last_date,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'rfq_ids': tuple(rfqs.ids),
+            'uid': self.env.uid,
+            'alpha': PRICE_EMA_ALPHA,
+        })
+        self.invalidate_model()
+
+    # ==========================================================================
+    # LOOKUP
+    # ==========================================================================
+
+    @api.model
+    def _get_prices(self, product_ids, currency_id, partner_id=None):
+        """
+        Tra cứu lịch sử giá (1 query, dùng unique index).
+
+        :param partner_id: nếu có -> giá của đúng vendor đó;
+            nếu không -> vendor có giá trung bình trượt thấp nhất cho mỗi sản phẩm.
+        :return: dict {product_id: dict(partner_id, last_price, avg_price)}
+        """
+        if not product_ids or not currency_id:
+            return {}
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (product_id) product_id, partner_id, last_price, avg_price
+              FROM epr_vendor_price
+             WHERE product_id IN %s
+               AND currency_id = %s
+               AND (%s::integer IS NULL OR partner_id = %s)
+          ORDER BY product_id, avg_price, last_date DESC
+        """, (tuple(product_ids), currency_id, partner_id, partner_id))
+        return {
+            product_id: {'partner_id': partner, 'last_price': last_price, 'avg_price': avg_price}
+            for product_id, partner, last_price, avg_price in self.env.cr.fetchall()
+        }
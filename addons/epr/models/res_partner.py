@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import unicodedata
+
+import psycopg2
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_index, make_index_name
+
+_logger = logging.getLogger(__name__)
+
+# Tiền tố / loại hình doanh nghiệp không mang tính phân biệt khi so khớp tên NCC
+VENDOR_NAME_STOPWORDS = re.compile(
+    r'\b(cong ty|cty|nha cung cap|tnhh|co phan|mot thanh vien|mtv|cp|jsc|co ltd|ltd|company|corp)\b'
+)
+
+
+def normalize_vendor_name(name):
+    """
+    Chuẩn hóa tên NCC để so khớp: bỏ dấu tiếng Việt (kể cả đ/Đ), chữ thường,
+    bỏ ký tự đặc biệt và loại hình doanh nghiệp.
+    VD: 'CÔNG TY TNHH THIẾT BỊ VĂN PHÒNG ABC' -> 'thiet bi van phong abc'
+    """
+    if not name:
+        return ''
+    name = name.replace('đ', 'd').replace('Đ', 'D')
+    name = ''.join(
+        char for char in unicodedata.normalize('NFD', name)
+        if unicodedata.category(char) != 'Mn'
+    ).lower()
+    name = re.sub(r'[^a-z0-9]+', ' ', name)
+    name = VENDOR_NAME_STOPWORDS.sub(' ', name)
+    return ' '.join(name.split())
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    # Tên đã chuẩn hóa, có index trigram (pg_trgm) để so khớp tên NCC tự do
+    epr_match_name = fields.Char(
+        string='ePR Match Name',
+        compute='_compute_epr_match_name',
+        store=True,
+        index='trigram'
+    )
+
+    def init(self):
+        """
+        index='trigram' chỉ được tạo khi DB đã có pg_trgm: thử bật extension
+        (cần quyền tạo extension) rồi tạo GIN index nếu ORM chưa tạo được.
+        """
+        super().init()
+        cr = self.env.cr
+        if not self.env.registry.has_trigram:
+            try:
+                with cr.savepoint():
+                    cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except psycopg2.Error:
+                _logger.warning("ePR: cannot enable pg_trgm, vendor name matching is unavailable.")
+                return
+            self.env.registry.has_trigram = True
+        create_index(
+            cr,
+            make_index_name(self._table, 'epr_match_name'),
+            self._table,
+            ['epr_match_name gin_trgm_ops'],
+            'gin',
+        )
+
+    @api.depends('name')
+    def _compute_epr_match_name(self):
+        for partner in self:
+            partner.epr_match_name = normalize_vendor_name(partner.name)
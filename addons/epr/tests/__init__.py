@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from . import test_archive
+from . import test_rfq_approval
+from . import test_create_po
+from . import test_api
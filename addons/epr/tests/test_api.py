@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestEprApiKeyset(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.employee = cls.env['hr.employee'].create({'name': 'API Requester'})
+        cls.requests = cls.env['epr.purchase.request'].create([
+            {'employee_id': cls.employee.id} for _index in range(5)
+        ])
+        # write_date cố định, tách khỏi dữ liệu khác trong DB
+        cls.base = datetime(2000, 1, 1, 12, 0)
+        cls.env.flush_all()
+        for request, minutes in zip(cls.requests, (-10, -3, -2, -1, 1)):
+            cls.env.cr.execute(
+                "UPDATE epr_purchase_request SET write_date = %s WHERE id = %s",
+                (cls.base + timedelta(minutes=minutes), request.id),
+            )
+        cls.env.invalidate_all()
+
+    def test_cursor_window(self):
+        Request = self.env['epr.purchase.request']
+        too_old, oldest, older, at_cursor, newer = self.requests
+        cursor = Request._api_format_cursor((at_cursor.id, self.base + timedelta(minutes=-1)))
+
+        rows, next_cursor = Request._api_keyset_search(cursor=cursor, limit=4)
+
+        # Đọc lại 2 dòng gần cursor nhất (nửa trang), dòng ngoài khoảng 5 phút bị bỏ
+        row_ids = [record_id for record_id, _write_date in rows]
+        self.assertEqual(row_ids[:2], [older.id, at_cursor.id])
+        self.assertIn(newer.id, row_ids)
+        self.assertNotIn(oldest.id, row_ids)
+        self.assertNotIn(too_old.id, row_ids)
+        self.assertLessEqual(len(rows), 4)
+        self.assertEqual(len(row_ids), len(set(row_ids)))
+        if next_cursor:
+            self.assertGreater(Request._api_parse_cursor(next_cursor), Request._api_parse_cursor(cursor))
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import Command, fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestEprArchive(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vendor = cls.env['res.partner'].create({'name': 'Archive Vendor'})
+        cls.product = cls.env['product.product'].create({'name': 'Archive Laptop'})
+        cls.employee = cls.env['hr.employee'].create({'name': 'Archive Requester'})
+
+        cls.request = cls.env['epr.purchase.request'].create({
+            'employee_id': cls.employee.id,
+            'line_ids': [Command.create({
+                'name': 'Laptop',
+                'product_id': cls.product.id,
+                'quantity': 2,
+                'estimated_price': 100,
+            })],
+        })
+        cls.request.write({
+            'state': 'done',
+            'date_submitted': fields.Datetime.now() - timedelta(days=800),
+            'date_approved': fields.Datetime.now() - timedelta(days=799),
+        })
+
+        cls.rfq = cls.env['epr.rfq'].create({
+            'partner_id': cls.vendor.id,
+            'request_ids': [Command.set(cls.request.ids)],
+            'line_ids': [Command.create({
+                'pr_line_id': cls.request.line_ids.id,
+                'product_id': cls.product.id,
+                'quantity': 2,
+                'uom_id': cls.product.uom_id.id,
+                'price_unit': 90,
+            })],
+        })
+        cls.entry = cls.env['epr.approval.entry'].create({
+            'rfq_id': cls.rfq.id,
+            'name': 'Step 1',
+            'sequence': 1,
+            'status': 'approved',
+            'actual_user_id': cls.env.uid,
+            'approval_date': fields.Datetime.now(),
+        })
+
+        cls.purchase = cls.env['purchase.order'].create({
+            'partner_id': cls.vendor.id,
+            'epr_source_rfq_ids': [Command.set(cls.rfq.ids)],
+            'epr_source_pr_ids': [Command.set(cls.request.ids)],
+            'order_line': [Command.create({
+                'product_id': cls.product.id,
+                'product_qty': 2,
+                'price_unit': 90,
+                'epr_rfq_line_id': cls.rfq.line_ids.id,
+            })],
+        })
+        cls.rfq.write({'state': 'confirmed'})
+
+        cls.request.message_post(body='Request note')
+        cls.rfq.message_post(body='Quote received')
+        cls.attachment = cls.env['ir.attachment'].create({
+            'name': 'quote.pdf',
+            'raw': b'%PDF-1.4',
+            'res_model': 'epr.rfq',
+            'res_id': cls.rfq.id,
+        })
+        cls.env['epr.lead.time.report']._refresh_requests(cls.request.ids)
+
+        # Đóng đủ lâu để được lưu trữ
+        cls.env.flush_all()
+        cls.env.cr.execute(
+            "UPDATE epr_purchase_request SET write_date = write_date - interval '2 years' WHERE id = %s",
+            (cls.request.id,),
+        )
+        cls.env.cr.execute(
+            "UPDATE epr_rfq SET write_date = write_date - interval '2 years' WHERE id = %s",
+            (cls.rfq.id,),
+        )
+        cls.env.invalidate_all()
+
+    def test_archive_documents(self):
+        request_id, rfq_id = self.request.id, self.rfq.id
+        request_name = self.request.name
+
+        self.env['epr.purchase.request.archive']._cron_archive_documents()
+        self.env.invalidate_all()
+
+        # Chuyển khỏi bảng đang dùng, giữ nguyên id
+        self.assertFalse(self.env['epr.purchase.request'].browse(request_id).exists())
+        self.assertFalse(self.env['epr.rfq'].browse(rfq_id).exists())
+        request_archive = self.env['epr.purchase.request.archive'].browse(request_id)
+        rfq_archive = self.env['epr.rfq.archive'].browse(rfq_id)
+        self.assertEqual(request_archive.name, request_name)
+        self.assertEqual(len(request_archive.line_ids), 1)
+        self.assertEqual(len(rfq_archive.line_ids), 1)
+        self.assertEqual(len(rfq_archive.approval_entry_ids), 1)
+        self.assertEqual(rfq_archive.request_ids, request_archive)
+        self.assertEqual(rfq_archive.purchase_ids, self.purchase)
+        self.assertEqual(request_archive.purchase_ids, self.purchase)
+
+        # View gộp: chỉ thấy khi bỏ bộ lọc "Active Documents"
+        history = self.env['epr.purchase.request.history'].search([('id', '=', request_id)])
+        self.assertTrue(history.is_archived)
+        self.assertFalse(self.env['epr.purchase.request.history'].search_count(
+            [('id', '=', request_id), ('is_archived', '=', False)]))
+        self.assertEqual(history.action_open_document()['res_model'], 'epr.purchase.request.archive')
+        self.assertTrue(self.env['epr.rfq.history'].search([('id', '=', rfq_id)]).is_archived)
+
+        # Chatter và file đính kèm theo chứng từ sang model lưu trữ
+        self.assertTrue(self.env['mail.message'].search_count([
+            ('model', '=', 'epr.purchase.request.archive'), ('res_id', '=', request_id),
+            ('body', 'ilike', 'Request note'),
+        ]))
+        self.assertTrue(self.env['mail.message'].search_count([
+            ('model', '=', 'epr.rfq.archive'), ('res_id', '=', rfq_id),
+            ('body', 'ilike', 'Quote received'),
+        ]))
+        self.assertFalse(self.env['mail.message'].search_count([
+            ('model', 'in', ('epr.purchase.request', 'epr.rfq')), ('res_id', 'in', [request_id, rfq_id]),
+        ]))
+        self.assertEqual(self.attachment.res_model, 'epr.rfq.archive')
+
+        # Báo cáo, thống kê và truy vết không mất theo chứng từ
+        report = self.env['epr.lead.time.report'].search([('id', '=', request_id)])
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report.request_id.id, request_id)
+        self.assertTrue(report.date_rfq)
+
+        self.env['epr.lead.time.stats']._refresh()
+        stats = self.env['epr.lead.time.stats'].search([
+            ('dimension', '=', 'approver'), ('stage', '=', 'rfq_step'), ('approver_id', '=', self.env.uid),
+        ])
+        self.assertEqual(stats.sample_count, 1)
+
+        # Dòng PO giữ liên kết tới dòng RFQ nguồn qua dòng lưu trữ
+        po_line = self.purchase.order_line
+        self.assertFalse(po_line.epr_rfq_line_id)
+        self.assertEqual(po_line.epr_rfq_line_archive_id, rfq_archive.line_ids)
+        self.assertEqual(rfq_archive.line_ids.purchase_line_id, po_line)
+
+        lineage = self.env['epr.lineage'].search([('request_id', '=', request_id)])
+        self.assertEqual(len(lineage), 1)
+        self.assertEqual(lineage.rfq_id.id, rfq_id)
+        self.assertEqual(lineage.purchase_id, self.purchase)
+
+        # Smart button của PO vẫn trỏ được về PR / RFQ nguồn
+        self.assertEqual(self.purchase.epr_pr_count, 1)
+        self.assertEqual(self.purchase.epr_rfq_count, 1)
+        action = self.purchase.action_view_epr_prs()
+        self.assertEqual(action['res_model'], 'epr.purchase.request.history')
+        self.assertEqual(action['domain'], [('id', 'in', [request_id])])
+        action = self.purchase.action_view_epr_rfqs()
+        self.assertEqual(action['res_model'], 'epr.rfq.archive')
+        self.assertEqual(action['res_id'], rfq_id)
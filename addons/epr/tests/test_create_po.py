@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestEprCreatePo(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vendor = cls.env['res.partner'].create({'name': 'PO Vendor'})
+        cls.product = cls.env['product.product'].create({'name': 'PO Keyboard'})
+        cls.rfq = cls.env['epr.rfq'].create({
+            'partner_id': cls.vendor.id,
+            'line_ids': [
+                Command.create({
+                    'product_id': cls.product.id,
+                    'uom_id': cls.product.uom_id.id,
+                    'quantity': quantity,
+                    'price_unit': 10,
+                })
+                for quantity in (1, 2, 3)
+            ],
+        })
+        cls.rfq.write({'state': 'confirmed'})
+
+    def _create_wizard(self):
+        return self.env['epr.create.po.wizard'].with_context(active_ids=self.rfq.ids).create({})
+
+    def test_small_selection_creates_po_at_once(self):
+        action = self._create_wizard().action_create_po()
+
+        purchase = self.env['purchase.order'].browse(action['res_id'])
+        self.assertEqual(len(purchase.order_line), 3)
+        self.assertEqual(self.rfq.line_ids.purchase_line_id, purchase.order_line)
+
+    def test_large_selection_is_queued_in_chunks(self):
+        with patch('odoo.addons.epr.wizards.epr_create_po.PO_CHUNK_SIZE', 2):
+            wizard = self._create_wizard()
+            action = wizard.action_create_po()
+            self.assertEqual(action['tag'], 'display_notification')
+            self.assertTrue(wizard.is_queued)
+            self.assertFalse(self.rfq.line_ids.purchase_line_id)
+
+            self.env['epr.create.po.wizard']._cron_create_queued_po()
+
+        # 2 lô nhưng vẫn 1 PO cho cùng NCC, mọi dòng RFQ được link
+        purchase = self.rfq.line_ids.purchase_line_id.order_id
+        self.assertEqual(len(purchase), 1)
+        self.assertEqual(len(purchase.order_line), 3)
+        self.assertEqual(purchase.epr_source_rfq_ids, self.rfq)
+        self.assertFalse(wizard.exists())
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from odoo import Command
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestEprRfqApproval(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vendor = cls.env['res.partner'].create({'name': 'Approval Vendor'})
+        cls.product = cls.env['product.product'].create({'name': 'Approval Monitor'})
+
+    def _create_rfq(self, state):
+        return self.env['epr.rfq'].create({
+            'partner_id': self.vendor.id,
+            'state': state,
+            'line_ids': [Command.create({
+                'product_id': self.product.id,
+                'uom_id': self.product.uom_id.id,
+                'quantity': 1,
+                'price_unit': 100,
+            })],
+        })
+
+    def test_batch_submit_rejects_confirmed_rfq(self):
+        received = self._create_rfq('received')
+        confirmed = self._create_rfq('confirmed')
+        entry = self.env['epr.approval.entry'].create({
+            'rfq_id': confirmed.id,
+            'name': 'Step 1',
+            'sequence': 1,
+            'status': 'approved',
+        })
+
+        with self.assertRaises(UserError):
+            (received | confirmed).action_submit_approval()
+
+        self.assertEqual(confirmed.state, 'confirmed')
+        self.assertTrue(entry.exists())
+        self.assertEqual(received.state, 'received')
@@ -2,3 +2,4 @@ from . import epr_reject_wizard
 from . import epr_create_rfq
 from . import epr_create_po
 from . import epr_reject_rfq_wizard
+from . import epr_import_request
@@ -1,22 +1,26 @@
 from odoo import models, fields, api, Command, _
 from odoo.exceptions import UserError
 
+# Số dòng tối đa tạo PO ngay trong wizard; lựa chọn lớn hơn được chuyển cho cron
+# (ir_cron_epr_create_po) tạo theo lô cùng kích thước, mỗi lô 1 commit
+PO_CHUNK_SIZE = 500
+
 
 class EprCreatePoWizard(models.TransientModel):
     _name = 'epr.create.po.wizard'
     _description = 'Merge RFQs to Purchase Order'
+    # Wizard chờ cron tạo PO không được dọn trước khi cron chạy xong
+    _transient_max_hours = 24.0
 
-    # Hiển thị Vendor chung để user confirm
+    # Hiển thị Vendor chung để user confirm (để trống nếu chọn nhiều Vendor)
     partner_id = fields.Many2one(
         comodel_name='res.partner',
-        string='Vendor',
-        required=True
+        string='Vendor'
     )
 
     currency_id = fields.Many2one(
         comodel_name='res.currency',
-        string='Currency',
-        required=True
+        string='Currency'
     )
 
     # Danh sách các dòng sẽ được đẩy vào PO (Cho phép user bỏ tick để xé nhỏ RFQ)
@@ -26,6 +30,12 @@ class EprCreatePoWizard(models.TransientModel):
         string='Products to Order'
     )
 
+    # Đã chuyển cho cron tạo PO theo lô (lựa chọn lớn)
+    is_queued = fields.Boolean(
+        string='Queued',
+        readonly=True
+    )
+
     @api.model
     def default_get(self, fields_list):
         res = super().default_get(fields_list)
@@ -36,23 +46,26 @@ class EprCreatePoWizard(models.TransientModel):
         # 1. Lấy danh sách RFQ được chọn
         rfqs = self.env['epr.rfq'].browse(active_ids)
 
-        # 2. Validate: Cùng Vendor và Currency
-        first_partner = rfqs[0].partner_id
-        first_currency = rfqs[0].currency_id
-
-        if any(r.partner_id != first_partner for r in rfqs):
-            raise UserError(_("Tất cả các RFQ được chọn phải cùng một Nhà cung cấp."))
-
-        if any(r.currency_id != first_currency for r in rfqs):
-            raise UserError(_("Tất cả các RFQ được chọn phải cùng loại Tiền tệ."))
-
+        # 2. Validate: Cho phép nhiều Vendor/Currency, mỗi nhóm
+        # (Vendor, Currency, Company) sẽ được tách thành 1 PO riêng
         if any(r.state != 'confirmed' for r in rfqs):  # Giả sử trạng thái 'confirmed' là đã chốt
             raise UserError(_("Chỉ có thể tạo PO từ các RFQ đã xác nhận (Confirmed)."))
 
+        # Dòng PR đã chọn thầu: chỉ đặt hàng báo giá thắng thầu
+        awarded_pr_line_ids = {
+            pr_line.id
+            for [pr_line] in self.env['epr.rfq.line']._read_group(
+                [('pr_line_id', 'in', rfqs.line_ids.pr_line_id.ids), ('is_awarded', '=', True)],
+                ['pr_line_id'],
+            )
+        }
+
         # 3. Loop qua từng dòng RFQ để prepare dữ liệu cho Wizard
         lines_list = []
         for rfq in rfqs:
             for line in rfq.line_ids:
+                if line.pr_line_id.id in awarded_pr_line_ids and not line.is_awarded:
+                    continue
                 # Chỉ load những dòng chưa tạo PO
                 if not line.purchase_line_id:
                     lines_list.append(Command.create({
@@ -68,73 +81,162 @@ class EprCreatePoWizard(models.TransientModel):
         if not lines_list:
             raise UserError(_("Không tìm thấy dòng sản phẩm nào khả dụng để tạo PO (có thể đã được tạo trước đó)."))
 
-        res.update({
-            'partner_id': first_partner.id,
-            'currency_id': first_currency.id,
-            'line_ids': lines_list
-        })
+        res['line_ids'] = lines_list
+        # Chỉ hiển thị Vendor/Currency chung khi tất cả RFQ cùng 1 nhóm
+        if len(rfqs.partner_id) == 1:
+            res['partner_id'] = rfqs.partner_id.id
+        if len(rfqs.currency_id) == 1:
+            res['currency_id'] = rfqs.currency_id.id
         return res
 
     def action_create_po(self):
+        """
+        Tạo PO từ các dòng wizard: 1 PO cho mỗi (Vendor, Currency, Company),
+        tất cả trong 1 transaction (lỗi ở bất kỳ PO nào sẽ hủy cả lô).
+        Lựa chọn lớn hơn PO_CHUNK_SIZE dòng được chuyển cho cron tạo theo lô,
+        commit sau mỗi lô, để không chạm limit_time_real của request HTTP.
+        """
         self.ensure_one()
         if not self.line_ids:
             raise UserError(_("Vui lòng chọn ít nhất một dòng sản phẩm."))
 
-        rfq_ids = self.line_ids.mapped('rfq_line_id.rfq_id').ids
-        pr_ids = self.line_ids.mapped('rfq_line_id.pr_line_id.request_id').ids
-
-        # 1. Prepare Header PO (Chuẩn Odoo)
-        po_vals = {
-            'partner_id': self.partner_id.id,
-            'currency_id': self.currency_id.id,
-            'date_order': fields.Datetime.now(),
-            'origin': ', '.join(self.line_ids.mapped('rfq_line_id.rfq_id.name')),
-            'epr_source_rfq_ids': [Command.set(rfq_ids)],  # Gán Link RFQ
-            'epr_source_pr_ids': [Command.set(pr_ids)],    # Gán Link PR
-            'order_line': [],
-        }
-
-        # 2. Prepare PO Lines
-        for w_line in self.line_ids:
-            po_line_vals = {
-                'product_id': w_line.product_id.id,
-                'name': w_line.description or w_line.product_id.name,
-                'product_qty': w_line.quantity,
-                'price_unit': w_line.price_unit,
-                'product_uom': w_line.uom_id.id,
-                'taxes_id': [Command.set(w_line.taxes_id.ids)],
-                # inherit purchase.order.line để link 2 chiều chặt chẽ
-                'epr_rfq_line_id': w_line.rfq_line_id.id
+        if len(self.line_ids) > PO_CHUNK_SIZE:
+            self.is_queued = True
+            self.env.ref('epr.ir_cron_epr_create_po').sudo()._trigger()
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'type': 'info',
+                    'message': _(
+                        '%s lines will be ordered in the background; the Purchase Orders '
+                        'will appear in the Purchase list shortly.', len(self.line_ids)
+                    ),
+                    'next': {'type': 'ir.actions.act_window_close'},
+                },
             }
-            po_vals['order_line'].append(Command.create(po_line_vals))
-
-        # 3. Tạo PO
-        purchase_order = self.env['purchase.order'].create(po_vals)
-
-        # 4. Update ngược lại RFQ Line (Line-Level Linking)
-        # Vì PO Line được tạo qua Command.create, ta cần map lại ID
-        # Cách đơn giản nhất: Loop lại PO Lines vừa tạo
-
-        # Lưu ý: Logic này giả định thứ tự tạo không đổi, để chính xác tuyệt đối
-        # nên thêm field 'epr_rfq_line_id' vào 'purchase.order.line'
-        for i, po_line in enumerate(purchase_order.order_line):
-            # Lấy dòng wizard tương ứng theo index (nếu thứ tự được bảo toàn)
-            # Hoặc tốt hơn: Thêm field epr_rfq_line_id vào purchase.order.line (Xem mục 3)
-            wizard_line = self.line_ids[i]
-            wizard_line.rfq_line_id.write({'purchase_line_id': po_line.id})
 
+        purchase_orders = self._create_purchase_orders(self._group_lines(self.line_ids))
+        if len(purchase_orders) == 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'res_model': 'purchase.order',
+                'res_id': purchase_orders.id,
+                'view_mode': 'form',
+                'target': 'current',
+            }
         return {
+            'name': _('Purchase Orders'),
             'type': 'ir.actions.act_window',
             'res_model': 'purchase.order',
-            'res_id': purchase_order.id,
-            'view_mode': 'form',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', purchase_orders.ids)],
             'target': 'current',
         }
 
+    @api.model
+    def _cron_create_queued_po(self):
+        """
+        Tạo PO cho các wizard đã chuyển sang cron, theo lô PO_CHUNK_SIZE dòng, commit
+        sau mỗi lô. Nhóm lớn vẫn thành 1 PO: lô sau thêm dòng vào PO đã tạo ở lô trước.
+        Dòng wizard đã xử lý bị xóa cùng lô nên chạy lại (sau lỗi / timeout) chỉ làm
+        tiếp phần còn lại (nhóm dở dang khi đó được tạo thành PO mới).
+        """
+        commit = not self.env.registry.in_test_mode()
+        for wizard in self.search([('is_queued', '=', True)]):
+            # Tạo PO với quyền của người đã bấm nút (cron chạy bằng OdooBot)
+            wizard = wizard.with_user(wizard.create_uid)
+            purchase_orders = {}
+            for chunk in wizard._split_chunks(wizard._group_lines(wizard.line_ids)):
+                existing = [(key, w_lines) for key, w_lines in chunk if key in purchase_orders]
+                new_groups = [(key, w_lines) for key, w_lines in chunk if key not in purchase_orders]
+                created = wizard._create_purchase_orders(new_groups)
+                purchase_orders.update(zip([key for key, _w_lines in new_groups], created))
+                for key, w_lines in existing:
+                    vals = wizard._prepare_po_vals(key, w_lines)
+                    purchase_orders[key].write({
+                        fname: vals[fname]
+                        for fname in ('order_line', 'epr_source_rfq_ids', 'epr_source_pr_ids')
+                    })
+                for _key, w_lines in chunk:
+                    w_lines.unlink()
+                if commit:
+                    self.env.cr.commit()
+            wizard.unlink()
+            if commit:
+                self.env.cr.commit()
+
+    def _group_lines(self, w_lines):
+        """Gom dòng wizard theo (Vendor, Currency, Company) -> list[(key, lines)]."""
+        groups = {}
+        for w_line in w_lines:
+            rfq = w_line.rfq_line_id.rfq_id
+            key = (rfq.partner_id.id, rfq.currency_id.id, rfq.company_id.id)
+            groups[key] = groups.get(key, self.env['epr.create.po.line.wizard']) | w_line
+        return list(groups.items())
+
+    @api.model
+    def _split_chunks(self, grouped_lines):
+        """Chia list[(key, lines)] thành các lô đúng PO_CHUNK_SIZE dòng (nhóm lớn bị tách qua nhiều lô)."""
+        chunk, chunk_size = [], 0
+        for key, w_lines in grouped_lines:
+            while w_lines:
+                part = w_lines[:PO_CHUNK_SIZE - chunk_size]
+                w_lines = w_lines[len(part):]
+                chunk.append((key, part))
+                chunk_size += len(part)
+                if chunk_size == PO_CHUNK_SIZE:
+                    yield chunk
+                    chunk, chunk_size = [], 0
+        if chunk:
+            yield chunk
+
+    @api.model
+    def _prepare_po_vals(self, key, w_lines):
+        partner_id, currency_id, company_id = key
+        rfq_lines = w_lines.rfq_line_id
+        return {
+            'partner_id': partner_id,
+            'currency_id': currency_id,
+            'company_id': company_id,
+            'date_order': fields.Datetime.now(),
+            'origin': ', '.join(rfq_lines.rfq_id.mapped('name')),
+            'epr_source_rfq_ids': [Command.link(rfq_id) for rfq_id in rfq_lines.rfq_id.ids],  # Gán Link RFQ
+            'epr_source_pr_ids': [Command.link(pr_id) for pr_id in rfq_lines.pr_line_id.request_id.ids],  # Gán Link PR
+            'order_line': [
+                Command.create({
+                    'product_id': w_line.product_id.id,
+                    'name': w_line.description or w_line.product_id.name,
+                    'product_qty': w_line.quantity,
+                    'price_unit': w_line.price_unit,
+                    'product_uom': w_line.uom_id.id,
+                    'taxes_id': [Command.set(w_line.taxes_id.ids)],
+                    # inherit purchase.order.line để link 2 chiều chặt chẽ
+                    'epr_rfq_line_id': w_line.rfq_line_id.id
+                })
+                for w_line in w_lines
+            ],
+        }
+
+    @api.model
+    def _create_purchase_orders(self, grouped_lines):
+        """
+        Tạo toàn bộ PO của 1 lô bằng 1 lần create(vals_list); dòng PO mang
+        epr_rfq_line_id nên được link ngược về RFQ Line ngay trong create.
+
+        :param grouped_lines: list[((partner_id, currency_id, company_id), wizard lines)]
+        :return: purchase.order recordset vừa tạo (cùng thứ tự với grouped_lines)
+        """
+        # purchase.order.line.create tự link ngược RFQ Line -> PO Line và ghi bảng truy vết
+        return self.env['purchase.order'].create([
+            self._prepare_po_vals(key, w_lines) for key, w_lines in grouped_lines
+        ])
+
 
 class EprCreatePoLineWizard(models.TransientModel):
     _name = 'epr.create.po.line.wizard'
     _description = 'Line details for PO creation'
+    _transient_max_hours = 24.0
 
     wizard_id = fields.Many2one(
         comodel_name='epr.create.po.wizard',
@@ -163,6 +265,11 @@ class EprCreatePoLineWizard(models.TransientModel):
         required=True
     )
 
+    partner_id = fields.Many2one(
+        related='rfq_line_id.rfq_id.partner_id',
+        string='Vendor'
+    )
+
     uom_id = fields.Many2one(
         comodel_name='uom.uom',
         string='UoM'
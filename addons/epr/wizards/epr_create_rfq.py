@@ -69,40 +69,54 @@ class EprCreateRfqWizard(models.TransientModel):
         """
         Gộp PR thành RFQ:
         1. Validate: Chọn đầy đủ Vendor & Product.
-        2. Gom nhóm theo Vendor.
-        3. Tạo RFQ Header & Lines (Dùng sudo để bypass quyền truy cập PR).
+        2. Đồng bộ Vendor/Product về PR Line: 1 lần ghi cho mỗi cặp (Vendor, Product).
+        3. Gom nhóm theo Vendor và tạo toàn bộ RFQ bằng 1 lần create(vals_list).
         """
         self.ensure_one()
 
-        # 1. Validate & Sync Vendor
-        for line in self.line_ids:
-            if not line.final_vendor_id:
-                raise UserError(_("Vui lòng chọn Vendor cho sản phẩm: %s", line.product_description))
-
-            if line.pr_line_id.final_vendor_id != line.final_vendor_id:
-                line.pr_line_id.sudo().write({
-                    'final_vendor_id': line.final_vendor_id.id
-                })
+        # 1. Validate
+        missing_vendor = self.line_ids.filtered(lambda l: not l.final_vendor_id)
+        if missing_vendor:
+            raise UserError(_(
+                "Vui lòng chọn Vendor cho sản phẩm: %s",
+                ', '.join(missing_vendor.mapped('product_description'))
+            ))
 
-        # 2. Grouping
+        # 2. Sync Vendor & Product về PR Line (Dùng sudo để bypass quyền truy cập PR)
+        to_sync = {}
+        for line in self.line_ids:
+            pr_line = line.pr_line_id
+            if not pr_line:
+                continue
+            if (pr_line.final_vendor_id != line.final_vendor_id
+                    or pr_line.product_id != line.final_product_id):
+                key = (line.final_vendor_id.id, line.final_product_id.id)
+                to_sync.setdefault(key, []).append(pr_line.id)
+
+        PrLine = self.env['epr.purchase.request.line'].sudo()
+        for (vendor_id, product_id), pr_line_ids in to_sync.items():
+            PrLine.browse(pr_line_ids).write({
+                'final_vendor_id': vendor_id,
+                'product_id': product_id,
+            })
+
+        # 3. Grouping (giữ nguyên thứ tự xuất hiện của Vendor)
         grouped_lines = {}
         for wiz_line in self.line_ids:
-            vendor = wiz_line.final_vendor_id
-            if vendor not in grouped_lines:
-                grouped_lines[vendor] = self.env['epr.create.rfq.line']
-            grouped_lines[vendor] |= wiz_line
+            grouped_lines.setdefault(wiz_line.final_vendor_id.id, []).append(wiz_line)
 
-        created_rfqs = self.env['epr.rfq'].sudo()
-
-        # 3. RFQ Creation
-        for vendor, wiz_lines in grouped_lines.items():
+        # 4. RFQ Creation (1 lần create cho tất cả Vendor)
+        now = fields.Datetime.now()
+        rfq_vals_list = []
+        for vendor_id, wiz_lines in grouped_lines.items():
             # A. Lấy danh sách PR unique cho field Many2many
-            source_requests = wiz_lines.mapped('request_id')
+            source_request_ids = list(dict.fromkeys(
+                wiz_line.request_id.id for wiz_line in wiz_lines if wiz_line.request_id
+            ))
 
             # B. Chuẩn bị dữ liệu lines (One2many)
-            rfq_line_commands = []
-            for wiz_line in wiz_lines:
-                rfq_line_commands.append(Command.create({
+            rfq_line_commands = [
+                Command.create({
                     'product_id': wiz_line.final_product_id.id,
                     'description': wiz_line.product_description,
                     'quantity': wiz_line.quantity,
@@ -110,21 +124,21 @@ class EprCreateRfqWizard(models.TransientModel):
                     'uom_id': wiz_line.uom_id.id,
                     # Link ngược lại dòng PR gốc để truy vết
                     'pr_line_id': wiz_line.pr_line_id.id
-                }))
+                })
+                for wiz_line in wiz_lines
+            ]
 
-            # Tạo RFQ Header
-            rfq_vals = {
-                'partner_id': vendor.id,
+            rfq_vals_list.append({
+                'partner_id': vendor_id,
                 'state': 'draft',
-                'date_order': fields.Datetime.now(),
-                'request_ids': [Command.set(source_requests.ids)],
+                'date_order': now,
+                'request_ids': [Command.set(source_request_ids)],
                 'line_ids': rfq_line_commands,
-            }
+            })
 
-            rfq = self.env['epr.rfq'].create(rfq_vals)
-            created_rfqs |= rfq
+        created_rfqs = self.env['epr.rfq'].create(rfq_vals_list)
 
-        # 4. Redirect
+        # 5. Redirect
         if not created_rfqs:
             return {'type': 'ir.actions.act_window_close'}
 
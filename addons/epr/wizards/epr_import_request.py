@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+import base64
+import csv
+import io
+
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError, UserError
+
+# Số PR (header) ghi trong 1 lô; mỗi lô được commit riêng khi import nhiều lô
+IMPORT_BATCH_SIZE = 2000
+
+# Module gán cho external id không có tiền tố (giống Import CSV chuẩn của Odoo)
+IMPORT_MODULE = '__import__'
+
+
+class EprImportRequestWizard(models.TransientModel):
+    """
+    Import số lượng lớn Purchase Request + dòng chi tiết từ 2 file CSV
+    (cùng định dạng data/import_purchase_requests.csv và
+    data/import_purchase_request_lines.csv).
+
+    Khác với Import chuẩn (ORM từng bản ghi):
+        - Validate toàn bộ trong bộ nhớ, dòng lỗi được loại và báo cáo lại.
+        - Cấp số thứ tự theo block, INSERT header/line theo lô.
+        - subtotal_estimated tính sẵn khi insert, estimated_total tính bằng
+          1 câu UPDATE ... GROUP BY cho cả lô.
+        - Không tạo tracking message / follower.
+    Dùng để migrate dữ liệu lịch sử; có thể gọi trực tiếp _import_rows() từ shell.
+    """
+    _name = 'epr.import.request.wizard'
+    _description = 'Bulk Import Purchase Requests'
+
+    # ==========================================================================
+    # FIELDS
+    # ==========================================================================
+
+    request_file = fields.Binary(
+        string='Requests File',
+        required=True,
+        help="CSV: id, date_required, priority, state "
+             "(tùy chọn: name, employee_id/id)."
+    )
+
+    request_filename = fields.Char(
+        string='Requests Filename'
+    )
+
+    line_file = fields.Binary(
+        string='Lines File',
+        help="CSV: id, request_id/id, name, product_description, quantity, "
+             "estimated_price, uom_name, suggested_vendor_name (tùy chọn: user_vendor_id/id)."
+    )
+
+    line_filename = fields.Char(
+        string='Lines Filename'
+    )
+
+    state = fields.Selection(
+        [('upload', 'Upload'), ('done', 'Done')],
+        default='upload'
+    )
+
+    result_message = fields.Text(
+        string='Result',
+        readonly=True
+    )
+
+    rejected_file = fields.Binary(
+        string='Rejected Rows',
+        readonly=True
+    )
+
+    rejected_filename = fields.Char(
+        string='Rejected Filename',
+        readonly=True
+    )
+
+    # ==========================================================================
+    # BUSINESS LOGIC (ACTIONS)
+    # ==========================================================================
+
+    def action_import(self):
+        """
+        Đọc 2 file CSV, import và hiển thị kết quả ngay trên wizard
+        (kèm file CSV các dòng bị loại nếu có).
+        """
+        self.ensure_one()
+        request_rows = self._read_csv(self.request_file)
+        line_rows = self._read_csv(self.line_file) if self.line_file else []
+
+        result = self._import_rows(request_rows, line_rows)
+
+        message = _(
+            "Imported %(requests)s purchase requests and %(lines)s lines.\n"
+            "Rejected rows: %(rejected)s."
+        ) % {
+            'requests': result['request_count'],
+            'lines': result['line_count'],
+            'rejected': len(result['rejected']),
+        }
+        vals = {'state': 'done', 'result_message': message}
+        if result['rejected']:
+            vals.update({
+                'rejected_file': base64.b64encode(self._rejected_to_csv(result['rejected'])),
+                'rejected_filename': 'epr_import_rejected.csv',
+            })
+        self.write(vals)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    # ==========================================================================
+    # IMPORT ENGINE
+    # ==========================================================================
+
+    @api.model
+    def _import_rows(self, request_rows, line_rows, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Import PR và dòng PR từ danh sách dict (key = tiêu đề cột CSV).
+
+        Dòng line có thể trỏ tới PR trong cùng lần import hoặc PR đã import
+        trước đó (qua external id). PR có external id đã tồn tại bị bỏ qua nên
+        chạy lại cùng file là an toàn.
+
+        :return: dict(request_count, line_count, rejected=[dict(file, row, id, reason)])
+        """
+        if not self.env.is_superuser() and not self.env.user.has_group('epr.group_epr_admin'):
+            raise AccessError(_("Only ePR administrators can bulk import purchase requests."))
+
+        Request = self.env['epr.purchase.request']
+        Line = self.env['epr.purchase.request.line']
+        Request.check_access('create')
+        Line.check_access('create')
+
+        rejected = []
+        headers = self._validate_request_rows(request_rows, rejected)
+        lines_by_ref = self._validate_line_rows(line_rows, headers, rejected)
+
+        # Dòng line của PR đã có sẵn trong DB: ghi sau cùng, chung 1 lô
+        lines_of_existing = {ref: lines for ref, lines in lines_by_ref.items() if ref not in headers}
+
+        refs = list(headers)
+        batches = [refs[i:i + batch_size] for i in range(0, len(refs), batch_size)]
+        commit = len(batches) > 1 and not self.env.registry.in_test_mode()
+
+        request_count = line_count = 0
+        for batch in batches:
+            request_ids = self._insert_requests([headers[ref] for ref in batch])
+            line_count += self._insert_lines({
+                request_id: lines_by_ref.get(ref, [])
+                for ref, request_id in zip(batch, request_ids)
+            })
+            self._update_estimated_total(request_ids)
+            request_count += len(request_ids)
+            if commit:
+                self.env.cr.commit()
+
+        if lines_of_existing:
+            xmlid_map = self._resolve_xmlids('epr.purchase.request', lines_of_existing)
+            lines_by_request = {xmlid_map[ref]: lines for ref, lines in lines_of_existing.items()}
+            line_count += self._insert_lines(lines_by_request)
+            self._update_estimated_total(list(lines_by_request))
+
+        # Dữ liệu được ghi bằng SQL: bỏ cache ORM của 2 model
+        Request.invalidate_model()
+        Line.invalidate_model()
+        return {
+            'request_count': request_count,
+            'line_count': line_count,
+            'rejected': rejected,
+        }
+
+    @api.model
+    def _validate_request_rows(self, rows, rejected):
+        """
+        Validate header trong bộ nhớ.
+        :return: dict {xmlid: vals} theo thứ tự file, chỉ gồm các dòng hợp lệ.
+        """
+        Request = self.env['epr.purchase.request']
+        states = dict(Request._fields['state'].selection)
+        priorities = dict(Request._fields['priority'].selection)
+        today = fields.Date.context_today(self)
+
+        refs = [self._full_xmlid(row.get('id')) for row in rows if row.get('id')]
+        existing = self._resolve_xmlids('epr.purchase.request', refs)
+        employees = self._resolve_xmlids('hr.employee', [
+            self._full_xmlid(row['employee_id/id']) for row in rows if row.get('employee_id/id')
+        ])
+        default_employee = self.env.user.employee_id.id
+
+        headers = {}
+        for row_no, row in enumerate(rows, start=2):
+            ref = self._full_xmlid(row.get('id'))
+            error = None
+            employee_ref = self._full_xmlid(row.get('employee_id/id'))
+            employee_id = employees.get(employee_ref) if employee_ref else default_employee
+            try:
+                date_required = fields.Date.to_date(row.get('date_required') or None) or today
+            except ValueError:
+                date_required = None
+
+            if not ref:
+                error = _("Missing external id (column 'id').")
+            elif ref in headers:
+                error = _("Duplicate external id in file.")
+            elif ref in existing:
+                error = _("Purchase request already imported.")
+            elif not employee_id:
+                error = _("Employee not found.")
+            elif not date_required:
+                error = _("Invalid date_required: %s") % row.get('date_required')
+            elif (row.get('priority') or '1') not in priorities:
+                error = _("Invalid priority: %s") % row.get('priority')
+            elif (row.get('state') or 'draft') not in states:
+                error = _("Invalid state: %s") % row.get('state')
+
+            if error:
+                rejected.append({'file': 'requests', 'row': row_no, 'id': row.get('id'), 'reason': error})
+                continue
+            headers[ref] = {
+                'xmlid': ref,
+                'name': row.get('name') or None,
+                'employee_id': employee_id,
+                'date_required': date_required,
+                'priority': row.get('priority') or '1',
+                'state': row.get('state') or 'draft',
+            }
+        return headers
+
+    @api.model
+    def _validate_line_rows(self, rows, headers, rejected):
+        """
+        Validate dòng chi tiết trong bộ nhớ (thay cho _check_vendor_presence
+        chạy từng dòng) và tính sẵn subtotal_estimated.
+        :return: dict {xmlid PR: [vals]}
+        """
+        refs = {self._full_xmlid(row.get('request_id/id')) for row in rows if row.get('request_id/id')}
+        existing = self._resolve_xmlids('epr.purchase.request', refs - set(headers))
+        vendors = self._resolve_xmlids('res.partner', [
+            self._full_xmlid(row['user_vendor_id/id']) for row in rows if row.get('user_vendor_id/id')
+        ])
+        line_refs = [self._full_xmlid(row.get('id')) for row in rows if row.get('id')]
+        existing_lines = self._resolve_xmlids('epr.purchase.request.line', line_refs)
+
+        lines_by_ref = {}
+        seen = set()
+        for row_no, row in enumerate(rows, start=2):
+            ref = self._full_xmlid(row.get('request_id/id'))
+            line_ref = self._full_xmlid(row.get('id'))
+            vendor_ref = self._full_xmlid(row.get('user_vendor_id/id'))
+            vendor_id = vendors.get(vendor_ref) if vendor_ref else None
+            error = None
+            try:
+                quantity = float(row.get('quantity') or 1.0)
+                price = float(row.get('estimated_price') or 0.0)
+            except ValueError:
+                quantity = price = None
+
+            if not ref or (ref not in headers and ref not in existing):
+                error = _("Purchase request not found or rejected: %s") % row.get('request_id/id')
+            elif line_ref and (line_ref in seen or line_ref in existing_lines):
+                error = _("Duplicate or already imported line: %s") % row.get('id')
+            elif not (row.get('name') or '').strip():
+                error = _("Missing product name.")
+            elif not (row.get('product_description') or '').strip():
+                error = _("Missing product description.")
+            elif quantity is None:
+                error = _("Invalid quantity or estimated price.")
+            elif vendor_ref and not vendor_id:
+                error = _("Vendor not found: %s") % row.get('user_vendor_id/id')
+            elif not vendor_id and not (row.get('suggested_vendor_name') or '').strip():
+                error = _("Please select a vendor or enter a suggested vendor name.")
+
+            if error:
+                rejected.append({'file': 'lines', 'row': row_no, 'id': row.get('id'), 'reason': error})
+                continue
+            if line_ref:
+                seen.add(line_ref)
+            lines_by_ref.setdefault(ref, []).append({
+                'xmlid': line_ref,
+                'name': row['name'].strip(),
+                'product_description': row['product_description'],
+                'uom_name': row.get('uom_name') or 'Unit',
+                'quantity': quantity,
+                'estimated_price': price,
+                'subtotal_estimated': quantity * price,
+                'suggested_vendor_name': row.get('suggested_vendor_name') or None,
+                # Giống onchange: chọn vendor từ danh bạ thì chốt luôn Final Vendor
+                'user_vendor_id': vendor_id,
+                'final_vendor_id': vendor_id,
+            })
+        return lines_by_ref
+
+    @api.model
+    def _insert_requests(self, headers):
+        """INSERT 1 lô header + bảng hiển thị + external id. Trả về list id theo thứ tự."""
+        Request = self.env['epr.purchase.request']
+        currency_id = self.env.company.currency_id.id
+        now = fields.Datetime.now()
+        names = iter(self.env['ir.sequence']._next_by_code_block(
+            'epr.purchase.request', sum(1 for vals in headers if not vals['name'])
+        ))
+        employees = self.env['hr.employee'].browse({vals['employee_id'] for vals in headers})
+        department_by_employee = {employee.id: employee.department_id.id or None for employee in employees}
+
+        rows = [(
+            vals['name'] or next(names) or _('New'),
+            vals['employee_id'],
+            department_by_employee[vals['employee_id']],
+            vals['date_required'],
+            vals['priority'],
+            vals['state'],
+            currency_id,
+            True,
+            0,
+            0,
+            self.env.uid,
+            self.env.uid,
+            now,
+            now,
+        ) for vals in headers]
+        self.env.cr.execute("""
+            INSERT INTO epr_purchase_request
+                (name, employee_id, department_id, date_required, priority, state,
+                 currency_id, active, estimated_total, rfq_count,
+                 create_uid, write_uid, create_date, write_date)
+            VALUES %s
+            RETURNING id
+        """ % ', '.join(['%s'] * len(rows)), rows)
+        request_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        # Bảng hiển thị cho Record Rule Manager (giống _compute_visible_user_ids)
+        visibility = set()
+        for request_id, vals in zip(request_ids, headers):
+            employee = employees.browse(vals['employee_id'])
+            users = employee.user_id | employee.parent_id.user_id | employee.department_id.manager_id.user_id
+            visibility.update((request_id, user_id) for user_id in users.ids)
+        if visibility:
+            field = Request._fields['visible_user_ids']
+            self.env.cr.execute(
+                f'INSERT INTO "{field.relation}" ("{field.column1}", "{field.column2}") VALUES '
+                + ', '.join(['%s'] * len(visibility)),
+                list(visibility)
+            )
+
+        self._insert_xmlids('epr.purchase.request', [
+            (vals['xmlid'], request_id) for vals, request_id in zip(headers, request_ids)
+        ])
+        return request_ids
+
+    @api.model
+    def _insert_lines(self, lines_by_request):
+        """INSERT dòng chi tiết của 1 lô PR. Trả về số dòng đã ghi."""
+        Line = self.env['epr.purchase.request.line']
+        description_field = Line._fields['product_description']
+        currency_id = self.env.company.currency_id.id
+        now = fields.Datetime.now()
+        # currency_id của line là related store: lấy từ header
+        self.env.cr.execute(
+            "SELECT id, currency_id FROM epr_purchase_request WHERE id IN %s",
+            (tuple(lines_by_request) or (0,),)
+        )
+        currency_by_request = dict(self.env.cr.fetchall())
+        # Ảnh base64 trong mô tả -> attachment (giống khi tạo qua ORM)
+        self.env['epr.image.offload.log']._offload_vals(
+            [vals for lines in lines_by_request.values() for vals in lines]
+        )
+
+        rows, xmlids = [], []
+        for request_id, lines in lines_by_request.items():
+            for vals in lines:
+                xmlids.append(vals['xmlid'])
+                rows.append((
+                    request_id,
+                    currency_by_request.get(request_id, currency_id),
+                    vals['name'],
+                    # Html được sanitize như khi ghi qua ORM
+                    description_field.convert_to_column_insert(vals['product_description'], Line),
+                    vals['uom_name'],
+                    vals['quantity'],
+                    vals['estimated_price'],
+                    vals['subtotal_estimated'],
+                    vals['suggested_vendor_name'],
+                    vals['user_vendor_id'],
+                    vals['final_vendor_id'],
+                    self.env.uid,
+                    self.env.uid,
+                    now,
+                    now,
+                ))
+        if not rows:
+            return 0
+
+        self.env.cr.execute("""
+            INSERT INTO epr_purchase_request_line
+                (request_id, currency_id, name, product_description, uom_name,
+                 quantity, estimated_price, subtotal_estimated,
+                 suggested_vendor_name, user_vendor_id, final_vendor_id,
+                 create_uid, write_uid, create_date, write_date)
+            VALUES %s
+            RETURNING id
+        """ % ', '.join(['%s'] * len(rows)), rows)
+        line_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        self._insert_xmlids('epr.purchase.request.line', [
+            (xmlid, line_id) for xmlid, line_id in zip(xmlids, line_ids) if xmlid
+        ])
+        return len(line_ids)
+
+    @api.model
+    def _update_estimated_total(self, request_ids):
+        """Tính estimated_total cho cả lô bằng 1 câu UPDATE (thay vì compute từng PR)."""
+        if not request_ids:
+            return
+        self.env.cr.execute("""
+            UPDATE epr_purchase_request AS request
+               SET estimated_total = total.amount
+              FROM (SELECT request_id, SUM(subtotal_estimated) AS amount
+                      FROM epr_purchase_request_line
+                     WHERE request_id IN %s
+                  GROUP BY request_id) AS total
+             WHERE request.id = total.request_id
+        """, (tuple(request_ids),))
+
+    # ==========================================================================
+    # HELPERS
+    # ==========================================================================
+
+    @api.model
+    def _full_xmlid(self, xmlid):
+        """'pr_demo_1' -> '__import__.pr_demo_1' (giống Import CSV chuẩn)."""
+        xmlid = (xmlid or '').strip()
+        if not xmlid:
+            return None
+        return xmlid if '.' in xmlid else '%s.%s' % (IMPORT_MODULE, xmlid)
+
+    @api.model
+    def _resolve_xmlids(self, model, xmlids):
+        """Tra cứu nhiều external id trong 1 query. Trả về dict {xmlid: res_id}."""
+        xmlids = {xmlid for xmlid in xmlids if xmlid}
+        if not xmlids:
+            return {}
+        pairs = [tuple(xmlid.split('.', 1)) for xmlid in xmlids]
+        self.env.cr.execute("""
+            SELECT module || '.' || name, res_id
+              FROM ir_model_data
+             WHERE model = %s AND (module, name) IN %s
+        """, (model, tuple(pairs)))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _insert_xmlids(self, model, pairs):
+        """Ghi external id cho bản ghi vừa import (để line và lần import sau tham chiếu)."""
+        rows = [
+            tuple(xmlid.split('.', 1)) + (model, res_id, True)
+            for xmlid, res_id in pairs if xmlid
+        ]
+        if rows:
+            self.env.cr.execute(
+                "INSERT INTO ir_model_data (module, name, model, res_id, noupdate) VALUES "
+                + ', '.join(['%s'] * len(rows)),
+                rows
+            )
+            self.env['ir.model.data'].invalidate_model()
+
+    @api.model
+    def _read_csv(self, data):
+        """Binary (base64) -> list[dict] theo tiêu đề cột."""
+        try:
+            content = base64.b64decode(data).decode('utf-8-sig')
+        except (ValueError, UnicodeDecodeError):
+            raise UserError(_("The file must be a UTF-8 encoded CSV file."))
+        return list(csv.DictReader(io.StringIO(content)))
+
+    @api.model
+    def _rejected_to_csv(self, rejected):
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=['file', 'row', 'id', 'reason'])
+        writer.writeheader()
+        writer.writerows(rejected)
+        return output.getvalue().encode('utf-8-sig')
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from odoo import models, fields, api, Command, _
 from odoo.exceptions import UserError
 
 
@@ -18,12 +18,19 @@ class EprRejectWizard(models.TransientModel):
     request_id = fields.Many2one(
         comodel_name='epr.purchase.request',
         string='Purchase Request',
-        required=True,
         readonly=True,
         ondelete='cascade',
         help="The Purchase Request linked to this rejection action."
     )
 
+    # Dùng khi từ chối hàng loạt từ List View (active_ids)
+    request_ids = fields.Many2many(
+        comodel_name='epr.purchase.request',
+        string='Purchase Requests',
+        readonly=True,
+        help="The Purchase Requests rejected together with the same reason."
+    )
+
     reason = fields.Text(
         string='Rejection Reason',
         required=True,
@@ -50,6 +57,8 @@ class EprRejectWizard(models.TransientModel):
         # Kiểm tra xem có phải đang mở từ đúng model không
         if active_id and active_model == 'epr.purchase.request':
             res['request_id'] = active_id
+            active_ids = self.env.context.get('active_ids') or [active_id]
+            res['request_ids'] = [Command.set(active_ids)]
 
         return res
 
@@ -70,9 +79,13 @@ class EprRejectWizard(models.TransientModel):
         if not self.reason:
             raise UserError(_('Please provide a reason for rejection to proceed.'))
 
+        requests = self.request_ids or self.request_id
+        if not requests:
+            raise UserError(_('No purchase request selected for rejection.'))
+
         # Gọi phương thức nghiệp vụ trên model chính để xử lý logic chuyển trạng thái
         # Việc tách logic này giúp code gọn gàng và dễ bảo trì.
-        self.request_id.action_reject(self.reason)
+        requests.action_reject(self.reason)
 
         # Đóng cửa sổ wizard và (tùy chọn) reload lại giao diện phía sau
         return {
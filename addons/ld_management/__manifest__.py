@@ -30,7 +30,7 @@
     'version': '18.0.1.0.0',
 
     # Any module necessary for this one to work correctly
-    'depends': ['base', 'hr', 'mail', 'hr_skills', 'survey'],
+    'depends': ['base', 'hr', 'mail', 'hr_skills', 'survey', 'sequence_block'],
 
     # Always loaded
     'data': [
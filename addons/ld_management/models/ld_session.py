@@ -187,10 +187,11 @@ class LdSession(models.Model):
     # ==================================================================================
     @api.model_create_multi
     def create(self, vals_list):
-        """ Generate Sequence ID on creation """
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                vals['name'] = self.env['ir.sequence'].next_by_code('ld.session') or _('New')
+        """ Generate Sequence IDs on creation (one sequence call per batch) """
+        to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        names = self.env['ir.sequence']._next_by_code_block('ld.session', len(to_name))
+        for vals, name in zip(to_name, names):
+            vals['name'] = name or _('New')
         return super(LdSession, self).create(vals_list)
 
     # ==================================================================================
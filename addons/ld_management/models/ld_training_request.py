@@ -198,10 +198,11 @@ class LdTrainingRequest(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         """ Assign sequence on creation """
-        for vals in vals_list:
-            if vals.get('name', _('New')) == _('New'):
-                # Gọi sequence dựa trên field 'code' trong file XML
-                vals['name'] = self.env['ir.sequence'].next_by_code('ld.training.request') or _('New')
+        to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        # Gọi sequence dựa trên field 'code' trong file XML, cấp 1 block cho cả lô
+        names = self.env['ir.sequence']._next_by_code_block('ld.training.request', len(to_name))
+        for vals, name in zip(to_name, names):
+            vals['name'] = name or _('New')
         return super(LdTrainingRequest, self).create(vals_list)
 
     # ==================================================================================
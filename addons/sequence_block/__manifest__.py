@@ -0,0 +1,16 @@
+{
+    'name': 'Sequence Block Reservation',
+    'version': '18.0.1.0.0',
+    'category': 'Hidden/Tools',
+    'summary': 'Cấp phát số thứ tự theo block khi tạo hàng loạt',
+    'description': """
+        Module kỹ thuật dùng chung cho ePR và L&D Management:
+        - ir.sequence._next_by_code_block(code, count): cấp `count` số thứ tự trong 1 lần gọi.
+    """,
+    'author': 'Trường Phan',
+    'depends': ['base'],
+    'data': [],
+    'installable': True,
+    'application': False,
+    'license': 'LGPL-3',
+}
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def _next_by_code_block(self, sequence_code, count, sequence_date=None):
+        """
+        Cấp phát `count` số thứ tự của sequence `sequence_code` trong 1 lần gọi
+        (thay vì gọi next_by_code `count` lần khi tạo hàng loạt).
+
+        - standard: lấy nextval() hàng loạt bằng generate_series (1 query).
+        - no_gap: khóa dòng ir_sequence và tăng number_next 1 lần cho cả block.
+        - Sequence có date range: quay về cách cấp từng số của Odoo.
+
+        :return: danh sách tên đã format (prefix + padding + suffix),
+            hoặc danh sách False nếu không tìm thấy sequence (giống next_by_code).
+        """
+        if count <= 0:
+            return []
+
+        self.check_access('read')
+        company_id = self.env.company.id
+        sequence = self.search([
+            ('code', '=', sequence_code),
+            ('company_id', 'in', [company_id, False])
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [False] * count
+
+        if sequence.use_date_range:
+            return [sequence._next(sequence_date=sequence_date) for _i in range(count)]
+
+        numbers = sequence._reserve_numbers(count)
+        prefix, suffix = sequence._get_prefix_suffix(date=sequence_date)
+        return [
+            prefix + '%%0%sd' % sequence.padding % number + suffix
+            for number in numbers
+        ]
+
+    def _reserve_numbers(self, count):
+        """Giữ chỗ `count` số liên tiếp của sequence (không có date range)."""
+        self.ensure_one()
+        sequence = self.sudo()
+        increment = sequence.number_increment
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % sequence.id, count)
+            )
+            return [row[0] for row in self.env.cr.fetchall()]
+
+        self.env.cr.execute(
+            "SELECT number_next FROM ir_sequence WHERE id = %s FOR UPDATE NOWAIT",
+            (sequence.id,)
+        )
+        self.env.cr.execute(
+            "UPDATE ir_sequence SET number_next = number_next + %s "
+            "WHERE id = %s RETURNING number_next",
+            (increment * count, sequence.id)
+        )
+        number_next = self.env.cr.fetchone()[0]
+        sequence.invalidate_recordset(['number_next'])
+        first = number_next - increment * count
+        return [first + increment * index for index in range(count)]